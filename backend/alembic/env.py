@@ -3,12 +3,25 @@ from logging.config import fileConfig
 from sqlalchemy import engine_from_config, pool
 from alembic import context
 
+from app.config import settings
 from app.database import Base
-from app.models import Workflow, ExecutionEvent, BudgetPolicy
+from app.models import (
+    Workflow,
+    ExecutionEvent,
+    BudgetPolicy,
+    CostRollupHourly,
+    CostRollupDaily,
+    MetricSketchHourly,
+    AgentAnomaly,
+    ModelPrice,
+    ReratingJob,
+    IngestKey,
+)
 
 config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
+config.set_main_option("sqlalchemy.url", settings.database_url)
 
 target_metadata = Base.metadata
 
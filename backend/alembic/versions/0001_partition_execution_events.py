@@ -0,0 +1,207 @@
+"""Customer-scoped spend columns and daily partitioning of execution_events
+
+Tables that predate this revision are created as they stood at it when missing. Tables added
+by later features are created by the application at startup.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+"""
+from datetime import datetime, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.config import settings
+from app.services.partition_service import ensure_partitions, is_partitioned
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+EVENT_COLUMNS = (
+    "execution_id, workflow_id, customer_id, agent_id, model_name, tokens_in, tokens_out, tool_calls, "
+    'tool_cost_total, execution_cost_total, latency_ms, confidence_score, "timestamp"'
+)
+
+CREATE_EVENTS = """
+CREATE TABLE execution_events (
+    execution_id UUID NOT NULL,
+    workflow_id UUID NOT NULL,
+    customer_id VARCHAR,
+    agent_id VARCHAR NOT NULL,
+    model_name VARCHAR NOT NULL,
+    tokens_in INTEGER NOT NULL,
+    tokens_out INTEGER NOT NULL,
+    tool_calls INTEGER,
+    tool_cost_total FLOAT,
+    execution_cost_total FLOAT NOT NULL,
+    latency_ms INTEGER,
+    confidence_score FLOAT,
+    "timestamp" TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    CONSTRAINT execution_events_pkey PRIMARY KEY (execution_id, "timestamp"),
+    CONSTRAINT execution_events_workflow_id_fkey FOREIGN KEY (workflow_id) REFERENCES workflows (workflow_id)
+) {partitioning}
+"""
+
+EVENT_INDEXES = (
+    'CREATE INDEX ix_execution_events_timestamp ON execution_events ("timestamp")',
+    "CREATE INDEX ix_execution_events_customer_timestamp ON execution_events "
+    '(customer_id, "timestamp") INCLUDE (execution_cost_total)',
+)
+
+ROLLUP_TABLES = ("cost_rollups_hourly", "cost_rollups_daily")
+
+
+def _create_base_tables(inspector):
+    if not inspector.has_table("workflows"):
+        op.create_table(
+            "workflows",
+            sa.Column("workflow_id", sa.Uuid(), primary_key=True),
+            sa.Column("customer_id", sa.String(), nullable=False),
+            sa.Column("workflow_name", sa.String(), nullable=False),
+            sa.Column("task_type", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_workflows_customer_id", "workflows", ["customer_id"])
+    if not inspector.has_table("budget_policies"):
+        op.create_table(
+            "budget_policies",
+            sa.Column("policy_id", sa.Uuid(), primary_key=True),
+            sa.Column("customer_id", sa.String(), nullable=False),
+            sa.Column("daily_budget_limit", sa.Float(), nullable=False),
+            sa.Column("workflow_budget_limit", sa.Float(), nullable=False),
+            sa.Column("step_limit_per_agent", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_budget_policies_customer_id", "budget_policies", ["customer_id"])
+    for table in ROLLUP_TABLES:
+        if inspector.has_table(table):
+            continue
+        op.create_table(
+            table,
+            sa.Column("bucket_start", sa.DateTime(), primary_key=True),
+            sa.Column("workflow_id", sa.Uuid(), primary_key=True),
+            sa.Column("agent_id", sa.String(), primary_key=True),
+            sa.Column("model_name", sa.String(), primary_key=True),
+            sa.Column("customer_id", sa.String(), nullable=True),
+            sa.Column("total_cost", sa.Float(), nullable=False),
+            sa.Column("tokens_in", sa.BigInteger(), nullable=False),
+            sa.Column("tokens_out", sa.BigInteger(), nullable=False),
+            sa.Column("execution_count", sa.Integer(), nullable=False),
+            sa.Column("latency_ms_sum", sa.BigInteger(), nullable=False),
+            sa.Column("latency_count", sa.Integer(), nullable=False),
+        )
+        op.create_index(f"ix_{table}_customer_bucket", table, ["customer_id", "bucket_start"])
+
+
+def _create_portable_events_table():
+    op.create_table(
+        "execution_events",
+        sa.Column("execution_id", sa.Uuid(), nullable=False),
+        sa.Column("workflow_id", sa.Uuid(), sa.ForeignKey("workflows.workflow_id"), nullable=False),
+        sa.Column("customer_id", sa.String(), nullable=True),
+        sa.Column("agent_id", sa.String(), nullable=False),
+        sa.Column("model_name", sa.String(), nullable=False),
+        sa.Column("tokens_in", sa.Integer(), nullable=False),
+        sa.Column("tokens_out", sa.Integer(), nullable=False),
+        sa.Column("tool_calls", sa.Integer(), nullable=True),
+        sa.Column("tool_cost_total", sa.Float(), nullable=True),
+        sa.Column("execution_cost_total", sa.Float(), nullable=False),
+        sa.Column("latency_ms", sa.Integer(), nullable=True),
+        sa.Column("confidence_score", sa.Float(), nullable=True),
+        sa.Column("timestamp", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("execution_id", "timestamp", name="execution_events_pkey"),
+    )
+    op.create_index("ix_execution_events_timestamp", "execution_events", ["timestamp"])
+    op.create_index("ix_execution_events_customer_timestamp", "execution_events", ["customer_id", "timestamp"])
+
+
+def _create_events_table(partitioned: bool):
+    op.execute(CREATE_EVENTS.format(partitioning='PARTITION BY RANGE ("timestamp")' if partitioned else ""))
+    if partitioned:
+        op.execute("CREATE TABLE execution_events_default PARTITION OF execution_events DEFAULT")
+    for ddl in EVENT_INDEXES:
+        op.execute(ddl)
+
+
+def _move_to_legacy():
+    op.execute("ALTER TABLE execution_events RENAME TO execution_events_legacy")
+    op.execute(
+        "ALTER TABLE execution_events_legacy RENAME CONSTRAINT execution_events_pkey TO execution_events_legacy_pkey"
+    )
+    op.execute("DROP INDEX IF EXISTS ix_execution_events_timestamp")
+    op.execute("DROP INDEX IF EXISTS ix_execution_events_customer_timestamp")
+
+
+def _add_customer_column(bind, table: str, index_name: str, index_columns: list[str]):
+    if "customer_id" in {c["name"] for c in sa.inspect(bind).get_columns(table)}:
+        return
+    op.add_column(table, sa.Column("customer_id", sa.String(), nullable=True))
+    op.execute(
+        f"UPDATE {table} SET customer_id = "
+        f"(SELECT w.customer_id FROM workflows w WHERE w.workflow_id = {table}.workflow_id)"
+    )
+    op.create_index(index_name, table, index_columns)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    had_events = inspector.has_table("execution_events")
+    had_rollups = inspector.has_table(ROLLUP_TABLES[0])
+    _create_base_tables(inspector)
+    if had_rollups:
+        for table in ROLLUP_TABLES:
+            _add_customer_column(bind, table, f"ix_{table}_customer_bucket", ["customer_id", "bucket_start"])
+
+    if bind.dialect.name != "postgresql":
+        # Without native partitioning only the denormalized column and its index are added
+        if had_events:
+            _add_customer_column(
+                bind, "execution_events", "ix_execution_events_customer_timestamp", ["customer_id", "timestamp"]
+            )
+        else:
+            _create_portable_events_table()
+        return
+    if not had_events:
+        _create_events_table(partitioned=True)
+        today = datetime.utcnow().date()
+        ensure_partitions(bind, today, today + timedelta(days=settings.partition_days_ahead))
+        return
+    if is_partitioned(bind):
+        return
+
+    legacy_columns = {c["name"] for c in inspector.get_columns("execution_events")}
+    customer = "COALESCE(e.customer_id, w.customer_id)" if "customer_id" in legacy_columns else "w.customer_id"
+    _move_to_legacy()
+    _create_events_table(partitioned=True)
+
+    oldest, newest = bind.execute(
+        sa.text('SELECT min("timestamp"), max("timestamp") FROM execution_events_legacy')
+    ).one()
+    today = datetime.utcnow().date()
+    first_day = oldest.date() if oldest else today
+    last_day = max(newest.date() if newest else today, today) + timedelta(days=settings.partition_days_ahead)
+    ensure_partitions(bind, first_day, last_day)
+
+    op.execute(
+        f"INSERT INTO execution_events ({EVENT_COLUMNS}) "
+        f"SELECT e.execution_id, e.workflow_id, {customer}, e.agent_id, e.model_name, e.tokens_in, e.tokens_out, "
+        f"e.tool_calls, e.tool_cost_total, e.execution_cost_total, e.latency_ms, e.confidence_score, "
+        f'COALESCE(e."timestamp", now() AT TIME ZONE \'utc\') '
+        f"FROM execution_events_legacy e JOIN workflows w ON w.workflow_id = e.workflow_id"
+    )
+    op.execute("DROP TABLE execution_events_legacy")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql" or not is_partitioned(bind):
+        return
+    _move_to_legacy()
+    _create_events_table(partitioned=False)
+    op.execute(f"INSERT INTO execution_events ({EVENT_COLUMNS}) SELECT {EVENT_COLUMNS} FROM execution_events_legacy")
+    op.execute("DROP TABLE execution_events_legacy CASCADE")
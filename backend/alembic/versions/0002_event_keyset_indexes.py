@@ -0,0 +1,58 @@
+"""Composite indexes ending in (timestamp, execution_id) for keyset-paged event queries
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# On a partitioned table, indexes created on the parent cascade to every partition, and to
+# partitions attached later by partition maintenance
+KEYSET_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS ix_execution_events_timestamp_execution_id ON execution_events "
+    '("timestamp", execution_id)',
+    "CREATE INDEX IF NOT EXISTS ix_execution_events_customer_timestamp ON execution_events "
+    '(customer_id, "timestamp", execution_id){include}',
+    "CREATE INDEX IF NOT EXISTS ix_execution_events_workflow_timestamp ON execution_events "
+    '(workflow_id, "timestamp", execution_id)',
+    "CREATE INDEX IF NOT EXISTS ix_execution_events_agent_timestamp ON execution_events "
+    '(agent_id, "timestamp", execution_id)',
+)
+
+PREVIOUS_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS ix_execution_events_timestamp ON execution_events ("timestamp")',
+    "CREATE INDEX IF NOT EXISTS ix_execution_events_customer_timestamp ON execution_events "
+    '(customer_id, "timestamp"){include}',
+)
+
+
+def _include() -> str:
+    return " INCLUDE (execution_cost_total)" if op.get_bind().dialect.name == "postgresql" else ""
+
+
+def upgrade() -> None:
+    # The timestamp index is subsumed by (timestamp, execution_id); the customer index gains
+    # execution_id as a trailing key so customer-scoped pages are read in keyset order
+    op.execute("DROP INDEX IF EXISTS ix_execution_events_timestamp")
+    op.execute("DROP INDEX IF EXISTS ix_execution_events_customer_timestamp")
+    for ddl in KEYSET_INDEXES:
+        op.execute(ddl.format(include=_include()))
+
+
+def downgrade() -> None:
+    for name in (
+        "ix_execution_events_timestamp_execution_id",
+        "ix_execution_events_customer_timestamp",
+        "ix_execution_events_workflow_timestamp",
+        "ix_execution_events_agent_timestamp",
+    ):
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    for ddl in PREVIOUS_INDEXES:
+        op.execute(ddl.format(include=_include()))
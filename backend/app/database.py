@@ -1,12 +1,128 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 
 from app.config import settings
+from app.metrics import Gauge, instrument_engine, registry, timed_pool_class
 
-engine = create_engine(settings.database_url)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_url(url: str) -> str:
+    """The same database addressed through its asyncio driver (asyncpg, aiosqlite)."""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    return parsed.set(drivername=driver).render_as_string(hide_password=False) if driver else url
+
+
+def _engine_options(
+    name: str, url: str, pool_size: int, max_overflow: int, statement_timeout_ms: int, is_async: bool
+) -> dict:
+    if make_url(url).get_backend_name() != "postgresql":
+        # SQLite has no server-side statement timeout and manages its own connection pool
+        return {}
+    options = {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.db_pool_timeout_s,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "pool_recycle": settings.db_pool_recycle_s,
+    }
+    if settings.metrics_enabled:
+        options["poolclass"] = timed_pool_class(AsyncAdaptedQueuePool if is_async else QueuePool, name)
+    if statement_timeout_ms:
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(statement_timeout_ms)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout_ms}"}
+    return options
+
+
+def _split(budget: int, minimum: int = 0) -> tuple[int, int]:
+    """Divide a connection budget between the sync and the async engine, the larger share going to async."""
+    return max(budget // 2, minimum), max(budget - budget // 2, minimum)
+
+
+class DatabaseRole:
+    """A sync and an async engine for one workload, sharing the role's pool budget and statement timeout.
+
+    The role's pool_size and max_overflow are split between the two engines, so a worker opens at
+    most pool_size + max_overflow connections per role (one more per engine if pool_size is below 2).
+    """
+
+    def __init__(self, name: str, url: str, pool_size: int, max_overflow: int, statement_timeout_ms: int):
+        self.name = name
+        # A pool_size of 0 would mean no limit, so each engine keeps at least one pooled connection
+        sync_pool_size, async_pool_size = _split(pool_size, minimum=1)
+        sync_overflow, async_overflow = _split(max_overflow)
+        self.engine = create_engine(
+            url, **_engine_options(name, url, sync_pool_size, sync_overflow, statement_timeout_ms, False)
+        )
+        self.session = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.async_engine = create_async_engine(
+            async_url(url),
+            **_engine_options(f"{name}-async", url, async_pool_size, async_overflow, statement_timeout_ms, True),
+        )
+        self.async_session = async_sessionmaker(self.async_engine, autoflush=False, expire_on_commit=False)
+        if settings.metrics_enabled:
+            instrument_engine(self.engine, name)
+            instrument_engine(self.async_engine.sync_engine, f"{name}-async")
+
+    async def dispose(self):
+        await self.async_engine.dispose()
+        self.engine.dispose()
+
+
+# Ingestion and other writes
+write_db = DatabaseRole(
+    "write",
+    settings.database_url,
+    settings.db_pool_size,
+    settings.db_max_overflow,
+    settings.db_write_statement_timeout_ms,
+)
+# Latency-critical reads on the primary (guardrails, policies) that must not queue behind analytics
+read_db = DatabaseRole(
+    "read",
+    settings.database_url,
+    settings.db_read_pool_size,
+    settings.db_read_max_overflow,
+    settings.db_read_statement_timeout_ms,
+)
+# Summary scans and exports; served by the replica when one is configured
+analytics_db = DatabaseRole(
+    "analytics",
+    settings.database_replica_url or settings.database_url,
+    settings.db_analytics_pool_size,
+    settings.db_analytics_max_overflow,
+    settings.db_analytics_statement_timeout_ms,
+)
+database_roles = (write_db, read_db, analytics_db)
+
+
+def _pool_usage() -> dict:
+    usage = {}
+    for role in database_roles:
+        for pool_name, pool in ((role.name, role.engine.pool), (f"{role.name}-async", role.async_engine.pool)):
+            if isinstance(pool, QueuePool):
+                usage[(pool_name, "checked_out")] = pool.checkedout()
+                usage[(pool_name, "idle")] = pool.checkedin()
+    return usage
+
+
+registry.register(Gauge("db_pool_connections", "Pooled connections by state", ("pool", "state"), _pool_usage))
+
+engine = write_db.engine
+SessionLocal = write_db.session
 Base = declarative_base()
 
+# Request handlers run sync service code on the async engines through AsyncSession.run_sync,
+# so a request waiting on the database holds no threadpool thread
+async_engine = write_db.async_engine
+AsyncSessionLocal = write_db.async_session
+
 
 def get_db():
     db = SessionLocal()
@@ -14,3 +130,25 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    async with read_db.async_session() as db:
+        yield db
+
+
+async def get_async_analytics_db():
+    async with analytics_db.async_session() as db:
+        yield db
+
+
+def dialect_insert(db: Session, table):
+    """Return an INSERT construct supporting ON CONFLICT for the session's dialect."""
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(table)
+    return postgresql.insert(table)
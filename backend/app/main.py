@@ -1,18 +1,40 @@
+from typing import Optional
+
 import structlog
 from fastapi import FastAPI, Depends, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.orm import Session
 
 from app.config import settings
-from app.database import Base, engine, get_db
+from app.database import Base, SessionLocal, database_roles, engine, get_db
 from app.logging_config import setup_logging
-from app.routers import simulation, telemetry, policies
+from app.metrics import InstrumentedRoute, MetricsMiddleware, registry
+from app.routers import simulation, telemetry, policies, pricing
+from app.schemas.seed import LoadProfile
+from app.serialization import NegotiatedResponse
+from app.services.archive_service import archive_events
+from app.services.guardrail_engine import guardrail_engine
+from app.services.idempotency import prune_keys
+from app.services.ingest_buffer import ingest_buffer
+from app.services.live_stream import live_cost_hub
+from app.services.load_generator import generate_load
+from app.services.partition_service import maintain_partitions
+from app.services.pricing_service import pricing_catalog
+from app.services.rerating_service import rerating_runner
+from app.services.rollup_service import backfill_rollups, backfill_sketches
+from app.services.scheduler import PeriodicTask
 from app.services.seed_data import seed_demo_data
+from app.services.spend_forecaster import spend_forecaster
 
 setup_logging()
 log = structlog.get_logger()
 
-app = FastAPI(title=settings.app_name, version="0.1.0")
+app = FastAPI(title=settings.app_name, version="0.1.0", default_response_class=NegotiatedResponse)
+app.router.route_class = InstrumentedRoute
+
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware, slow_request_ms=settings.slow_request_log_ms)
 
 app.add_middleware(
     CORSMiddleware,
@@ -34,21 +56,107 @@ def verify_api_key(x_api_key: str = Header(default=None)):
 app.include_router(simulation.router, dependencies=[Depends(verify_api_key)])
 app.include_router(telemetry.router, dependencies=[Depends(verify_api_key)])
 app.include_router(policies.router, dependencies=[Depends(verify_api_key)])
+app.include_router(pricing.router, dependencies=[Depends(verify_api_key)])
+
+partition_maintenance = PeriodicTask(
+    "partition-maintenance",
+    settings.partition_maintenance_interval_s,
+    lambda: maintain_partitions(engine, settings.partition_days_ahead, settings.partition_retention_days),
+)
+event_archiver = PeriodicTask(
+    "event-archive",
+    settings.archive_interval_s,
+    lambda: archive_events(engine, settings.archive_after_days),
+)
+ingest_key_pruning = PeriodicTask(
+    "ingest-key-pruning",
+    settings.idempotency_prune_interval_s,
+    lambda: prune_keys(engine, settings.idempotency_window_hours),
+)
+# Picks up price versions added through other workers
+pricing_refresh = PeriodicTask(
+    "pricing-refresh",
+    settings.pricing_refresh_interval_s,
+    lambda: pricing_catalog.refresh(SessionLocal),
+)
+# Picks up policies created through other workers, and customers that have since got one
+policy_refresh = PeriodicTask(
+    "policy-refresh",
+    settings.policy_refresh_interval_s,
+    lambda: guardrail_engine.refresh_policies(SessionLocal),
+)
+# Adds the days completed since the last run to the guardrails' spend profiles
+spend_profile_refresh = PeriodicTask(
+    "spend-profile-refresh",
+    settings.spend_profile_refresh_interval_s,
+    lambda: spend_forecaster.refresh(SessionLocal),
+)
+# Resumes re-rating jobs left pending, or abandoned by a worker that died
+rerating_recovery = PeriodicTask("rerating-recovery", settings.rerate_recovery_interval_s, rerating_runner.recover)
 
 
 @app.on_event("startup")
 def on_startup():
     log.info("Creating database tables")
     Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        if backfill_rollups(db):
+            log.info("Backfilled cost rollups from raw events")
+        if backfill_sketches(db):
+            log.info("Backfilled latency and cost sketches from raw events")
+        guardrail_engine.reconcile(db)
+        pricing_catalog.load(db)
     log.info("Application started", app_name=settings.app_name)
 
 
+@app.on_event("startup")
+async def start_background_tasks():
+    await ingest_buffer.start()
+    await live_cost_hub.start()
+    await partition_maintenance.start()
+    await ingest_key_pruning.start()
+    if settings.archive_after_days is not None:
+        await event_archiver.start()
+    await pricing_refresh.start()
+    await policy_refresh.start()
+    await spend_profile_refresh.start()
+    rerating_runner.start()
+    await rerating_recovery.start()
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    await partition_maintenance.stop()
+    await ingest_key_pruning.stop()
+    await event_archiver.stop()
+    await pricing_refresh.stop()
+    await policy_refresh.stop()
+    await spend_profile_refresh.stop()
+    await rerating_runner.stop()
+    await rerating_recovery.stop()
+    await ingest_buffer.stop()
+    await live_cost_hub.stop()
+    for role in database_roles:
+        await role.dispose()
+
+
 @app.get("/health")
 def health():
     return {"status": "ok", "app": settings.app_name}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/seed-demo-data")
-def seed_data(db: Session = Depends(get_db)):
-    result = seed_demo_data(db)
-    return result
+def seed_data(profile: Optional[LoadProfile] = None, db: Session = Depends(get_db)):
+    if profile is None:
+        return seed_demo_data(db)
+    try:
+        return generate_load(db, profile)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
@@ -0,0 +1,348 @@
+"""Request, database and connection-pool metrics exposed in Prometheus text format.
+
+An ASGI middleware opens a per-request stats record in a context variable. SQLAlchemy event
+hooks add each statement's duration to it, timed pools add the connection checkout wait, and
+InstrumentedRoute marks where the endpoint returned so that response validation and
+serialization are timed separately. When the request finishes, the record is folded into
+process-wide histograms. Recording costs a few clock reads and dictionary updates per request
+and per statement.
+
+Metrics are per process; with several workers, scrape each one.
+"""
+
+import asyncio
+import bisect
+import functools
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Iterable, Optional
+
+import structlog
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+log = structlog.get_logger()
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Statements listed in a slow-request log entry, slowest first
+SLOW_LOG_TOP_STATEMENTS = 10
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = list(self._values.items())
+        for values, total in items:
+            yield f"{self.name}{_format_labels(self.labels, values)} {total}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        # Per label set: [count per bucket (last is +Inf), sum]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = [(values, list(counts), total) for values, (counts, total) in self._series.items()]
+        names = self.labels + ("le",)
+        for values, counts, total in items:
+            cumulative = 0
+            for bound, n in zip((*self.buckets, "+Inf"), counts):
+                cumulative += n
+                yield f"{self.name}_bucket{_format_labels(names, (*values, bound))} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, values)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labels, values)} {cumulative}"
+
+
+class Gauge:
+    """Sampled at scrape time from a callback returning {label values: value}."""
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...], collect: Callable[[], dict]):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.collect = collect
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        for values, value in self.collect().items():
+            yield f"{self.name}{_format_labels(self.labels, values)} {value}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: list = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.register(
+    Counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+)
+http_duration = registry.register(
+    Histogram("http_request_duration_seconds", "Time from request start to last response byte", ("method", "route"))
+)
+http_serialize = registry.register(
+    Histogram(
+        "http_response_serialize_seconds",
+        "Time from endpoint return to response ready (validation and serialization)",
+        ("method", "route"),
+    )
+)
+http_request_size = registry.register(
+    Histogram("http_request_size_bytes", "Request body size", ("method", "route"), SIZE_BUCKETS)
+)
+http_response_size = registry.register(
+    Histogram("http_response_size_bytes", "Response body size", ("method", "route"), SIZE_BUCKETS)
+)
+request_queries = registry.register(
+    Histogram("http_request_db_queries", "SQL statements issued per request", ("method", "route"), COUNT_BUCKETS)
+)
+request_db_time = registry.register(
+    Histogram("http_request_db_seconds", "Time spent executing SQL per request", ("method", "route"))
+)
+db_query_duration = registry.register(
+    Histogram("db_query_duration_seconds", "SQL statement execution time", ("pool",))
+)
+db_pool_wait = registry.register(
+    Histogram("db_pool_checkout_wait_seconds", "Time waiting for a pooled connection", ("pool",))
+)
+
+
+class RequestStats:
+    __slots__ = ("route", "queries", "db_s", "pool_wait_s", "endpoint_done", "serialize_s", "statements")
+
+    def __init__(self, keep_statements: bool):
+        self.route: Optional[str] = None
+        self.queries = 0
+        self.db_s = 0.0
+        self.pool_wait_s = 0.0
+        self.endpoint_done: Optional[float] = None
+        self.serialize_s: Optional[float] = None
+        self.statements: Optional[list[tuple[str, float]]] = [] if keep_statements else None
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def instrument_engine(engine, pool_name: str):
+    """Time every statement run on a (sync) engine and attribute it to the current request."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_started"] = time.perf_counter()
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        if exception_context.connection is not None:
+            exception_context.connection.info.pop("query_started", None)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("query_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        db_query_duration.observe(elapsed, pool_name)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_s += elapsed
+            if stats.statements is not None:
+                stats.statements.append((statement, elapsed))
+
+
+def timed_pool_class(base: type, pool_name: str) -> type:
+    """A subclass of a queue pool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return base._do_get(self)
+        finally:
+            waited = time.perf_counter() - started
+            db_pool_wait.observe(waited, pool_name)
+            stats = _request_stats.get()
+            if stats is not None:
+                stats.pool_wait_s += waited
+
+    return type(f"Timed{base.__name__}", (base,), {"_do_get": _do_get})
+
+
+class InstrumentedRoute(APIRoute):
+    """Records the route template and when the endpoint returned, for serialization timing."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, endpoint, **kwargs)
+        call = self.dependant.call
+        # The request handler reads dependant.call on every request and decides between
+        # awaiting it and running it in the threadpool from whether it is a coroutine function
+        if asyncio.iscoroutinefunction(call):
+
+            @functools.wraps(call)
+            async def timed_call(*args, **kw):
+                try:
+                    return await call(*args, **kw)
+                finally:
+                    _mark_endpoint_done()
+
+        else:
+
+            @functools.wraps(call)
+            def timed_call(*args, **kw):
+                try:
+                    return call(*args, **kw)
+                finally:
+                    _mark_endpoint_done()
+
+        self.dependant.call = timed_call
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        route = self.path_format
+
+        async def instrumented_handler(request):
+            stats = _request_stats.get()
+            if stats is not None:
+                stats.route = route
+            response = await handler(request)
+            if stats is not None and stats.endpoint_done is not None:
+                stats.serialize_s = time.perf_counter() - stats.endpoint_done
+            return response
+
+        return instrumented_handler
+
+
+def _mark_endpoint_done():
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.endpoint_done = time.perf_counter()
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses pass through unbuffered."""
+
+    def __init__(self, app, slow_request_ms: Optional[float] = None):
+        self.app = app
+        self.slow_request_s = slow_request_ms / 1000 if slow_request_ms else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        stats = RequestStats(keep_statements=self.slow_request_s is not None)
+        token = _request_stats.set(stats)
+        sizes = [0, 0]
+        status = [500]
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                sizes[0] += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                sizes[1] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            _request_stats.reset(token)
+            self._record(scope["method"], stats, time.perf_counter() - started, status[0], sizes)
+
+    def _record(self, method: str, stats: RequestStats, elapsed: float, status: int, sizes: list[int]):
+        route = stats.route or "unmatched"
+        http_requests.inc(method, route, status)
+        http_duration.observe(elapsed, method, route)
+        http_request_size.observe(sizes[0], method, route)
+        http_response_size.observe(sizes[1], method, route)
+        request_queries.observe(stats.queries, method, route)
+        request_db_time.observe(stats.db_s, method, route)
+        if stats.serialize_s is not None:
+            http_serialize.observe(stats.serialize_s, method, route)
+
+        if self.slow_request_s is not None and elapsed >= self.slow_request_s:
+            log.warning(
+                "Slow request",
+                method=method,
+                route=route,
+                status=status,
+                duration_ms=round(elapsed * 1000, 3),
+                db_queries=stats.queries,
+                db_ms=round(stats.db_s * 1000, 3),
+                pool_wait_ms=round(stats.pool_wait_s * 1000, 3),
+                serialize_ms=round(stats.serialize_s * 1000, 3) if stats.serialize_s is not None else None,
+                request_bytes=sizes[0],
+                response_bytes=sizes[1],
+                statements=_statement_breakdown(stats.statements),
+            )
+
+
+def _statement_breakdown(statements: list[tuple[str, float]]) -> list[dict]:
+    grouped: dict[str, list] = {}
+    for statement, elapsed in statements:
+        g = grouped.setdefault(statement, [0, 0.0])
+        g[0] += 1
+        g[1] += elapsed
+    slowest = sorted(grouped.items(), key=lambda kv: -kv[1][1])[:SLOW_LOG_TOP_STATEMENTS]
+    return [
+        {"sql": " ".join(statement.split())[:300], "count": n, "ms": round(total * 1000, 3)}
+        for statement, (n, total) in slowest
+    ]
@@ -1,5 +1,22 @@
 from app.models.workflow import Workflow
 from app.models.execution_event import ExecutionEvent
 from app.models.budget_policy import BudgetPolicy
+from app.models.cost_rollup import CostRollupHourly, CostRollupDaily
+from app.models.metric_sketch import MetricSketchHourly
+from app.models.agent_anomaly import AgentAnomaly
+from app.models.model_price import ModelPrice
+from app.models.rerating_job import ReratingJob
+from app.models.ingest_key import IngestKey
 
-__all__ = ["Workflow", "ExecutionEvent", "BudgetPolicy"]
+__all__ = [
+    "Workflow",
+    "ExecutionEvent",
+    "BudgetPolicy",
+    "CostRollupHourly",
+    "CostRollupDaily",
+    "MetricSketchHourly",
+    "AgentAnomaly",
+    "ModelPrice",
+    "ReratingJob",
+    "IngestKey",
+]
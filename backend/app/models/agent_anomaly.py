@@ -0,0 +1,25 @@
+import uuid
+
+from sqlalchemy import Column, String, Float, DateTime, Index, Uuid
+
+from app.database import Base
+
+
+class AgentAnomaly(Base):
+    """A minute in which an agent's cost or token rate broke from its running baseline."""
+
+    __tablename__ = "agent_anomalies"
+    __table_args__ = (Index("ix_agent_anomalies_customer_detected", "customer_id", "detected_at"),)
+
+    anomaly_id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    detected_at = Column(DateTime, nullable=False, index=True)
+    minute_start = Column(DateTime, nullable=False)
+    customer_id = Column(String, nullable=True)
+    workflow_id = Column(Uuid, nullable=False)
+    agent_id = Column(String, nullable=False)
+    metric = Column(String, nullable=False)  # "cost" or "tokens"
+    value = Column(Float, nullable=False)  # the minute's total when the anomaly was detected
+    baseline = Column(Float, nullable=False)  # EWMA of the agent's per-minute total
+    baseline_std = Column(Float, nullable=False)
+    z_score = Column(Float, nullable=True)
+    ratio = Column(Float, nullable=True)
@@ -1,8 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, String, Float, Integer, DateTime
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Float, Integer, DateTime, Uuid
 
 from app.database import Base
 
@@ -10,7 +9,7 @@ from app.database import Base
 class BudgetPolicy(Base):
     __tablename__ = "budget_policies"
 
-    policy_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    policy_id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     customer_id = Column(String, nullable=False, index=True)
     daily_budget_limit = Column(Float, nullable=False)
     workflow_budget_limit = Column(Float, nullable=False)
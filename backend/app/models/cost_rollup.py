@@ -0,0 +1,27 @@
+from sqlalchemy import Column, String, Integer, BigInteger, Float, DateTime, Index, Uuid
+
+from app.database import Base
+
+
+class _CostRollupColumns:
+    bucket_start = Column(DateTime, primary_key=True)
+    workflow_id = Column(Uuid, primary_key=True)
+    agent_id = Column(String, primary_key=True)
+    model_name = Column(String, primary_key=True)
+    customer_id = Column(String, nullable=True)  # denormalized from workflows.customer_id
+    total_cost = Column(Float, nullable=False, default=0.0)
+    tokens_in = Column(BigInteger, nullable=False, default=0)
+    tokens_out = Column(BigInteger, nullable=False, default=0)
+    execution_count = Column(Integer, nullable=False, default=0)
+    latency_ms_sum = Column(BigInteger, nullable=False, default=0)
+    latency_count = Column(Integer, nullable=False, default=0)
+
+
+class CostRollupHourly(_CostRollupColumns, Base):
+    __tablename__ = "cost_rollups_hourly"
+    __table_args__ = (Index("ix_cost_rollups_hourly_customer_bucket", "customer_id", "bucket_start"),)
+
+
+class CostRollupDaily(_CostRollupColumns, Base):
+    __tablename__ = "cost_rollups_daily"
+    __table_args__ = (Index("ix_cost_rollups_daily_customer_bucket", "customer_id", "bucket_start"),)
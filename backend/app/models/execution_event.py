@@ -1,8 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey, Index, Uuid
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -10,9 +9,26 @@ from app.database import Base
 
 class ExecutionEvent(Base):
     __tablename__ = "execution_events"
+    __table_args__ = (
+        # Keyset order of /telemetry/events; also serves plain time-range scans
+        Index("ix_execution_events_timestamp_execution_id", "timestamp", "execution_id"),
+        # Covering index for per-customer spend windows (guardrail daily spend, scoped summaries)
+        # and for customer-scoped event pages
+        Index(
+            "ix_execution_events_customer_timestamp",
+            "customer_id",
+            "timestamp",
+            "execution_id",
+            postgresql_include=["execution_cost_total"],
+        ),
+        Index("ix_execution_events_workflow_timestamp", "workflow_id", "timestamp", "execution_id"),
+        Index("ix_execution_events_agent_timestamp", "agent_id", "timestamp", "execution_id"),
+    )
 
-    execution_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    workflow_id = Column(UUID(as_uuid=True), ForeignKey("workflows.workflow_id"), nullable=False)
+    # The primary key includes timestamp so the table can be range-partitioned by day
+    execution_id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    workflow_id = Column(Uuid, ForeignKey("workflows.workflow_id"), nullable=False)
+    customer_id = Column(String, nullable=True)  # denormalized from workflows.customer_id
     agent_id = Column(String, nullable=False)
     model_name = Column(String, nullable=False)
     tokens_in = Column(Integer, nullable=False)
@@ -22,6 +38,6 @@ class ExecutionEvent(Base):
     execution_cost_total = Column(Float, nullable=False)
     latency_ms = Column(Integer, nullable=True)
     confidence_score = Column(Float, nullable=True)
-    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
+    timestamp = Column(DateTime, primary_key=True, default=datetime.utcnow)
 
     workflow = relationship("Workflow", back_populates="executions")
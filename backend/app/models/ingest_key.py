@@ -0,0 +1,16 @@
+from sqlalchemy import Column, DateTime, Uuid
+
+from app.database import Base
+
+
+class IngestKey(Base):
+    """A client-assigned event id seen within the idempotency window.
+
+    execution_events cannot enforce uniqueness of execution_id alone: its primary key includes
+    the server-assigned timestamp, which differs between retries. This unpartitioned table does.
+    """
+
+    __tablename__ = "ingest_keys"
+
+    execution_id = Column(Uuid, primary_key=True)
+    timestamp = Column(DateTime, nullable=False, index=True)  # of the stored event
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, String, DateTime, Index, LargeBinary, Uuid
+
+from app.database import Base
+
+
+class MetricSketchHourly(Base):
+    """Serialized DDSketches of per-step latency and cost, one row per hourly rollup key."""
+
+    __tablename__ = "metric_sketches_hourly"
+    __table_args__ = (Index("ix_metric_sketches_hourly_customer_bucket", "customer_id", "bucket_start"),)
+
+    bucket_start = Column(DateTime, primary_key=True)
+    workflow_id = Column(Uuid, primary_key=True)
+    agent_id = Column(String, primary_key=True)
+    model_name = Column(String, primary_key=True)
+    customer_id = Column(String, nullable=True)  # denormalized from workflows.customer_id
+    latency_sketch = Column(LargeBinary, nullable=True)  # None until an event reports latency_ms
+    cost_sketch = Column(LargeBinary, nullable=False)
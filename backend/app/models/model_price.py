@@ -0,0 +1,20 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import Column, String, Float, DateTime, UniqueConstraint, Uuid
+
+from app.database import Base
+
+
+class ModelPrice(Base):
+    """One version of a model's token prices, in force from effective_from until the next version."""
+
+    __tablename__ = "model_prices"
+    __table_args__ = (UniqueConstraint("model_name", "effective_from", name="uq_model_prices_model_effective"),)
+
+    price_id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    model_name = Column(String, nullable=False)
+    input_cost_per_1k = Column(Float, nullable=False)
+    output_cost_per_1k = Column(Float, nullable=False)
+    effective_from = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,26 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, Uuid
+
+from app.database import Base
+
+
+class ReratingJob(Base):
+    """Progress of a bulk re-rating run; cursor marks how far [start, end) has been re-priced."""
+
+    __tablename__ = "rerating_jobs"
+
+    job_id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    status = Column(String, nullable=False, default="pending")  # pending, running, completed, failed
+    start = Column(DateTime, nullable=False)
+    end = Column(DateTime, nullable=False)
+    model_names = Column(String, nullable=True)  # comma-separated; all priced models when unset
+    cursor = Column(DateTime, nullable=False)
+    chunks_done = Column(Integer, nullable=False, default=0)
+    rows_updated = Column(BigInteger, nullable=False, default=0)
+    dirty_models = Column(String, nullable=True)  # comma-separated models re-priced in the cursor's day, to roll up
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
@@ -1,34 +1,49 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_async_db, get_async_read_db
 from app.models.budget_policy import BudgetPolicy
-from app.schemas.policy import PolicyCreate, PolicyResponse, GuardrailRequest, GuardrailResult
-from app.services.guardrail_service import evaluate_guardrail
+from app.schemas.policy import (
+    PolicyCreate,
+    PolicyResponse,
+    GuardrailRequest,
+    GuardrailResult,
+    GuardrailBatchRequest,
+    GuardrailBatchResult,
+)
+from app.serialization import NegotiatedRoute
+from app.services.guardrail_engine import guardrail_engine
+from app.services.guardrail_service import evaluate_guardrail, evaluate_guardrail_batch
 
-router = APIRouter(tags=["policies"])
+router = APIRouter(tags=["policies"], route_class=NegotiatedRoute)
 
 
 @router.post("/policies/create", response_model=PolicyResponse)
-def create_policy(policy: PolicyCreate, db: Session = Depends(get_db)):
+async def create_policy(policy: PolicyCreate, db: AsyncSession = Depends(get_async_db)):
     db_policy = BudgetPolicy(**policy.model_dump())
     db.add(db_policy)
-    db.commit()
-    db.refresh(db_policy)
+    await db.commit()
+    await db.refresh(db_policy)
+    guardrail_engine.put_policy(db_policy)
     return db_policy
 
 
 @router.get("/policies/{customer_id}", response_model=list[PolicyResponse])
-def get_policies(customer_id: str, db: Session = Depends(get_db)):
-    policies = (
-        db.query(BudgetPolicy)
-        .filter(BudgetPolicy.customer_id == customer_id)
+async def get_policies(customer_id: str, db: AsyncSession = Depends(get_async_read_db)):
+    policies = await db.scalars(
+        select(BudgetPolicy)
+        .where(BudgetPolicy.customer_id == customer_id)
         .order_by(BudgetPolicy.created_at.desc())
-        .all()
     )
-    return policies
+    return policies.all()
 
 
 @router.post("/guardrail/evaluate", response_model=GuardrailResult)
-def evaluate(req: GuardrailRequest, db: Session = Depends(get_db)):
-    return evaluate_guardrail(db, req)
+async def evaluate(req: GuardrailRequest, db: AsyncSession = Depends(get_async_read_db)):
+    return await db.run_sync(evaluate_guardrail, req)
+
+
+@router.post("/guardrail/evaluate-batch", response_model=GuardrailBatchResult)
+async def evaluate_batch(batch: GuardrailBatchRequest, db: AsyncSession = Depends(get_async_read_db)):
+    return await db.run_sync(evaluate_guardrail_batch, batch)
@@ -0,0 +1,99 @@
+from typing import Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_async_db, get_async_read_db
+from app.metrics import InstrumentedRoute
+from app.models.model_price import ModelPrice
+from app.models.rerating_job import ReratingJob
+from app.schemas.pricing import ModelPriceCreate, ModelPriceResponse, ReratingRequest, ReratingJobStatus
+from app.services.pricing_service import pricing_catalog
+from app.services.rerating_service import create_job, job_progress, rerating_runner
+
+router = APIRouter(prefix="/pricing", tags=["pricing"], route_class=InstrumentedRoute)
+
+
+def _job_status(job: ReratingJob) -> ReratingJobStatus:
+    return ReratingJobStatus(
+        job_id=job.job_id,
+        status=job.status,
+        start=job.start,
+        end=job.end,
+        model_names=job.model_names.split(",") if job.model_names else None,
+        cursor=job.cursor,
+        progress=job_progress(job),
+        chunks_done=job.chunks_done,
+        rows_updated=job.rows_updated,
+        error=job.error,
+        created_at=job.created_at,
+        heartbeat_at=job.heartbeat_at,
+        finished_at=job.finished_at,
+    )
+
+
+@router.get("/models", response_model=list[ModelPriceResponse])
+async def list_prices(model_name: Optional[str] = None, db: AsyncSession = Depends(get_async_read_db)):
+    query = select(ModelPrice).order_by(ModelPrice.model_name, ModelPrice.effective_from)
+    if model_name:
+        query = query.where(ModelPrice.model_name == model_name)
+    return (await db.scalars(query)).all()
+
+
+@router.post("/models", response_model=ModelPriceResponse, status_code=201)
+async def add_price(price: ModelPriceCreate, db: AsyncSession = Depends(get_async_db)):
+    """Add a price version. Events already stored keep their cost until they are re-rated."""
+    db_price = ModelPrice(**price.model_dump())
+    db.add(db_price)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail=f"{price.model_name} already has a price effective from {price.effective_from.isoformat()}",
+        )
+    await db.refresh(db_price)
+    pricing_catalog.put(db_price)
+    return db_price
+
+
+@router.post("/rerate", response_model=ReratingJobStatus, status_code=202)
+async def start_rerating(req: ReratingRequest, db: AsyncSession = Depends(get_async_db)):
+    try:
+        job = await db.run_sync(create_job, req.start, req.end, req.model_names)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    rerating_runner.submit(job.job_id)
+    return _job_status(job)
+
+
+@router.get("/rerate/{job_id}", response_model=ReratingJobStatus)
+async def get_rerating(job_id: UUID, db: AsyncSession = Depends(get_async_read_db)):
+    job = await db.get(ReratingJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Re-rating job not found")
+    return _job_status(job)
+
+
+@router.post("/rerate/{job_id}/resume", response_model=ReratingJobStatus, status_code=202)
+async def resume_rerating(job_id: UUID, db: AsyncSession = Depends(get_async_db)):
+    """Restart a failed or paused job from its cursor."""
+    job = await db.get(ReratingJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Re-rating job not found")
+    if job.status == "completed":
+        raise HTTPException(status_code=409, detail="Re-rating job already completed")
+    if job.status == "failed":
+        await db.execute(
+            update(ReratingJob)
+            .where(ReratingJob.job_id == job_id, ReratingJob.status == "failed")
+            .values(status="pending", finished_at=None)
+        )
+        await db.commit()
+        await db.refresh(job)
+    rerating_runner.submit(job_id)
+    return _job_status(job)
@@ -1,11 +1,49 @@
-from fastapi import APIRouter
+from dataclasses import asdict
 
-from app.schemas.simulation import WorkflowSimulationRequest, CostBreakdown
-from app.services.cost_calculator import simulate_workflow_cost
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 
-router = APIRouter(prefix="/simulate", tags=["simulation"])
+from app.database import get_async_read_db
+from app.metrics import InstrumentedRoute
+from app.schemas.simulation import (
+    WorkflowSimulationRequest,
+    CostBreakdown,
+    WorkflowSweepRequest,
+    WorkflowSweepResult,
+    SimulationPolicy,
+    TopologySimulationRequest,
+    TopologySimulationResult,
+)
+from app.services.cost_calculator import simulate_workflow_cost, sweep_workflow_cost
+from app.services.guardrail_engine import guardrail_engine
+from app.services.topology_simulator import simulate_topology
+
+router = APIRouter(prefix="/simulate", tags=["simulation"], route_class=InstrumentedRoute)
 
 
 @router.post("/workflow-cost", response_model=CostBreakdown)
 def run_simulation(req: WorkflowSimulationRequest):
     return simulate_workflow_cost(req)
+
+
+@router.post("/sweep", response_model=WorkflowSweepResult)
+def run_sweep(req: WorkflowSweepRequest):
+    try:
+        return sweep_workflow_cost(req)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@router.post("/topology", response_model=TopologySimulationResult)
+async def run_topology_simulation(req: TopologySimulationRequest, db: AsyncSession = Depends(get_async_read_db)):
+    policy = req.policy
+    if policy is None and req.customer_id:
+        snapshot = await db.run_sync(guardrail_engine.get_policy, req.customer_id)
+        if snapshot is None:
+            raise HTTPException(status_code=404, detail=f"No budget policy for customer {req.customer_id}")
+        policy = SimulationPolicy(**asdict(snapshot))
+    try:
+        return await run_in_threadpool(simulate_topology, req, policy)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
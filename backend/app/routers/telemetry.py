@@ -1,23 +1,364 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+import asyncio
+import hashlib
+import time
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Literal, Optional
+from uuid import UUID
 
-from app.database import get_db
-from app.models.execution_event import ExecutionEvent
-from app.schemas.telemetry import ExecutionEventCreate, ExecutionEventResponse, CostSummary
-from app.services.telemetry_service import get_cost_summary
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-router = APIRouter(prefix="/telemetry", tags=["telemetry"])
+from app.config import settings
+from app.database import get_async_analytics_db, get_async_db, get_async_read_db
+from app.schemas.telemetry import (
+    ExecutionEventCreate,
+    ExecutionEventResponse,
+    CostSummary,
+    BulkIngestResult,
+    ExecutionEventAck,
+    IngestBufferStats,
+    PercentileSummary,
+    EventPage,
+    AgentAnomalyRecord,
+)
+from app.serialization import NegotiatedResponse, NegotiatedRoute
+from app.services.anomaly_detector import load_anomalies
+from app.services.event_query_service import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, list_events, parse_fields
+from app.services.export_service import iter_event_batches, encode_ndjson, encode_csv, gzip_stream
+from app.services.guardrail_engine import guardrail_engine
+from app.services.idempotency import recent_keys, stored_event
+from app.services.ingest_buffer import ingest_buffer
+from app.services.ingest_service import (
+    IDEMPOTENT,
+    announce_rows,
+    build_bulk_result,
+    ingest_chunk,
+    ingest_event,
+    new_row,
+)
+from app.services.live_stream import live_cost_hub
+from app.services.summary_cache import summary_cache
+from app.services.telemetry_service import cached_cost_summary, get_percentiles, render_cost_summary
+
+router = APIRouter(prefix="/telemetry", tags=["telemetry"], route_class=NegotiatedRoute)
+
+NDJSON_MEDIA_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+BULK_BODY_ERROR = "Request body must be a JSON or MessagePack array, or NDJSON stream"
+
+
+def _prefers_minimal(prefer: Optional[str]) -> bool:
+    return prefer is not None and "return=minimal" in prefer.replace(" ", "").lower()
+
+
+def _ack(execution_id: UUID, timestamp: datetime, duplicate: bool, status_code: int, headers: dict) -> Response:
+    # Returned as is: an acknowledgement built here needs no response_model validation
+    return NegotiatedResponse(
+        {"execution_id": execution_id, "timestamp": timestamp, "duplicate": duplicate},
+        status_code=status_code,
+        headers=headers,
+    )
+
+
+async def _write_and_announce(db: AsyncSession, write, *args):
+    """Call write(session, *args, announce) through run_sync and announce what it wrote.
+
+    run_sync runs on the event loop thread, so the Redis calls of announcing wait for a worker thread.
+    """
+    announcements = []
+    result = await db.run_sync(write, *args, lambda *announced: announcements.append(announced))
+    for announced in announcements:
+        await run_in_threadpool(announce_rows, *announced)
+    return result
 
 
 @router.post("/execution-event", response_model=ExecutionEventResponse)
-def ingest_execution_event(event: ExecutionEventCreate, db: Session = Depends(get_db)):
-    db_event = ExecutionEvent(**event.model_dump())
-    db.add(db_event)
-    db.commit()
-    db.refresh(db_event)
-    return db_event
+async def ingest_execution_event(
+    event: ExecutionEventCreate,
+    response: Response,
+    prefer: Optional[str] = Header(default=None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Store one event and echo it back; with `Prefer: return=minimal` only an ExecutionEventAck is returned."""
+    try:
+        stored, duplicate = await _write_and_announce(db, ingest_event, event)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if stored is None:
+        raise HTTPException(status_code=409, detail="Duplicate of an event that is no longer stored")
+    headers = {"Idempotent-Replayed": "true"} if duplicate else {}
+    if _prefers_minimal(prefer):
+        if not isinstance(stored, dict):
+            stored = {"execution_id": stored.execution_id, "timestamp": stored.timestamp}
+        headers["Preference-Applied"] = "return=minimal"
+        return _ack(stored["execution_id"], stored["timestamp"], duplicate, 200, headers)
+    response.headers.update(headers)
+    return stored
+
+
+@router.post("/execution-event/async", response_model=ExecutionEventAck, status_code=202)
+async def enqueue_execution_event(event: ExecutionEventCreate, db: AsyncSession = Depends(get_async_db)):
+    customer_id = guardrail_engine.customer_for_workflow(event.workflow_id)
+    if customer_id is None:
+        known = await db.run_sync(guardrail_engine.customers_for_workflows, [event.workflow_id])
+        if not known:
+            raise HTTPException(status_code=422, detail=f"Unknown workflow_id {event.workflow_id}")
+        customer_id = known[event.workflow_id]
+
+    try:
+        row = new_row(event, datetime.utcnow(), customer_id)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if row.get(IDEMPOTENT) and recent_keys.might_contain(row["execution_id"]):
+        stored = await db.run_sync(stored_event, row["execution_id"])
+        if stored is not None:
+            return _ack(stored.execution_id, stored.timestamp, True, 200, {"Idempotent-Replayed": "true"})
+    if not ingest_buffer.enqueue(row):
+        raise HTTPException(status_code=429, detail="Ingest buffer is full", headers={"Retry-After": "1"})
+    await db.run_sync(guardrail_engine.record_spend, [row])
+    return _ack(row["execution_id"], row["timestamp"], False, 202, {})
+
+
+@router.get("/ingest-buffer", response_model=IngestBufferStats)
+def ingest_buffer_stats():
+    return ingest_buffer.stats()
+
+
+async def _iter_record_chunks(request: Request, chunk_size: int) -> AsyncIterator[list[Any]]:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    if content_type in NDJSON_MEDIA_TYPES:
+        chunk: list[Any] = []
+        buffer = b""
+        async for data in request.stream():
+            buffer += data
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    chunk.append(line)
+                    if len(chunk) >= chunk_size:
+                        yield chunk
+                        chunk = []
+        if buffer.strip():
+            chunk.append(buffer)
+        if chunk:
+            yield chunk
+        return
+
+    try:
+        records = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=422, detail=BULK_BODY_ERROR)
+    if not isinstance(records, list):
+        raise HTTPException(status_code=422, detail=BULK_BODY_ERROR)
+    for start in range(0, len(records), chunk_size):
+        yield records[start : start + chunk_size]
+
+
+@router.post("/execution-events/bulk", response_model=BulkIngestResult)
+async def bulk_ingest_execution_events(
+    request: Request,
+    response: Response,
+    prefer: Optional[str] = Header(default=None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Ingest a JSON or MessagePack array, or an NDJSON stream, of events.
+
+    With `Prefer: return=minimal`, results lists only the records that were not accepted.
+    """
+    started = time.perf_counter()
+    results = []
+    chunks = 0
+    async for chunk in _iter_record_chunks(request, settings.ingest_chunk_size):
+        results.extend(await _write_and_announce(db, ingest_chunk, chunk, len(results)))
+        chunks += 1
+    result = build_bulk_result(results, chunks, time.perf_counter() - started)
+    if _prefers_minimal(prefer):
+        result.results = [r for r in result.results if not r.accepted]
+        response.headers["Preference-Applied"] = "return=minimal"
+    return result
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
 
 
 @router.get("/cost-summary", response_model=CostSummary)
-def cost_summary(days: int = Query(default=7, ge=1, le=90), db: Session = Depends(get_db)):
-    return get_cost_summary(db, days=days)
+async def cost_summary(
+    days: int = Query(default=7, ge=1, le=90),
+    customer_id: Optional[str] = None,
+    if_none_match: Optional[str] = Header(default=None),
+    db: AsyncSession = Depends(get_async_analytics_db),
+):
+    # Cache lookups may block on Redis, so they run in a worker thread rather than in run_sync
+    now = datetime.utcnow()
+    key, body = await run_in_threadpool(cached_cost_summary, days, customer_id, now)
+    if body is None:
+        body = await db.run_sync(render_cost_summary, days, customer_id, now)
+        if key is not None:
+            await run_in_threadpool(summary_cache.set, key, body, settings.summary_cache_ttl_s)
+    etag = f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/percentiles", response_model=PercentileSummary)
+async def percentiles(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    group_by: Optional[Literal["agent", "model", "workflow"]] = None,
+    customer_id: Optional[str] = None,
+    workflow_id: Optional[UUID] = None,
+    agent_id: Optional[str] = None,
+    model_name: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_analytics_db),
+):
+    """p50/p95/p99 latency and per-step cost over [start, end), defaulting to the last 24 hours."""
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(hours=24)
+    if start >= end:
+        raise HTTPException(status_code=422, detail="start must be before end")
+    return await db.run_sync(
+        get_percentiles, start, end, group_by, customer_id, workflow_id, agent_id, model_name
+    )
+
+
+@router.get("/events", response_model=EventPage)
+async def query_events(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    customer_id: Optional[str] = None,
+    workflow_id: Optional[UUID] = None,
+    agent_id: Optional[str] = None,
+    model_name: Optional[str] = None,
+    min_cost: Optional[float] = None,
+    min_latency_ms: Optional[int] = None,
+    fields: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    order: Literal["desc", "asc"] = "desc",
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_analytics_db),
+):
+    """A page of raw events, newest first by default; pass next_cursor back to fetch the next one."""
+    try:
+        columns = parse_fields(fields)
+        return await db.run_sync(
+            list_events,
+            start,
+            end,
+            customer_id,
+            workflow_id,
+            agent_id,
+            model_name,
+            min_cost,
+            min_latency_ms,
+            columns,
+            limit,
+            order,
+            cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@router.get("/anomalies", response_model=list[AgentAnomalyRecord])
+async def list_anomalies(
+    since: Optional[datetime] = None,
+    customer_id: Optional[str] = None,
+    workflow_id: Optional[UUID] = None,
+    agent_id: Optional[str] = None,
+    metric: Optional[Literal["cost", "tokens"]] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Per-agent cost and token-rate anomalies raised at ingest, newest first; defaults to the last 24 hours."""
+    since = since or datetime.utcnow() - timedelta(hours=24)
+    return await db.run_sync(load_anomalies, since, customer_id, workflow_id, agent_id, metric, limit)
+
+
+@router.get("/stream")
+async def stream_costs(customer_id: Optional[str] = None):
+    """Server-Sent Events feed of live cost updates (all customers, or one with customer_id)."""
+    sub = await live_cost_hub.subscribe(customer_id)
+
+    async def events():
+        try:
+            while True:
+                try:
+                    payload = await asyncio.wait_for(sub.queue.get(), timeout=settings.live_stream_heartbeat_s)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {payload}\n\n"
+        finally:
+            live_cost_hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/ws")
+async def stream_costs_ws(websocket: WebSocket, customer_id: Optional[str] = None):
+    """WebSocket variant of /stream; each message is one JSON update."""
+    await websocket.accept()
+    sub = await live_cost_hub.subscribe(customer_id)
+
+    async def forward():
+        while True:
+            await websocket.send_text(await sub.queue.get())
+
+    sender = asyncio.create_task(forward())
+    try:
+        # Reading is how a disconnect is noticed; client messages are ignored
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        live_cost_hub.unsubscribe(sub)
+
+
+@router.get("/export")
+def export_events(
+    start: datetime,
+    end: Optional[datetime] = None,
+    customer_id: Optional[str] = None,
+    workflow_id: Optional[UUID] = None,
+    agent_id: Optional[str] = None,
+    model_name: Optional[str] = None,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    compress: bool = False,
+    after_timestamp: Optional[datetime] = None,
+    after_execution_id: Optional[UUID] = None,
+):
+    if (after_timestamp is None) != (after_execution_id is None):
+        raise HTTPException(status_code=422, detail="after_timestamp and after_execution_id must be given together")
+    after = (after_timestamp, after_execution_id) if after_timestamp else None
+
+    batches = iter_event_batches(
+        start,
+        end or datetime.utcnow(),
+        customer_id=customer_id,
+        workflow_id=workflow_id,
+        agent_id=agent_id,
+        model_name=model_name,
+        after=after,
+    )
+    if format == "csv":
+        body, media_type, filename = encode_csv(batches), "text/csv", "execution_events.csv"
+    else:
+        body, media_type, filename = encode_ndjson(batches), "application/x-ndjson", "execution_events.ndjson"
+    if compress:
+        body, media_type, filename = gzip_stream(body), "application/gzip", filename + ".gz"
+
+    return StreamingResponse(
+        body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -39,3 +39,15 @@ class GuardrailResult(BaseModel):
     workflow_budget_limit: float
     cost_pressure: str  # GREEN, AMBER, RED
     spend_velocity: float
+    forecasted_spend: float  # projected spend for the whole UTC day
+    forecast_low: float  # 90% range of the projection; equal to it without a spend profile
+    forecast_high: float
+
+
+class GuardrailBatchRequest(BaseModel):
+    items: list[GuardrailRequest]
+    reserve: bool = False  # count earlier items' execution_cost toward later items' daily spend
+
+
+class GuardrailBatchResult(BaseModel):
+    results: list[GuardrailResult]
@@ -0,0 +1,46 @@
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from pydantic import BaseModel, Field
+
+
+class ModelPriceCreate(BaseModel):
+    model_name: str
+    input_cost_per_1k: float = Field(ge=0)
+    output_cost_per_1k: float = Field(ge=0)
+    effective_from: datetime
+
+
+class ModelPriceResponse(BaseModel):
+    price_id: UUID
+    model_name: str
+    input_cost_per_1k: float
+    output_cost_per_1k: float
+    effective_from: datetime
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class ReratingRequest(BaseModel):
+    start: Optional[datetime] = None  # defaults to the oldest event not yet archived
+    end: Optional[datetime] = None  # defaults to, and is capped at, the start of the current UTC day
+    model_names: Optional[list[str]] = None  # all priced models when unset
+
+
+class ReratingJobStatus(BaseModel):
+    job_id: UUID
+    status: str  # pending, running, completed, failed
+    start: datetime
+    end: datetime
+    model_names: Optional[list[str]]
+    cursor: datetime
+    progress: float  # fraction of the window re-rated
+    chunks_done: int
+    rows_updated: int
+    error: Optional[str]
+    created_at: datetime
+    heartbeat_at: Optional[datetime]
+    finished_at: Optional[datetime]
@@ -0,0 +1,26 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class LoadProfile(BaseModel):
+    customers: int = Field(default=10, ge=1, le=10_000)
+    workflows_per_customer: int = Field(default=5, ge=1, le=1_000)
+    days: int = Field(default=30, ge=1, le=730)
+    events_per_day: int = Field(default=100_000, ge=1, le=50_000_000)
+    weekend_dip: float = Field(default=0.3, ge=0, le=1)  # fraction of weekday volume lost on weekends
+    diurnal_amplitude: float = Field(default=0.6, ge=0, le=1)  # hour-of-day swing around the mean
+    spike_probability: float = Field(default=0.05, ge=0, le=1)  # chance a day has a runaway-agent spike
+    spike_multiplier: float = Field(default=3.0, ge=1)  # spike day volume relative to a normal day
+    seed: Optional[int] = 42
+    chunk_size: int = Field(default=100_000, ge=1_000, le=1_000_000)
+
+
+class LoadGenerationResult(BaseModel):
+    customers: int
+    workflows: int
+    events: int
+    policies: int
+    spike_days: int
+    elapsed_s: float
+    events_per_sec: float
@@ -1,4 +1,47 @@
-from pydantic import BaseModel
+from typing import Literal, Optional, Union
+
+from pydantic import BaseModel, Field, model_validator
+
+
+class Distribution(BaseModel):
+    kind: Literal["fixed", "uniform", "normal", "lognormal", "empirical"] = "fixed"
+    value: Optional[float] = None  # fixed
+    low: Optional[float] = None  # uniform
+    high: Optional[float] = None
+    mean: Optional[float] = None  # normal, lognormal (moments of the variable itself)
+    std: Optional[float] = None
+    samples: Optional[list[float]] = None  # empirical, resampled with replacement
+
+    @model_validator(mode="after")
+    def check_parameters(self):
+        required = {
+            "fixed": ("value",),
+            "uniform": ("low", "high"),
+            "normal": ("mean", "std"),
+            "lognormal": ("mean", "std"),
+            "empirical": ("samples",),
+        }[self.kind]
+        missing = [name for name in required if getattr(self, name) is None]
+        if missing:
+            raise ValueError(f"{self.kind} distribution requires {', '.join(missing)}")
+        if self.kind == "uniform" and self.low > self.high:
+            raise ValueError("uniform distribution requires low <= high")
+        if self.kind in ("normal", "lognormal") and self.std < 0:
+            raise ValueError(f"{self.kind} distribution requires std >= 0")
+        if self.kind == "lognormal" and self.mean <= 0:
+            raise ValueError("lognormal distribution requires mean > 0")
+        if self.kind == "empirical" and not self.samples:
+            raise ValueError("empirical distribution requires at least one sample")
+        return self
+
+
+class MonteCarloConfig(BaseModel):
+    samples: int = Field(default=100_000, ge=1_000, le=1_000_000)
+    seed: Optional[int] = None
+    # Unset distributions fall back to the fixed averages of the request
+    steps_per_agent: Optional[Distribution] = None
+    tokens_per_step: Optional[Distribution] = None
+    tool_calls_per_step: Optional[Distribution] = None
 
 
 class WorkflowSimulationRequest(BaseModel):
@@ -8,6 +51,99 @@ class WorkflowSimulationRequest(BaseModel):
     model_cost_per_1k_tokens: float
     tool_calls_per_step: int = 0
     tool_cost_per_call: float = 0.0
+    runs_per_day: int = 10
+    days_per_month: int = 30
+    monte_carlo: Optional[MonteCarloConfig] = None
+
+
+class MonteCarloResult(BaseModel):
+    samples: int
+    mean_cost_per_workflow: float
+    p50_cost_per_workflow: float
+    p90_cost_per_workflow: float
+    p99_cost_per_workflow: float
+    monthly_projection_mean: float
+    monthly_projection_low: float  # 90% confidence band
+    monthly_projection_high: float
+    elapsed_ms: float
+
+
+class AgentNode(BaseModel):
+    agent_id: str
+    model_name: Optional[str] = None  # informational; pricing comes from model_cost_per_1k_tokens
+    model_cost_per_1k_tokens: float = Field(ge=0)
+    depends_on: list[str] = []  # agents whose output this agent waits for
+    steps: Distribution = Distribution(value=1)  # steps per invocation
+    tokens_per_step: Distribution
+    tool_calls_per_step: Distribution = Distribution(value=0)
+    tool_cost_per_call: float = Field(default=0.0, ge=0)
+    latency_ms_per_step: Distribution = Distribution(value=0)
+    retry_probability: float = Field(default=0.0, ge=0, lt=1)  # a step fails and is attempted again
+    loop_probability: float = Field(default=0.0, ge=0, lt=1)  # the agent runs all its steps again
+
+
+class SimulationPolicy(BaseModel):
+    daily_budget_limit: float
+    workflow_budget_limit: float
+    step_limit_per_agent: int
+
+
+class TopologySimulationRequest(BaseModel):
+    agents: list[AgentNode] = Field(min_length=1, max_length=256)
+    samples: int = Field(default=100_000, ge=1_000, le=1_000_000)
+    seed: Optional[int] = None
+    # Guardrail replay: an inline policy, or the stored policy of customer_id
+    policy: Optional[SimulationPolicy] = None
+    customer_id: Optional[str] = None
+    runs_per_day: int = Field(default=10, ge=1)  # executions sharing one daily budget
+    starting_daily_spend: float = Field(default=0.0, ge=0)
+
+    @model_validator(mode="after")
+    def check_topology(self):
+        ids = [a.agent_id for a in self.agents]
+        if len(set(ids)) != len(ids):
+            raise ValueError("agent_id values must be unique")
+        known = set(ids)
+        for agent in self.agents:
+            unknown = [d for d in agent.depends_on if d not in known]
+            if unknown:
+                raise ValueError(f"Agent {agent.agent_id} depends on unknown agents {', '.join(unknown)}")
+        return self
+
+
+class SampleSummary(BaseModel):
+    mean: float
+    p50: float
+    p90: float
+    p99: float
+    max: float
+
+
+class AgentSimulationStats(BaseModel):
+    agent_id: str
+    mean_cost: float
+    mean_steps: float  # attempts, including retries and loops
+    mean_latency_ms: float
+    critical_path_share: float  # fraction of runs in which the agent is on the critical path
+
+
+class GuardrailOutcomeRates(BaseModel):
+    pass_rate: float
+    warn_rate: float
+    block_rate: float
+    block_workflow_budget_rate: float
+    block_daily_budget_rate: float
+    warn_daily_budget_rate: float
+    warn_step_limit_rate: float
+
+
+class TopologySimulationResult(BaseModel):
+    samples: int
+    cost_per_workflow: SampleSummary
+    latency_ms: SampleSummary  # critical path
+    agents: list[AgentSimulationStats]
+    guardrail: Optional[GuardrailOutcomeRates] = None
+    elapsed_ms: float
 
 
 class CostBreakdown(BaseModel):
@@ -17,3 +153,48 @@ class CostBreakdown(BaseModel):
     monthly_projection: float
     token_cost_per_step: float
     tool_cost_per_step: float
+    monte_carlo: Optional[MonteCarloResult] = None
+
+
+class SweepRange(BaseModel):
+    start: float
+    stop: float  # inclusive
+    step: float = Field(gt=0)
+
+
+SweepAxis = Union[float, list[float], SweepRange]
+
+SWEEP_COLUMNS = Literal[
+    "num_agents",
+    "avg_steps_per_agent",
+    "tokens_per_step",
+    "model_cost_per_1k_tokens",
+    "tool_calls_per_step",
+    "tool_cost_per_call",
+    "runs_per_day",
+    "days_per_month",
+    "cost_per_step",
+    "cost_per_workflow",
+    "monthly_projection",
+]
+
+
+class WorkflowSweepRequest(BaseModel):
+    num_agents: SweepAxis
+    avg_steps_per_agent: SweepAxis
+    tokens_per_step: SweepAxis
+    model_cost_per_1k_tokens: SweepAxis
+    tool_calls_per_step: SweepAxis = 0
+    tool_cost_per_call: SweepAxis = 0.0
+    runs_per_day: SweepAxis = 10
+    days_per_month: SweepAxis = 30
+    max_monthly_projection: Optional[float] = None
+    sort_by: SWEEP_COLUMNS = "monthly_projection"
+    descending: bool = False
+    limit: Optional[int] = Field(default=None, ge=1)
+
+
+class WorkflowSweepResult(BaseModel):
+    grid_size: int
+    matched: int
+    columns: dict[str, list[Union[int, float]]]
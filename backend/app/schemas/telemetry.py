@@ -1,11 +1,14 @@
 from datetime import datetime
-from typing import Optional
+from typing import Any, Optional
 from uuid import UUID
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class ExecutionEventCreate(BaseModel):
+    # Either makes retries safe: events repeating a stored id or key are not stored again
+    execution_id: Optional[UUID] = None
+    idempotency_key: Optional[str] = Field(default=None, min_length=1, max_length=255)  # scoped to the workflow
     workflow_id: UUID
     agent_id: str
     model_name: str
@@ -13,7 +16,7 @@ class ExecutionEventCreate(BaseModel):
     tokens_out: int
     tool_calls: int = 0
     tool_cost_total: float = 0.0
-    execution_cost_total: float
+    execution_cost_total: Optional[float] = None  # only used for models without a catalog price
     latency_ms: Optional[int] = None
     confidence_score: Optional[float] = None
 
@@ -36,6 +39,46 @@ class ExecutionEventResponse(BaseModel):
         from_attributes = True
 
 
+class BulkIngestRecordResult(BaseModel):
+    index: int
+    accepted: bool
+    duplicate: bool = False  # a retry of an event already stored
+    execution_id: Optional[UUID] = None
+    error: Optional[str] = None
+
+
+class BulkIngestResult(BaseModel):
+    accepted: int
+    duplicates: int
+    rejected: int
+    chunks: int
+    elapsed_ms: float
+    events_per_sec: float
+    results: list[BulkIngestRecordResult]
+
+
+class ExecutionEventAck(BaseModel):
+    """Acknowledgement of a queued event, or of a stored one when the client prefers return=minimal."""
+
+    execution_id: UUID
+    timestamp: datetime
+    duplicate: bool = False  # a retry of an event already stored; nothing was written
+
+
+class IngestBufferStats(BaseModel):
+    queue_depth: int
+    queue_capacity: int
+    enqueued: int
+    flushed: int
+    dropped: int
+    duplicates: int
+    rejected_full: int
+    flushes: int
+    last_flush_ms: float
+    avg_flush_ms: float
+    max_flush_ms: float
+
+
 class CostSummary(BaseModel):
     total_cost: float
     total_executions: int
@@ -45,3 +88,51 @@ class CostSummary(BaseModel):
     cost_by_workflow: dict[str, float]
     cost_trend: list[dict]
     spike_detected: bool
+
+
+class PercentileStats(BaseModel):
+    count: int
+    mean: Optional[float]
+    p50: Optional[float]
+    p95: Optional[float]
+    p99: Optional[float]
+
+
+class PercentileGroup(BaseModel):
+    key: Optional[str]
+    latency_ms: PercentileStats
+    cost_per_step: PercentileStats
+
+
+class PercentileSummary(BaseModel):
+    start: datetime
+    end: datetime
+    group_by: Optional[str]
+    relative_accuracy: float
+    overall: PercentileGroup
+    groups: list[PercentileGroup]
+
+
+class EventPage(BaseModel):
+    items: list[dict[str, Any]]
+    next_cursor: Optional[str]
+    limit: int
+    order: str
+
+
+class AgentAnomalyRecord(BaseModel):
+    anomaly_id: UUID
+    detected_at: datetime
+    minute_start: datetime
+    customer_id: Optional[str]
+    workflow_id: UUID
+    agent_id: str
+    metric: str
+    value: float
+    baseline: float
+    baseline_std: float
+    z_score: Optional[float]
+    ratio: Optional[float]
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,161 @@
+"""orjson responses and MessagePack content negotiation.
+
+Responses are rendered with orjson rather than the standard library encoder. Routes built with
+NegotiatedRoute also speak MessagePack: a request body sent as application/msgpack is decoded
+into the same Python values a JSON body would give, so endpoints and their validation are
+unchanged, and a client whose Accept header prefers application/msgpack gets its response
+packed from the values that would otherwise have been rendered as JSON. Error responses stay
+JSON.
+
+msgpack is an optional dependency. Without it, MessagePack request bodies are refused with 415
+and Accept falls back to JSON.
+"""
+
+from contextvars import ContextVar
+from datetime import date, datetime
+from typing import Any, Callable, Optional
+from uuid import UUID
+
+import orjson
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from app.metrics import InstrumentedRoute
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = {MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack"}
+_JSON_RANGES = {"application/json", "application/*", "*/*"}
+
+# Set by NegotiatedRoute for the duration of a request whose client prefers MessagePack
+_msgpack_response: ContextVar[bool] = ContextVar("msgpack_response", default=False)
+
+
+def _msgpack():
+    try:
+        import msgpack  # optional dependency, only needed for MessagePack clients
+    except ImportError:
+        return None
+    return msgpack
+
+
+def _msgpack_default(value: Any) -> Any:
+    # Values that skipped response_model serialization, e.g. minimal ingest acknowledgements
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__} to MessagePack")
+
+
+def _media_type(content_type: Optional[str]) -> str:
+    return (content_type or "").split(";")[0].strip().lower()
+
+
+def prefers_msgpack(accept: Optional[str]) -> bool:
+    """Whether an Accept header ranks MessagePack at least as high as JSON."""
+    if not accept or "msgpack" not in accept:
+        return False
+    msgpack_q = json_q = 0.0
+    for media_range in accept.split(","):
+        media_type, *params = (p.strip() for p in media_range.split(";"))
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        media_type = media_type.lower()
+        if media_type in MSGPACK_MEDIA_TYPES:
+            msgpack_q = max(msgpack_q, q)
+        elif media_type in _JSON_RANGES:
+            json_q = max(json_q, q)
+    return msgpack_q > 0 and msgpack_q >= json_q
+
+
+class NegotiatedResponse(JSONResponse):
+    """JSON rendered with orjson, or MessagePack inside a NegotiatedRoute whose client asked for it."""
+
+    def render(self, content: Any) -> bytes:
+        if _msgpack_response.get():
+            self.media_type = MSGPACK_MEDIA_TYPE
+            return _msgpack().packb(content, default=_msgpack_default)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def render(content: Any, msgpack: bool = False) -> NegotiatedResponse:
+    """Build a NegotiatedResponse outside a route, packed as MessagePack if msgpack is set.
+
+    As in a route, it falls back to JSON when msgpack is not installed.
+    """
+    token = _msgpack_response.set(msgpack and _msgpack() is not None)
+    try:
+        return NegotiatedResponse(content)
+    finally:
+        _msgpack_response.reset(token)
+
+
+class NegotiatedRequest(Request):
+    """Decodes JSON bodies with orjson and MessagePack bodies with msgpack.
+
+    FastAPI only hands JSON content types to request.json(), so a MessagePack request is
+    presented to it as application/json.
+    """
+
+    def __init__(self, scope, receive, msgpack_body: bool = False):
+        if msgpack_body:
+            scope = dict(scope)
+            scope["headers"] = [
+                (name, b"application/json") if name == b"content-type" else (name, value)
+                for name, value in scope["headers"]
+            ]
+        super().__init__(scope, receive)
+        self.msgpack_body = msgpack_body
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            body = await self.body()
+            # Both decoders raise ValueError subclasses on malformed input
+            self._json = _msgpack().unpackb(body) if self.msgpack_body else orjson.loads(body)
+        return self._json
+
+
+def _transcode(response: Response) -> Response:
+    """Repack a response whose endpoint returned prebuilt JSON bytes (e.g. from a cache)."""
+    headers = {k: v for k, v in response.headers.items() if k not in ("content-length", "content-type")}
+    return Response(
+        content=_msgpack().packb(orjson.loads(response.body)),
+        status_code=response.status_code,
+        headers=headers,
+        media_type=MSGPACK_MEDIA_TYPE,
+        background=response.background,
+    )
+
+
+class NegotiatedRoute(InstrumentedRoute):
+    """An instrumented route that accepts and returns MessagePack when the client asks for it."""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def negotiated_handler(request: Request) -> Response:
+            msgpack_body = _media_type(request.headers.get("content-type")) in MSGPACK_MEDIA_TYPES
+            if msgpack_body and _msgpack() is None:
+                raise HTTPException(status_code=415, detail="MessagePack request bodies are not supported")
+            wants_msgpack = prefers_msgpack(request.headers.get("accept")) and _msgpack() is not None
+            token = _msgpack_response.set(wants_msgpack)
+            try:
+                response = await handler(NegotiatedRequest(request.scope, request.receive, msgpack_body))
+            finally:
+                _msgpack_response.reset(token)
+            if (
+                wants_msgpack
+                and response.media_type == "application/json"
+                and not isinstance(response, (NegotiatedResponse, StreamingResponse))
+                and response.body
+            ):
+                response = _transcode(response)
+            response.headers.add_vary_header("Accept")
+            return response
+
+        return negotiated_handler
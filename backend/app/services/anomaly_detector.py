@@ -0,0 +1,218 @@
+"""Online anomaly detection on per-agent cost and token rates.
+
+Ingestion feeds every committed batch to the detector, which keeps O(1) state per
+(customer, workflow, agent): running totals for the current minute, and an exponentially
+weighted mean and variance (EWMA/EWMV) of the per-minute totals of past minutes. Only minutes
+in which the agent was active enter the baseline, so it measures spend per active minute and
+an agent that runs in occasional bursts is not flagged for each burst.
+
+The current minute is checked as events arrive, so a runaway loop is reported within the
+minute it starts. The minute is anomalous once its total exceeds both the mean plus
+z_threshold standard deviations and MIN_RATIO times the mean. The second bound keeps an agent
+with near-constant spend, whose variance is tiny, from being flagged for noise. Each metric of
+a key is flagged at most once per minute. Rows are taken in timestamp order; rows of a minute
+that has already been folded into the baseline (a batch that committed late) are left out
+rather than counted towards the current minute.
+
+State of a key that has seen no events for idle_minutes is dropped, along with its baseline.
+Detector state is kept per worker process, like the guardrail engine's spend counters.
+Anomalies are stored in agent_anomalies and pushed to live-stream subscribers.
+"""
+
+import math
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+from uuid import UUID
+
+import structlog
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.agent_anomaly import AgentAnomaly
+
+log = structlog.get_logger()
+
+METRICS = ("cost", "tokens")
+
+# A minute must also be at least this multiple of the baseline mean to count as anomalous
+MIN_RATIO = 2.0
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def minute_index(ts: datetime) -> int:
+    return int((ts - _EPOCH).total_seconds() // 60)
+
+
+class _RateState:
+    __slots__ = ("minute", "totals", "flagged", "mean", "var", "active_minutes")
+
+    def __init__(self, minute: int):
+        self.minute = minute
+        self.totals = [0.0] * len(METRICS)
+        self.flagged = [False] * len(METRICS)
+        self.mean = [0.0] * len(METRICS)
+        self.var = [0.0] * len(METRICS)
+        self.active_minutes = 0
+
+    def close_minute(self, alpha: float):
+        """Fold the current minute's totals into the baseline."""
+        for i, x in enumerate(self.totals):
+            if self.active_minutes == 0:
+                self.mean[i] = x
+            else:
+                diff = x - self.mean[i]
+                increment = alpha * diff
+                self.mean[i] += increment
+                self.var[i] = (1 - alpha) * (self.var[i] + diff * increment)
+            self.totals[i] = 0.0
+            self.flagged[i] = False
+        self.active_minutes += 1
+
+
+class AnomalyDetector:
+    def __init__(self, alpha: float, z_threshold: float, warmup_minutes: int, idle_minutes: int):
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.warmup_minutes = max(warmup_minutes, 1)
+        self.idle_minutes = max(idle_minutes, 1)
+        self._lock = threading.Lock()
+        self._states: dict[tuple, _RateState] = {}
+        self._last_eviction = 0
+
+    def observe(self, rows: Iterable[dict], now: Optional[datetime] = None) -> list[dict]:
+        """Advance per-agent state with committed event rows; returns any new anomaly records."""
+        now = now or datetime.utcnow()
+        groups: dict[tuple, dict[int, list]] = {}
+        for r in rows:
+            key = (r.get("customer_id"), r["workflow_id"], r["agent_id"])
+            minutes = groups.get(key)
+            if minutes is None:
+                minutes = groups[key] = {}
+            minute = minute_index(r["timestamp"])
+            m = minutes.get(minute)
+            if m is None:
+                m = minutes[minute] = [0.0, 0]
+            m[0] += r["execution_cost_total"]
+            m[1] += r["tokens_in"] + r["tokens_out"]
+
+        anomalies = []
+        with self._lock:
+            for key, minutes in groups.items():
+                state = self._states.get(key)
+                for minute in sorted(minutes):
+                    if state is None:
+                        state = self._states[key] = _RateState(minute)
+                    elif minute > state.minute:
+                        state.close_minute(self.alpha)
+                        state.minute = minute
+                    elif minute < state.minute:
+                        # Already folded into the baseline
+                        continue
+                    cost, tokens = minutes[minute]
+                    state.totals[0] += cost
+                    state.totals[1] += tokens
+                    if state.active_minutes >= self.warmup_minutes:
+                        anomalies.extend(self._check(key, state, now))
+            self._evict_idle(minute_index(now))
+        return anomalies
+
+    def _evict_idle(self, current_minute: int):
+        # At most one sweep per minute keeps the cost per batch O(1) on average
+        if current_minute <= self._last_eviction:
+            return
+        self._last_eviction = current_minute
+        horizon = current_minute - self.idle_minutes
+        for key in [k for k, state in self._states.items() if state.minute < horizon]:
+            del self._states[key]
+
+    def _check(self, key: tuple, state: _RateState, now: datetime) -> list[dict]:
+        found = []
+        for i, metric in enumerate(METRICS):
+            if state.flagged[i]:
+                continue
+            value, mean = state.totals[i], state.mean[i]
+            std = math.sqrt(state.var[i])
+            if value <= max(mean + self.z_threshold * std, mean * MIN_RATIO):
+                continue
+            state.flagged[i] = True
+            customer_id, workflow_id, agent_id = key
+            found.append(
+                {
+                    "anomaly_id": uuid.uuid4(),
+                    "detected_at": now,
+                    "minute_start": _EPOCH + timedelta(minutes=state.minute),
+                    "customer_id": customer_id,
+                    "workflow_id": workflow_id,
+                    "agent_id": agent_id,
+                    "metric": metric,
+                    "value": round(value, 6),
+                    "baseline": round(mean, 6),
+                    "baseline_std": round(std, 6),
+                    "z_score": round((value - mean) / std, 3) if std > 0 else None,
+                    "ratio": round(value / mean, 3) if mean > 0 else None,
+                }
+            )
+        return found
+
+
+def record_anomalies(db: Session, anomalies: list[dict]):
+    """Store anomaly records. The events are already committed, so a failure is logged, not raised."""
+    for a in anomalies:
+        log.warning(
+            "Agent anomaly",
+            customer_id=a["customer_id"],
+            workflow_id=str(a["workflow_id"]),
+            agent_id=a["agent_id"],
+            metric=a["metric"],
+            value=a["value"],
+            baseline=a["baseline"],
+            ratio=a["ratio"],
+        )
+    try:
+        db.execute(insert(AgentAnomaly), anomalies)
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        log.error("Storing anomalies failed", error=str(e), count=len(anomalies))
+
+
+def load_anomalies(
+    db: Session,
+    since: datetime,
+    customer_id: Optional[str] = None,
+    workflow_id: Optional[UUID] = None,
+    agent_id: Optional[str] = None,
+    metric: Optional[str] = None,
+    limit: int = 100,
+) -> list[AgentAnomaly]:
+    """Anomalies detected since the given time, newest first."""
+    query = select(AgentAnomaly).where(AgentAnomaly.detected_at >= since)
+    if customer_id:
+        query = query.where(AgentAnomaly.customer_id == customer_id)
+    if workflow_id:
+        query = query.where(AgentAnomaly.workflow_id == workflow_id)
+    if agent_id:
+        query = query.where(AgentAnomaly.agent_id == agent_id)
+    if metric:
+        query = query.where(AgentAnomaly.metric == metric)
+    return list(db.execute(query.order_by(AgentAnomaly.detected_at.desc()).limit(limit)).scalars())
+
+
+def has_anomaly_since(db: Session, since: datetime, customer_id: Optional[str] = None) -> bool:
+    query = select(AgentAnomaly.anomaly_id).where(AgentAnomaly.detected_at >= since)
+    if customer_id:
+        query = query.where(AgentAnomaly.customer_id == customer_id)
+    return db.execute(query.limit(1)).first() is not None
+
+
+anomaly_detector = AnomalyDetector(
+    settings.anomaly_ewma_alpha,
+    settings.anomaly_z_threshold,
+    settings.anomaly_warmup_minutes,
+    settings.anomaly_idle_minutes,
+)
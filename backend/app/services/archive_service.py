@@ -0,0 +1,309 @@
+"""Tiered retention: raw events past the hot window move to compressed Parquet files on disk.
+
+Each archived day is a directory holding one zstd-compressed Parquet file per customer, rows
+sorted by (timestamp, execution_id):
+
+    <ARCHIVE_DIR>/day=2026-01-31/customer=acme.parquet
+    <ARCHIVE_DIR>/day=2026-01-31/_SUCCESS
+
+A day counts as archived once its _SUCCESS marker exists. The marker is written after every
+file and before the day's rows are deleted from execution_events, so a day is always readable
+from one place or the other. Rollups and sketches of archived days are kept, so summaries and
+percentiles never need the files; exports read them through memory maps.
+
+Every worker runs the archiver, so a run first takes a PostgreSQL advisory lock (a lock file
+in the archive directory on other databases) and is skipped while another worker holds it.
+
+pyarrow is an optional dependency, imported only when archiving runs or archives are read.
+"""
+
+import fcntl
+import os
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Sequence
+from urllib.parse import quote
+from uuid import UUID, uuid4
+
+import structlog
+from sqlalchemy import delete, distinct, func, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.config import settings
+from app.models.execution_event import ExecutionEvent
+from app.services.partition_service import existing_partitions, is_partitioned, partition_name
+
+log = structlog.get_logger()
+
+ARROW_TYPES = {
+    "execution_id": "string",
+    "timestamp": "timestamp",
+    "workflow_id": "string",
+    "customer_id": "string",
+    "agent_id": "string",
+    "model_name": "string",
+    "tokens_in": "int64",
+    "tokens_out": "int64",
+    "tool_calls": "int64",
+    "tool_cost_total": "float64",
+    "execution_cost_total": "float64",
+    "latency_ms": "int64",
+    "confidence_score": "float64",
+}
+ARCHIVE_COLUMNS = tuple(ARROW_TYPES)
+UUID_COLUMNS = ("execution_id", "workflow_id")
+SORT_KEYS = [("timestamp", "ascending"), ("execution_id", "ascending")]
+
+SUCCESS_MARKER = "_SUCCESS"
+NULL_CUSTOMER = "__null__"
+COMPRESSION = "zstd"
+
+# Rows fetched from the database and written to Parquet at a time
+BATCH_ROWS = 50_000
+
+ARCHIVE_LOCK_KEY = 0x6D61735F61726368  # "mas_arch"
+LOCK_FILE = ".archive.lock"
+
+
+def _pyarrow():
+    import pyarrow  # optional dependency, only needed for archiving
+    import pyarrow.compute
+    import pyarrow.parquet
+
+    return pyarrow, pyarrow.compute, pyarrow.parquet
+
+
+def _root(root: Optional[str]) -> Path:
+    return Path(root or settings.archive_dir)
+
+
+def day_dir(root: Path, day: date) -> Path:
+    return root / f"day={day.isoformat()}"
+
+
+def customer_file(directory: Path, customer_id: Optional[str]) -> Path:
+    key = NULL_CUSTOMER if customer_id is None else quote(customer_id, safe="")
+    return directory / f"customer={key}.parquet"
+
+
+def archived_days(root: Optional[str] = None) -> list[date]:
+    """Days whose archive is complete, oldest first."""
+    base = _root(root)
+    if not base.is_dir():
+        return []
+    days = []
+    for entry in base.iterdir():
+        if entry.name.startswith("day=") and (entry / SUCCESS_MARKER).exists():
+            try:
+                days.append(date.fromisoformat(entry.name[len("day=") :]))
+            except ValueError:
+                continue
+    return sorted(days)
+
+
+def archive_horizon(root: Optional[str] = None) -> Optional[datetime]:
+    """Start of the first day after the newest archived one; raw events before it are on disk."""
+    days = archived_days(root)
+    if not days:
+        return None
+    return datetime.combine(days[-1] + timedelta(days=1), datetime.min.time())
+
+
+def _schema():
+    pa, _, _ = _pyarrow()
+    return pa.schema(
+        [
+            (name, pa.timestamp("us") if kind == "timestamp" else pa.type_for_alias(kind))
+            for name, kind in ARROW_TYPES.items()
+        ]
+    )
+
+
+def _to_table(rows: Sequence[tuple], schema):
+    pa, _, _ = _pyarrow()
+    columns = list(zip(*rows))
+    arrays = []
+    for field, values in zip(schema, columns):
+        if field.name in UUID_COLUMNS:
+            values = [str(v) for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _write_customer(path: Path, batches: Iterable[Sequence[tuple]]) -> int:
+    """Write (or merge into) one customer's file for a day, replacing it atomically.
+
+    batches must be sorted by (timestamp, execution_id); each one becomes a row group, so a
+    day is never held in memory whole unless it is merged into an existing file. Returns the
+    number of rows written.
+    """
+    pa, pc, pq = _pyarrow()
+    schema = _schema()
+    # Unique per writer, so a crashed or concurrent run never renames another's half-written file
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{uuid4().hex}.tmp")
+    rows = 0
+    try:
+        if path.exists():
+            # A rerun after an interrupted archive, or events that arrived late for an archived day
+            tables = [_to_table(batch, schema) for batch in batches]
+            table = pa.concat_tables(tables) if tables else schema.empty_table()
+            rows = table.num_rows
+            existing = pq.read_table(path)
+            existing = existing.filter(pc.invert(pc.is_in(existing["execution_id"], value_set=table["execution_id"])))
+            pq.write_table(pa.concat_tables([existing, table]).sort_by(SORT_KEYS), tmp, compression=COMPRESSION)
+        else:
+            with pq.ParquetWriter(tmp, schema, compression=COMPRESSION) as writer:
+                for batch in batches:
+                    writer.write_table(_to_table(batch, schema))
+                    rows += len(batch)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return rows
+
+
+def _delete_day(conn: Connection, day: date, lo: datetime, hi: datetime):
+    # Dropping the day's partition is far cheaper than deleting its rows one by one
+    if is_partitioned(conn) and partition_name(day) in existing_partitions(conn):
+        conn.execute(text(f"DROP TABLE {partition_name(day)}"))
+    conn.execute(delete(ExecutionEvent).where(ExecutionEvent.timestamp >= lo, ExecutionEvent.timestamp < hi))
+
+
+def archive_day(engine: Engine, day: date, root: Optional[str] = None) -> int:
+    """Move one day of raw events into its archive directory; returns the number of rows moved."""
+    directory = day_dir(_root(root), day)
+    lo = datetime.combine(day, datetime.min.time())
+    hi = lo + timedelta(days=1)
+    in_day = (ExecutionEvent.timestamp >= lo, ExecutionEvent.timestamp < hi)
+    moved = 0
+    with engine.begin() as conn:
+        customers = conn.execute(select(distinct(ExecutionEvent.customer_id)).where(*in_day)).scalars().all()
+        if not customers:
+            return 0
+        directory.mkdir(parents=True, exist_ok=True)
+        for customer_id in customers:
+            owned = (
+                ExecutionEvent.customer_id.is_(None)
+                if customer_id is None
+                else ExecutionEvent.customer_id == customer_id
+            )
+            result = conn.execute(
+                select(*(getattr(ExecutionEvent, c) for c in ARCHIVE_COLUMNS))
+                .where(*in_day, owned)
+                .order_by(ExecutionEvent.timestamp, ExecutionEvent.execution_id)
+                .execution_options(yield_per=BATCH_ROWS)
+            )
+            moved += _write_customer(customer_file(directory, customer_id), result.partitions())
+        (directory / SUCCESS_MARKER).touch()
+        _delete_day(conn, day, lo, hi)
+    return moved
+
+
+@contextmanager
+def _exclusive_run(engine: Engine, base: Path) -> Iterator[bool]:
+    """Yield whether this process holds the archive lock; it is released on exit."""
+    if engine.dialect.name == "postgresql":
+        # Released with the transaction, even if the worker dies mid-run
+        with engine.begin() as conn:
+            yield conn.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": ARCHIVE_LOCK_KEY}).scalar()
+        return
+    base.mkdir(parents=True, exist_ok=True)
+    with open(base / LOCK_FILE, "a") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            acquired = False
+        else:
+            acquired = True
+        # Closing the file releases the lock
+        yield acquired
+
+
+def archive_events(engine: Engine, older_than_days: int, root: Optional[str] = None) -> dict:
+    """Archive every day of raw events that ended more than older_than_days days ago, oldest first.
+
+    Does nothing while another process is archiving.
+    """
+    with _exclusive_run(engine, _root(root)) as acquired:
+        if not acquired:
+            log.info("Event archive already running in another process")
+            return {"days": [], "rows": 0}
+        return _archive_before(engine, older_than_days, root)
+
+
+def _archive_before(engine: Engine, older_than_days: int, root: Optional[str]) -> dict:
+    cutoff = datetime.combine(datetime.utcnow().date() - timedelta(days=older_than_days), datetime.min.time())
+    days, rows = [], 0
+    since = datetime.min
+    while True:
+        # Jump straight to the next day that has events, skipping gaps in the history
+        with engine.connect() as conn:
+            oldest = conn.execute(
+                select(func.min(ExecutionEvent.timestamp)).where(
+                    ExecutionEvent.timestamp >= since, ExecutionEvent.timestamp < cutoff
+                )
+            ).scalar()
+        if oldest is None:
+            break
+        day = oldest.date()
+        rows += archive_day(engine, day, root)
+        days.append(day.isoformat())
+        since = datetime.combine(day + timedelta(days=1), datetime.min.time())
+    if days:
+        log.info("Archived execution events", days=days, rows=rows)
+    return {"days": days, "rows": rows}
+
+
+def iter_archive_batches(
+    start: datetime,
+    end: datetime,
+    columns: Sequence[str] = ARCHIVE_COLUMNS,
+    customer_id: Optional[str] = None,
+    workflow_id: Optional[UUID] = None,
+    agent_id: Optional[str] = None,
+    model_name: Optional[str] = None,
+    after: Optional[tuple[datetime, UUID]] = None,
+    batch_size: int = 5000,
+    root: Optional[str] = None,
+) -> Iterator[list[tuple]]:
+    """Yield batches of archived event rows in [start, end), ordered by (timestamp, execution_id).
+
+    Files are memory-mapped and only the requested columns and matching row groups are decoded.
+    UUID columns come back as strings.
+    """
+    base = _root(root)
+    days = [d for d in archived_days(root) if start.date() <= d < end.date() + timedelta(days=1)]
+    if not days:
+        return
+    pa, pc, pq = _pyarrow()
+    filters = [("timestamp", ">=", start), ("timestamp", "<", end)]
+    if workflow_id:
+        filters.append(("workflow_id", "=", str(workflow_id)))
+    if agent_id:
+        filters.append(("agent_id", "=", agent_id))
+    if model_name:
+        filters.append(("model_name", "=", model_name))
+    read_columns = list(dict.fromkeys([*columns, "timestamp", "execution_id"]))
+
+    for day in days:
+        directory = day_dir(base, day)
+        if customer_id is not None:
+            paths = [p for p in [customer_file(directory, customer_id)] if p.exists()]
+        else:
+            paths = sorted(directory.glob("customer=*.parquet"))
+        tables = [pq.read_table(p, columns=read_columns, filters=filters, memory_map=True) for p in paths]
+        if not tables:
+            continue
+        table = pa.concat_tables(tables).sort_by(SORT_KEYS)
+        if after:
+            after_ts, after_id = pa.scalar(after[0], pa.timestamp("us")), str(after[1])
+            ts, ids = table["timestamp"], table["execution_id"]
+            table = table.filter(
+                pc.or_(pc.greater(ts, after_ts), pc.and_(pc.equal(ts, after_ts), pc.greater(ids, after_id)))
+            )
+        table = table.select(list(columns))
+        for batch in table.to_batches(max_chunksize=batch_size):
+            if batch.num_rows:
+                yield list(zip(*(column.to_pylist() for column in batch.columns)))
@@ -1,7 +1,29 @@
-from app.schemas.simulation import WorkflowSimulationRequest, CostBreakdown
+import math
 
-RUNS_PER_DAY = 10
-DAYS_PER_MONTH = 30
+import numpy as np
+
+from app.schemas.simulation import (
+    WorkflowSimulationRequest,
+    CostBreakdown,
+    SweepRange,
+    WorkflowSweepRequest,
+    WorkflowSweepResult,
+)
+from app.services.monte_carlo import run_monte_carlo
+
+MAX_SWEEP_POINTS = 1_000_000
+
+SWEEP_INPUTS = (
+    "num_agents",
+    "avg_steps_per_agent",
+    "tokens_per_step",
+    "model_cost_per_1k_tokens",
+    "tool_calls_per_step",
+    "tool_cost_per_call",
+    "runs_per_day",
+    "days_per_month",
+)
+INTEGER_COLUMNS = {"num_agents", "avg_steps_per_agent", "tokens_per_step", "tool_calls_per_step", "runs_per_day", "days_per_month"}
 
 
 def simulate_workflow_cost(req: WorkflowSimulationRequest) -> CostBreakdown:
@@ -10,7 +32,8 @@ def simulate_workflow_cost(req: WorkflowSimulationRequest) -> CostBreakdown:
     cost_per_step = token_cost_per_step + tool_cost_per_step
     cost_per_agent = cost_per_step * req.avg_steps_per_agent
     cost_per_workflow = cost_per_agent * req.num_agents
-    monthly_projection = cost_per_workflow * RUNS_PER_DAY * DAYS_PER_MONTH
+    runs_per_month = req.runs_per_day * req.days_per_month
+    monthly_projection = cost_per_workflow * runs_per_month
 
     return CostBreakdown(
         cost_per_step=round(cost_per_step, 6),
@@ -19,4 +42,67 @@ def simulate_workflow_cost(req: WorkflowSimulationRequest) -> CostBreakdown:
         monthly_projection=round(monthly_projection, 2),
         token_cost_per_step=round(token_cost_per_step, 6),
         tool_cost_per_step=round(tool_cost_per_step, 6),
+        monte_carlo=run_monte_carlo(req, runs_per_month) if req.monte_carlo else None,
+    )
+
+
+def _axis_values(name: str, axis) -> np.ndarray:
+    if isinstance(axis, SweepRange):
+        # Counted before anything is allocated; stop is included when within half a step
+        span = (axis.stop - axis.start) / axis.step
+        if not math.isfinite(span):
+            raise ValueError(f"Sweep axis {name} is not a finite range")
+        count = math.floor(span + 0.5) + 1
+        if count <= 0:
+            raise ValueError(f"Sweep axis {name} has no values")
+        if count > MAX_SWEEP_POINTS:
+            raise ValueError(f"Sweep axis {name} has more than {MAX_SWEEP_POINTS} values")
+        values = axis.start + np.arange(count) * axis.step
+    else:
+        values = np.atleast_1d(np.asarray(axis, dtype=np.float64))
+    if values.size == 0:
+        raise ValueError(f"Sweep axis {name} has no values")
+    if values.size > MAX_SWEEP_POINTS:
+        raise ValueError(f"Sweep axis {name} has more than {MAX_SWEEP_POINTS} values")
+    return np.rint(values) if name in INTEGER_COLUMNS else values
+
+
+def sweep_workflow_cost(req: WorkflowSweepRequest) -> WorkflowSweepResult:
+    """Evaluate the cost model over the Cartesian grid of all sweep axes in one vectorized pass."""
+    axes = [_axis_values(name, getattr(req, name)) for name in SWEEP_INPUTS]
+    grid_size = int(np.prod([a.size for a in axes], dtype=np.float64))
+    if grid_size > MAX_SWEEP_POINTS:
+        raise ValueError(f"Sweep grid has {grid_size} points, exceeding the limit of {MAX_SWEEP_POINTS}")
+
+    grid = dict(zip(SWEEP_INPUTS, np.meshgrid(*axes, indexing="ij", sparse=True)))
+    cost_per_step = grid["tokens_per_step"] / 1000 * grid["model_cost_per_1k_tokens"] + (
+        grid["tool_calls_per_step"] * grid["tool_cost_per_call"]
+    )
+    cost_per_workflow = cost_per_step * grid["avg_steps_per_agent"] * grid["num_agents"]
+    monthly_projection = cost_per_workflow * grid["runs_per_day"] * grid["days_per_month"]
+
+    shape = monthly_projection.shape
+    columns = {name: np.broadcast_to(values, shape).ravel() for name, values in grid.items()}
+    columns["cost_per_step"] = np.broadcast_to(cost_per_step, shape).ravel().round(6)
+    columns["cost_per_workflow"] = np.broadcast_to(cost_per_workflow, shape).ravel().round(6)
+    columns["monthly_projection"] = monthly_projection.ravel().round(2)
+
+    index = np.arange(grid_size)
+    if req.max_monthly_projection is not None:
+        index = index[columns["monthly_projection"] <= req.max_monthly_projection]
+    order = np.argsort(columns[req.sort_by][index], kind="stable")
+    if req.descending:
+        order = order[::-1]
+    index = index[order]
+    matched = int(index.size)
+    if req.limit is not None:
+        index = index[: req.limit]
+
+    return WorkflowSweepResult(
+        grid_size=grid_size,
+        matched=matched,
+        columns={
+            name: (values[index].astype(np.int64) if name in INTEGER_COLUMNS else values[index]).tolist()
+            for name, values in columns.items()
+        },
     )
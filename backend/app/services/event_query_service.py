@@ -0,0 +1,133 @@
+"""Paged queries over raw execution events.
+
+Pages are walked by keyset on (timestamp, execution_id): each page starts strictly after the
+last row of the previous one, so reaching a deep page costs the same index descent as the
+first, unlike OFFSET, which reads and discards every earlier row. The position is handed to
+clients as an opaque cursor that also pins the sort order and filters it was issued for.
+"""
+
+import base64
+import hashlib
+import json
+from datetime import datetime
+from typing import Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from app.models.execution_event import ExecutionEvent
+from app.schemas.telemetry import EventPage
+from app.services.export_service import EXPORT_COLUMNS
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+KEY_COLUMNS = ("timestamp", "execution_id")
+
+
+def parse_fields(fields: Optional[str]) -> tuple[str, ...]:
+    """Columns named in a comma-separated projection, in export order; all columns if empty."""
+    if not fields:
+        return EXPORT_COLUMNS
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested.difference(EXPORT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(c for c in EXPORT_COLUMNS if c in requested)
+
+
+def _fingerprint(order: str, filters: dict) -> str:
+    canonical = json.dumps([order, filters], sort_keys=True, default=str)
+    return hashlib.sha1(canonical.encode()).hexdigest()[:12]
+
+
+def encode_cursor(timestamp: datetime, execution_id: UUID, fingerprint: str) -> str:
+    raw = json.dumps([timestamp.isoformat(), str(execution_id), fingerprint], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, fingerprint: str) -> tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, execution_id, issued_for = json.loads(raw)
+        position = (datetime.fromisoformat(timestamp), UUID(execution_id))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if issued_for != fingerprint:
+        raise ValueError("Cursor was issued for a different order or filters")
+    return position
+
+
+def list_events(
+    db: Session,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    customer_id: Optional[str] = None,
+    workflow_id: Optional[UUID] = None,
+    agent_id: Optional[str] = None,
+    model_name: Optional[str] = None,
+    min_cost: Optional[float] = None,
+    min_latency_ms: Optional[int] = None,
+    fields: Sequence[str] = EXPORT_COLUMNS,
+    limit: int = DEFAULT_PAGE_SIZE,
+    order: str = "desc",
+    cursor: Optional[str] = None,
+) -> EventPage:
+    """One page of events over [start, end) matching every given filter, ordered by
+    (timestamp, execution_id) in the requested direction.
+
+    Raises ValueError for a cursor that is malformed or was issued for another query.
+    """
+    filters = {
+        "start": start,
+        "end": end,
+        "customer_id": customer_id,
+        "workflow_id": workflow_id,
+        "agent_id": agent_id,
+        "model_name": model_name,
+        "min_cost": min_cost,
+        "min_latency_ms": min_latency_ms,
+    }
+    fingerprint = _fingerprint(order, filters)
+    key = tuple_(ExecutionEvent.timestamp, ExecutionEvent.execution_id)
+    descending = order == "desc"
+
+    # The key columns are always fetched to build the next cursor, and dropped if not requested
+    columns = KEY_COLUMNS + tuple(c for c in fields if c not in KEY_COLUMNS)
+    stmt = select(*(getattr(ExecutionEvent, c) for c in columns))
+    if descending:
+        stmt = stmt.order_by(ExecutionEvent.timestamp.desc(), ExecutionEvent.execution_id.desc())
+    else:
+        stmt = stmt.order_by(ExecutionEvent.timestamp, ExecutionEvent.execution_id)
+    if start:
+        stmt = stmt.where(ExecutionEvent.timestamp >= start)
+    if end:
+        stmt = stmt.where(ExecutionEvent.timestamp < end)
+    if customer_id:
+        stmt = stmt.where(ExecutionEvent.customer_id == customer_id)
+    if workflow_id:
+        stmt = stmt.where(ExecutionEvent.workflow_id == workflow_id)
+    if agent_id:
+        stmt = stmt.where(ExecutionEvent.agent_id == agent_id)
+    if model_name:
+        stmt = stmt.where(ExecutionEvent.model_name == model_name)
+    if min_cost is not None:
+        stmt = stmt.where(ExecutionEvent.execution_cost_total >= min_cost)
+    if min_latency_ms is not None:
+        stmt = stmt.where(ExecutionEvent.latency_ms >= min_latency_ms)
+    if cursor:
+        after = tuple_(*decode_cursor(cursor, fingerprint))
+        stmt = stmt.where(key < after if descending else key > after)
+
+    # One row past the page tells whether another page follows
+    rows = db.execute(stmt.limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return EventPage(
+        items=[{c: row[i] for i, c in enumerate(columns) if c in fields} for row in rows],
+        next_cursor=encode_cursor(rows[-1][0], rows[-1][1], fingerprint) if has_more else None,
+        limit=limit,
+        order=order,
+    )
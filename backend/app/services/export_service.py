@@ -0,0 +1,125 @@
+"""Streaming export of raw execution events as NDJSON or CSV."""
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+from uuid import UUID
+
+from sqlalchemy import select, tuple_
+
+from app.database import analytics_db
+from app.models.execution_event import ExecutionEvent
+from app.services.archive_service import archive_horizon, iter_archive_batches
+
+EXPORT_BATCH_SIZE = 5000
+
+EXPORT_COLUMNS = (
+    "execution_id",
+    "timestamp",
+    "workflow_id",
+    "customer_id",
+    "agent_id",
+    "model_name",
+    "tokens_in",
+    "tokens_out",
+    "tool_calls",
+    "tool_cost_total",
+    "execution_cost_total",
+    "latency_ms",
+    "confidence_score",
+)
+
+
+def iter_event_batches(
+    start: datetime,
+    end: datetime,
+    customer_id: Optional[str] = None,
+    workflow_id: Optional[UUID] = None,
+    agent_id: Optional[str] = None,
+    model_name: Optional[str] = None,
+    after: Optional[tuple[datetime, UUID]] = None,
+) -> Iterator[list[tuple]]:
+    """Yield batches of event rows ordered by (timestamp, execution_id) over a server-side cursor.
+
+    Days before the archive horizon are read from the archive files first. The session is owned
+    by the generator because the response body is streamed after the request's dependencies
+    have been torn down.
+    """
+    horizon = archive_horizon()
+    if horizon and start < horizon:
+        yield from iter_archive_batches(
+            start,
+            min(end, horizon),
+            EXPORT_COLUMNS,
+            customer_id=customer_id,
+            workflow_id=workflow_id,
+            agent_id=agent_id,
+            model_name=model_name,
+            after=after,
+            batch_size=EXPORT_BATCH_SIZE,
+        )
+        if end <= horizon:
+            return
+        start = horizon
+
+    stmt = (
+        select(*(getattr(ExecutionEvent, c) for c in EXPORT_COLUMNS))
+        .where(ExecutionEvent.timestamp >= start, ExecutionEvent.timestamp < end)
+        .order_by(ExecutionEvent.timestamp, ExecutionEvent.execution_id)
+    )
+    if customer_id:
+        stmt = stmt.where(ExecutionEvent.customer_id == customer_id)
+    if workflow_id:
+        stmt = stmt.where(ExecutionEvent.workflow_id == workflow_id)
+    if agent_id:
+        stmt = stmt.where(ExecutionEvent.agent_id == agent_id)
+    if model_name:
+        stmt = stmt.where(ExecutionEvent.model_name == model_name)
+    if after:
+        stmt = stmt.where(tuple_(ExecutionEvent.timestamp, ExecutionEvent.execution_id) > tuple_(*after))
+
+    with analytics_db.session() as db:
+        result = db.execute(stmt, execution_options={"yield_per": EXPORT_BATCH_SIZE})
+        for partition in result.partitions():
+            yield partition
+
+
+def _jsonable(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def encode_ndjson(batches: Iterable[list[tuple]]) -> Iterator[bytes]:
+    for batch in batches:
+        yield "".join(
+            json.dumps({c: _jsonable(v) for c, v in zip(EXPORT_COLUMNS, row)}) + "\n" for row in batch
+        ).encode()
+
+
+def encode_csv(batches: Iterable[list[tuple]], header: bool = True) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    for batch in batches:
+        writer.writerows([_jsonable(v) for v in row] for row in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def gzip_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
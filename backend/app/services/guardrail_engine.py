@@ -0,0 +1,160 @@
+"""In-process guardrail state: cached budget policies and running daily spend per customer.
+
+Policies are cached on first use and replaced when a new policy is created. A periodic
+refresh reloads every customer's latest policy, so policies created through other workers
+are picked up and lookups of customers without a policy are retried. Daily spend is
+reconciled from the database on startup and then advanced by ingestion, so steady-state
+guardrail decisions do not touch the database. Each worker process keeps its own state.
+"""
+
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Iterable, Optional
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.budget_policy import BudgetPolicy
+from app.models.execution_event import ExecutionEvent
+from app.models.workflow import Workflow
+
+
+@dataclass(frozen=True)
+class PolicySnapshot:
+    daily_budget_limit: float
+    workflow_budget_limit: float
+    step_limit_per_agent: int
+
+    @classmethod
+    def from_model(cls, policy: BudgetPolicy) -> "PolicySnapshot":
+        return cls(
+            daily_budget_limit=policy.daily_budget_limit,
+            workflow_budget_limit=policy.workflow_budget_limit,
+            step_limit_per_agent=policy.step_limit_per_agent,
+        )
+
+
+class GuardrailEngine:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._policies: dict[str, Optional[PolicySnapshot]] = {}
+        # Policies put while a refresh is loading, which its result must not overwrite
+        self._puts: dict[str, PolicySnapshot] = {}
+        self._workflow_customers: dict[UUID, str] = {}
+        self._spend: dict[str, float] = {}
+        self._day: date = datetime.utcnow().date()
+
+    def _roll_day(self, now: datetime):
+        if now.date() != self._day:
+            self._day = now.date()
+            self._spend.clear()
+
+    def reconcile(self, db: Session):
+        """Reload policies and today's per-customer spend from the database."""
+        now = datetime.utcnow()
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        self.load_policies(db)
+
+        spend_rows = db.execute(
+            select(ExecutionEvent.customer_id, func.sum(ExecutionEvent.execution_cost_total))
+            .where(ExecutionEvent.timestamp >= today_start, ExecutionEvent.customer_id.is_not(None))
+            .group_by(ExecutionEvent.customer_id)
+        ).all()
+
+        with self._lock:
+            self._day = now.date()
+            self._spend = {customer_id: float(total or 0.0) for customer_id, total in spend_rows}
+
+    def load_policies(self, db: Session):
+        """Replace the cached policies with every customer's latest one, dropping cached misses."""
+        with self._lock:
+            self._puts = {}
+        latest = (
+            select(BudgetPolicy.customer_id, func.max(BudgetPolicy.created_at).label("created_at"))
+            .group_by(BudgetPolicy.customer_id)
+            .subquery()
+        )
+        policies = db.scalars(
+            select(BudgetPolicy).join(
+                latest,
+                (BudgetPolicy.customer_id == latest.c.customer_id) & (BudgetPolicy.created_at == latest.c.created_at),
+            )
+        ).all()
+        snapshots = {p.customer_id: PolicySnapshot.from_model(p) for p in policies}
+        with self._lock:
+            snapshots.update(self._puts)
+            self._policies = snapshots
+
+    def refresh_policies(self, session_factory):
+        with session_factory() as db:
+            self.load_policies(db)
+
+    def get_policy(self, db: Session, customer_id: str) -> Optional[PolicySnapshot]:
+        if customer_id in self._policies:
+            return self._policies[customer_id]
+
+        policy = (
+            db.query(BudgetPolicy)
+            .filter(BudgetPolicy.customer_id == customer_id)
+            .order_by(BudgetPolicy.created_at.desc())
+            .first()
+        )
+        snapshot = PolicySnapshot.from_model(policy) if policy else None
+        with self._lock:
+            self._policies.setdefault(customer_id, snapshot)
+        return snapshot
+
+    def cached_policy(self, customer_id: str) -> Optional[PolicySnapshot]:
+        """Cache-only lookup; use get_policy to load misses."""
+        return self._policies.get(customer_id)
+
+    def put_policy(self, policy: BudgetPolicy):
+        snapshot = PolicySnapshot.from_model(policy)
+        with self._lock:
+            self._policies[policy.customer_id] = snapshot
+            self._puts[policy.customer_id] = snapshot
+
+    def daily_spend(self, customer_id: str) -> float:
+        with self._lock:
+            self._roll_day(datetime.utcnow())
+            return self._spend.get(customer_id, 0.0)
+
+    def customers_for_workflows(self, db: Session, workflow_ids: Iterable[UUID]) -> dict[UUID, str]:
+        workflow_ids = set(workflow_ids)
+        missing = workflow_ids - self._workflow_customers.keys()
+        if missing:
+            rows = db.execute(
+                select(Workflow.workflow_id, Workflow.customer_id).where(Workflow.workflow_id.in_(missing))
+            ).all()
+            with self._lock:
+                self._workflow_customers.update({wf_id: customer_id for wf_id, customer_id in rows})
+        return {wf_id: self._workflow_customers[wf_id] for wf_id in workflow_ids if wf_id in self._workflow_customers}
+
+    def customer_for_workflow(self, workflow_id: UUID) -> Optional[str]:
+        """Cache-only lookup; use customers_for_workflows to load misses."""
+        return self._workflow_customers.get(workflow_id)
+
+    def _apply_spend(self, db: Session, events: list[dict], sign: float):
+        if not events:
+            return
+        customers = self.customers_for_workflows(db, (e["workflow_id"] for e in events))
+        with self._lock:
+            self._roll_day(datetime.utcnow())
+            for e in events:
+                customer_id = customers.get(e["workflow_id"])
+                if customer_id is None or e["timestamp"].date() != self._day:
+                    continue
+                self._spend[customer_id] = self._spend.get(customer_id, 0.0) + sign * e["execution_cost_total"]
+
+    def record_spend(self, db: Session, events: list[dict]):
+        """Add accepted events to the running daily spend of their customers."""
+        self._apply_spend(db, events, 1.0)
+
+    def release_spend(self, db: Session, events: list[dict]):
+        """Undo record_spend for events that were accepted but never written."""
+        self._apply_spend(db, events, -1.0)
+
+
+guardrail_engine = GuardrailEngine()
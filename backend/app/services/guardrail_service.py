@@ -1,50 +1,91 @@
-from datetime import datetime, timedelta
+from datetime import datetime
+from typing import Optional
 
-from sqlalchemy import func
 from sqlalchemy.orm import Session
 
-from app.models.budget_policy import BudgetPolicy
-from app.models.execution_event import ExecutionEvent
-from app.schemas.policy import GuardrailRequest, GuardrailResult
+from app.schemas.policy import GuardrailRequest, GuardrailResult, GuardrailBatchRequest, GuardrailBatchResult
+from app.services.guardrail_engine import PolicySnapshot, guardrail_engine
+from app.services.spend_forecaster import SpendForecast, spend_forecaster
 
+# Share of the daily budget at which guardrails start warning
+WARN_RATIO = 0.8
 
-def evaluate_guardrail(db: Session, req: GuardrailRequest) -> GuardrailResult:
-    policy = (
-        db.query(BudgetPolicy)
-        .filter(BudgetPolicy.customer_id == req.customer_id)
-        .order_by(BudgetPolicy.created_at.desc())
-        .first()
+
+def _no_policy_result() -> GuardrailResult:
+    return GuardrailResult(
+        status="PASS",
+        reason="No policy configured — defaulting to PASS",
+        daily_spend=0.0,
+        daily_budget_limit=0.0,
+        workflow_budget_limit=0.0,
+        cost_pressure="GREEN",
+        spend_velocity=0.0,
+        forecasted_spend=0.0,
+        forecast_low=0.0,
+        forecast_high=0.0,
     )
 
+
+def evaluate_guardrail(db: Session, req: GuardrailRequest) -> GuardrailResult:
+    policy = guardrail_engine.get_policy(db, req.customer_id)
+
     if not policy:
-        return GuardrailResult(
-            status="PASS",
-            reason="No policy configured — defaulting to PASS",
-            daily_spend=0.0,
-            daily_budget_limit=0.0,
-            workflow_budget_limit=0.0,
-            cost_pressure="GREEN",
-            spend_velocity=0.0,
-        )
-
-    # Calculate daily spend
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    daily_spend_result = (
-        db.query(func.coalesce(func.sum(ExecutionEvent.execution_cost_total), 0.0))
-        .filter(
-            ExecutionEvent.timestamp >= today_start,
-        )
-        .scalar()
-    )
-    daily_spend = float(daily_spend_result)
+        return _no_policy_result()
+
+    return decide_guardrail(req, policy, guardrail_engine.daily_spend(req.customer_id))
+
+
+def evaluate_guardrail_batch(db: Session, batch: GuardrailBatchRequest) -> GuardrailBatchResult:
+    policies: dict[str, Optional[PolicySnapshot]] = {}
+    base_spend: dict[str, float] = {}
+    reserved: dict[str, float] = {}
+    results = []
+
+    for req in batch.items:
+        customer_id = req.customer_id
+        if customer_id not in policies:
+            policies[customer_id] = guardrail_engine.get_policy(db, customer_id)
+            base_spend[customer_id] = guardrail_engine.daily_spend(customer_id)
+
+        policy = policies[customer_id]
+        if not policy:
+            results.append(_no_policy_result())
+            continue
+
+        daily_spend = base_spend[customer_id] + reserved.get(customer_id, 0.0)
+        result = decide_guardrail(req, policy, daily_spend)
+
+        if batch.reserve and result.status != "BLOCK":
+            projected = daily_spend + req.execution_cost
+            if projected > policy.daily_budget_limit:
+                result = result.model_copy(
+                    update={
+                        "status": "BLOCK",
+                        "reason": f"Projected daily spend ${projected:.4f} including earlier batch items exceeds daily budget ${policy.daily_budget_limit:.2f}",
+                    }
+                )
+            else:
+                reserved[customer_id] = reserved.get(customer_id, 0.0) + req.execution_cost
+
+        results.append(result)
+
+    return GuardrailBatchResult(results=results)
+
+
+def decide_guardrail(req: GuardrailRequest, policy: PolicySnapshot, daily_spend: float) -> GuardrailResult:
+    now = datetime.utcnow()
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
 
     # Calculate spend velocity (cost per hour today)
-    hours_elapsed = max((datetime.utcnow() - today_start).total_seconds() / 3600, 1)
+    hours_elapsed = max((now - today_start).total_seconds() / 3600, 1)
     spend_velocity = daily_spend / hours_elapsed
 
-    # Forecast remaining daily spend
-    hours_remaining = 24 - hours_elapsed
-    forecasted_spend = daily_spend + (spend_velocity * hours_remaining)
+    # Forecast the day's spend from the customer's hourly profile, or, without enough
+    # history for one, by assuming today's average hourly spend continues
+    forecast = spend_forecaster.forecast(req.customer_id, daily_spend, now)
+    if forecast is None:
+        linear = daily_spend + spend_velocity * (24 - hours_elapsed)
+        forecast = SpendForecast(expected=linear, low=linear, high=linear)
 
     # Evaluate guardrail rules
     status = "PASS"
@@ -56,7 +97,7 @@ def evaluate_guardrail(db: Session, req: GuardrailRequest) -> GuardrailResult:
     elif daily_spend > policy.daily_budget_limit:
         status = "BLOCK"
         reason = f"Daily spend ${daily_spend:.4f} exceeds daily budget ${policy.daily_budget_limit:.2f}"
-    elif daily_spend > policy.daily_budget_limit * 0.8:
+    elif daily_spend > policy.daily_budget_limit * WARN_RATIO:
         status = "WARN"
         reason = f"Daily spend ${daily_spend:.4f} is at {(daily_spend / policy.daily_budget_limit * 100):.0f}% of daily budget"
     elif req.step_count > policy.step_limit_per_agent:
@@ -65,7 +106,7 @@ def evaluate_guardrail(db: Session, req: GuardrailRequest) -> GuardrailResult:
 
     # Cost pressure indicator
     if policy.daily_budget_limit > 0:
-        budget_ratio = forecasted_spend / policy.daily_budget_limit
+        budget_ratio = forecast.expected / policy.daily_budget_limit
         if budget_ratio >= 1.0:
             cost_pressure = "RED"
         elif budget_ratio >= 0.7:
@@ -83,4 +124,16 @@ def evaluate_guardrail(db: Session, req: GuardrailRequest) -> GuardrailResult:
         workflow_budget_limit=policy.workflow_budget_limit,
         cost_pressure=cost_pressure,
         spend_velocity=round(spend_velocity, 4),
+        forecasted_spend=round(forecast.expected, 4),
+        forecast_low=round(forecast.low, 4),
+        forecast_high=round(forecast.high, 4),
     )
+
+
+def budget_status(policy: PolicySnapshot, daily_spend: float) -> str:
+    """Daily-budget status of a customer, independent of any single execution."""
+    if daily_spend > policy.daily_budget_limit:
+        return "BLOCK"
+    if daily_spend > policy.daily_budget_limit * WARN_RATIO:
+        return "WARN"
+    return "PASS"
@@ -0,0 +1,140 @@
+"""Deduplication of retried events.
+
+Clients make ingestion retry-safe by sending their own execution_id, or an idempotency_key
+that is mapped to a deterministic execution_id within its workflow. Such ids are claimed in
+ingest_keys with INSERT ... ON CONFLICT DO NOTHING in the transaction that stores the event,
+so an id is stored once however many workers receive it. Keys are kept for
+IDEMPOTENCY_WINDOW_HOURS; a retry arriving later is stored again.
+
+Each worker also keeps the ids it has seen in a time-windowed Bloom filter. A miss is certain,
+so the paths that must decide before writing (the single-event endpoint and the write-behind
+queue, which counts spend at enqueue) skip the database for new ids and only look up ids the
+filter has probably seen.
+"""
+
+import hashlib
+import math
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+from uuid import UUID
+
+from sqlalchemy import and_, delete, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import dialect_insert
+from app.models.execution_event import ExecutionEvent
+from app.models.ingest_key import IngestKey
+
+# Namespace of the uuid5 ids derived from idempotency keys
+IDEMPOTENCY_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "mas-economics/idempotency-key")
+
+
+def key_to_execution_id(workflow_id: UUID, idempotency_key: str) -> UUID:
+    return uuid.uuid5(IDEMPOTENCY_NAMESPACE, f"{workflow_id}/{idempotency_key}")
+
+
+class RecentKeyFilter:
+    """Bloom filter over the ids seen in the last window_s seconds.
+
+    The window is split into `generations` slices with a bit array each. Ids are added to the
+    current slice and looked up in every live one; a slice that ages out is cleared and reused,
+    so ids are remembered for between (generations - 1) / generations of the window and all of
+    it. A lookup can hit in any live slice, so each is sized for its share of `capacity` ids at
+    error_rate / generations false positives.
+    """
+
+    def __init__(self, window_s: float, capacity: int, error_rate: float = 0.01, generations: int = 4):
+        per_slice = max(capacity // generations, 1)
+        slice_error_rate = error_rate / generations
+        self.bits = max(int(-per_slice * math.log(slice_error_rate) / math.log(2) ** 2), 64)
+        self.hashes = max(round(self.bits / per_slice * math.log(2)), 1)
+        self.slice_s = window_s / generations
+        self._arrays = [bytearray((self.bits + 7) // 8) for _ in range(generations)]
+        self._slots: list[Optional[int]] = [None] * generations  # time slice each array holds
+        self._lock = threading.Lock()
+
+    def _positions(self, key: UUID) -> list[int]:
+        # Client ids may be sequential (e.g. UUIDv7), so they are hashed rather than used as bits
+        digest = hashlib.blake2b(key.bytes, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def _current(self, now: float) -> tuple[int, int]:
+        slot = int(now // self.slice_s)
+        i = slot % len(self._arrays)
+        if self._slots[i] != slot:
+            self._arrays[i] = bytearray(len(self._arrays[i]))
+            self._slots[i] = slot
+        return i, slot
+
+    def add(self, keys: Iterable[UUID], now: Optional[float] = None):
+        positions = [self._positions(k) for k in keys]
+        with self._lock:
+            i, _ = self._current(time.time() if now is None else now)
+            array = self._arrays[i]
+            for key_positions in positions:
+                for p in key_positions:
+                    array[p >> 3] |= 1 << (p & 7)
+
+    def might_contain(self, key: UUID, now: Optional[float] = None) -> bool:
+        positions = self._positions(key)
+        with self._lock:
+            _, slot = self._current(time.time() if now is None else now)
+            oldest = slot - len(self._arrays) + 1
+            for array, held in zip(self._arrays, self._slots):
+                if held is None or held < oldest:
+                    continue
+                if all(array[p >> 3] & (1 << (p & 7)) for p in positions):
+                    return True
+        return False
+
+
+def claim_keys(db: Session, rows: list[dict]) -> set[UUID]:
+    """Claim the rows' execution_ids in the current transaction; returns the ids that were free.
+
+    Ids already claimed, by an earlier request or another worker, are left out.
+    """
+    values = {}
+    for r in rows:
+        values.setdefault(r["execution_id"], r["timestamp"])
+    if not values:
+        return set()
+    stmt = (
+        dialect_insert(db, IngestKey)
+        .on_conflict_do_nothing(index_elements=["execution_id"])
+        .returning(IngestKey.execution_id)
+    )
+    # Claiming in a fixed order keeps concurrent batches with overlapping ids from deadlocking
+    params = [{"execution_id": k, "timestamp": values[k]} for k in sorted(values)]
+    return set(db.execute(stmt, params).scalars())
+
+
+def stored_event(db: Session, execution_id: UUID) -> Optional[ExecutionEvent]:
+    """The event stored under a claimed id, found through its key's timestamp."""
+    return db.execute(
+        select(ExecutionEvent)
+        .join(
+            IngestKey,
+            and_(
+                IngestKey.execution_id == ExecutionEvent.execution_id,
+                IngestKey.timestamp == ExecutionEvent.timestamp,
+            ),
+        )
+        .where(IngestKey.execution_id == execution_id)
+    ).scalar_one_or_none()
+
+
+def prune_keys(engine: Engine, window_hours: int) -> int:
+    """Forget ids claimed before the idempotency window."""
+    cutoff = datetime.utcnow() - timedelta(hours=window_hours)
+    with engine.begin() as conn:
+        return conn.execute(delete(IngestKey).where(IngestKey.timestamp < cutoff)).rowcount
+
+
+recent_keys = RecentKeyFilter(settings.idempotency_window_hours * 3600, settings.idempotency_filter_capacity)
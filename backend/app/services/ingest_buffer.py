@@ -0,0 +1,161 @@
+"""Write-behind buffer for fire-and-forget event ingestion.
+
+Events are queued in a bounded asyncio queue and written by a background flusher in
+batches bounded by size or time window. Spend is recorded with the guardrail engine at
+enqueue time, so guardrail decisions see buffered events before they are committed.
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+import structlog
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config import settings
+from app.database import SessionLocal
+from app.schemas.telemetry import IngestBufferStats
+from app.services.guardrail_engine import guardrail_engine
+from app.services.ingest_service import write_rows
+
+log = structlog.get_logger()
+
+_STOP = object()
+
+
+class IngestBuffer:
+    def __init__(self, maxsize: int, batch_size: int, flush_interval_ms: int):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        self.enqueued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.duplicates = 0
+        self.rejected_full = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop accepting events and flush everything still queued."""
+        if self._task is None:
+            return
+        self._closing = True
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        log.info("Ingest buffer drained", flushed=self.flushed, dropped=self.dropped)
+
+    def enqueue(self, row: dict) -> bool:
+        """Queue a prepared event row; returns False when the buffer is full or closed."""
+        if self._queue is None or self._closing:
+            return False
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.rejected_full += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            batch = []
+            if item is _STOP:
+                stopping = True
+            else:
+                batch.append(item)
+                deadline = loop.time() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+            if stopping:
+                while not self._queue.empty():
+                    item = self._queue.get_nowait()
+                    if item is not _STOP:
+                        batch.append(item)
+            for start in range(0, len(batch), self.batch_size):
+                await self._flush(batch[start : start + self.batch_size])
+
+    async def _flush(self, batch: list[dict]):
+        if not batch:
+            return
+        started = time.perf_counter()
+        try:
+            duplicates = await run_in_threadpool(_write_batch, batch)
+        except SQLAlchemyError as e:
+            self.dropped += len(batch)
+            log.error("Ingest buffer flush failed", events=len(batch), error=str(e))
+        except Exception:
+            # Anything else must not end the flusher, or the queue would fill up for good
+            self.dropped += len(batch)
+            log.exception("Ingest buffer flush failed", events=len(batch))
+        else:
+            self.flushed += len(batch) - duplicates
+            self.duplicates += duplicates
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.flushes += 1
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+    def stats(self) -> IngestBufferStats:
+        return IngestBufferStats(
+            queue_depth=self._queue.qsize() if self._queue else 0,
+            queue_capacity=self.maxsize,
+            enqueued=self.enqueued,
+            flushed=self.flushed,
+            dropped=self.dropped,
+            duplicates=self.duplicates,
+            rejected_full=self.rejected_full,
+            flushes=self.flushes,
+            last_flush_ms=round(self.last_flush_ms, 3),
+            avg_flush_ms=round(self._total_flush_ms / self.flushes, 3) if self.flushes else 0.0,
+            max_flush_ms=round(self.max_flush_ms, 3),
+        )
+
+
+def _write_batch(batch: list[dict]) -> int:
+    """Write a batch; returns the number of events skipped as retries of stored ones."""
+    with SessionLocal() as db:
+        try:
+            written = {id(r) for r in write_rows(db, batch, record_spend=False)}
+        except Exception:
+            # The spend was counted at enqueue; take it back for events counted as dropped
+            guardrail_engine.release_spend(db, batch)
+            raise
+        duplicates = [r for r in batch if id(r) not in written]
+        if duplicates:
+            guardrail_engine.release_spend(db, duplicates)
+        return len(duplicates)
+
+
+ingest_buffer = IngestBuffer(
+    maxsize=settings.ingest_queue_size,
+    batch_size=settings.ingest_flush_batch_size,
+    flush_interval_ms=settings.ingest_flush_interval_ms,
+)
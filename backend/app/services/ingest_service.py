@@ -0,0 +1,205 @@
+"""Bulk ingestion of execution events using chunked multi-row inserts."""
+
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Iterable, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.models.execution_event import ExecutionEvent
+from app.schemas.telemetry import ExecutionEventCreate, BulkIngestRecordResult, BulkIngestResult
+from app.services.anomaly_detector import anomaly_detector, record_anomalies
+from app.services.guardrail_engine import guardrail_engine
+from app.services.idempotency import claim_keys, key_to_execution_id, recent_keys, stored_event
+from app.services.live_stream import live_cost_hub
+from app.services.pricing_service import pricing_catalog
+from app.services.rollup_service import apply_rollups
+from app.services.summary_cache import invalidate_events
+
+# Marks rows whose execution_id came from the client; removed before the row is written
+IDEMPOTENT = "_idempotent"
+
+
+def ingest_event(
+    db: Session, event: ExecutionEventCreate, announce: Optional[Callable] = None
+) -> tuple[Optional[Any], bool]:
+    """Store one event; returns the event and whether it was a retry of one already stored.
+
+    The stored event of a retry is None if it has since been archived. announce is passed on
+    to write_rows.
+    """
+    customer_id = guardrail_engine.customers_for_workflows(db, [event.workflow_id]).get(event.workflow_id)
+    row = new_row(event, datetime.utcnow(), customer_id)
+    if row.get(IDEMPOTENT) and recent_keys.might_contain(row["execution_id"]):
+        stored = stored_event(db, row["execution_id"])
+        if stored is not None:
+            return stored, True
+    if write_rows(db, [row], announce=announce):
+        return row, False
+    return stored_event(db, row["execution_id"]), True
+
+
+def new_row(event: ExecutionEventCreate, timestamp: datetime, customer_id: Optional[str]) -> dict:
+    """Build an event row, pricing it from the catalog.
+
+    The client's execution_cost_total is used only for models the catalog has no price for;
+    raises ValueError if there is neither. A client-assigned execution_id, or one derived from
+    the idempotency_key, marks the row for deduplication.
+    """
+    row = event.model_dump(exclude={"idempotency_key"})
+    cost = pricing_catalog.cost(event.model_name, event.tokens_in, event.tokens_out, event.tool_cost_total, timestamp)
+    if cost is None:
+        if event.execution_cost_total is None:
+            raise ValueError(f"No price for model {event.model_name}; execution_cost_total is required")
+        cost = event.execution_cost_total
+    row["execution_cost_total"] = cost
+    if event.execution_id is None and event.idempotency_key is not None:
+        row["execution_id"] = key_to_execution_id(event.workflow_id, event.idempotency_key)
+    if row["execution_id"] is None:
+        row["execution_id"] = uuid.uuid4()
+    else:
+        row[IDEMPOTENT] = True
+    row["customer_id"] = customer_id
+    row["timestamp"] = timestamp
+    return row
+
+
+def write_rows(
+    db: Session, rows: list[dict], record_spend: bool = True, announce: Optional[Callable] = None
+) -> list[dict]:
+    """Insert prepared event rows and their rollups in one transaction; returns the rows written.
+
+    Rows with a client-assigned execution_id that is already claimed, or repeated within the
+    batch, are retries of a stored event and are skipped.
+    Pass record_spend=False when the rows' spend was already counted (e.g. at enqueue time).
+    The written rows and their anomalies are handed to announce, announce_rows by default;
+    callers on the event loop pass a callback that defers it to a worker thread.
+    """
+    keyed = [r for r in rows if r.pop(IDEMPOTENT, False)]
+    try:
+        if keyed:
+            rows = _drop_duplicates(rows, keyed, claim_keys(db, keyed))
+        if rows:
+            db.execute(insert(ExecutionEvent), rows)
+            apply_rollups(db, rows)
+        db.commit()
+    except SQLAlchemyError:
+        db.rollback()
+        raise
+    if keyed:
+        recent_keys.add({r["execution_id"] for r in keyed})
+    if not rows:
+        return rows
+    anomalies = anomaly_detector.observe(rows)
+    if anomalies:
+        record_anomalies(db, anomalies)
+    if record_spend:
+        guardrail_engine.record_spend(db, rows)
+    (announce or announce_rows)(rows, anomalies)
+    return rows
+
+
+def announce_rows(rows: list[dict], anomalies: Iterable[dict] = ()):
+    """Invalidate cached summaries and publish committed events to live streams.
+
+    Both may block on Redis, so this must not run on the event loop.
+    """
+    invalidate_events(rows)
+    live_cost_hub.publish(rows, anomalies)
+
+
+def _drop_duplicates(rows: list[dict], keyed: list[dict], claimed: set) -> list[dict]:
+    keyed_rows = {id(r) for r in keyed}
+    written, seen = [], set()
+    for r in rows:
+        if id(r) in keyed_rows:
+            if r["execution_id"] not in claimed or r["execution_id"] in seen:
+                continue
+            seen.add(r["execution_id"])
+        written.append(r)
+    return written
+
+
+def _format_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in err['loc']) or 'body'}: {err['msg']}" for err in exc.errors()
+    )
+
+
+def _parse_record(raw: Any) -> ExecutionEventCreate:
+    # NDJSON lines arrive as raw bytes and are validated straight from JSON
+    if isinstance(raw, (bytes, str)):
+        return ExecutionEventCreate.model_validate_json(raw)
+    return ExecutionEventCreate.model_validate(raw)
+
+
+def ingest_chunk(
+    db: Session, records: list[Any], offset: int = 0, announce: Optional[Callable] = None
+) -> list[BulkIngestRecordResult]:
+    """Validate a chunk of records and write the valid ones in a single transaction.
+
+    Records that repeat a stored event's execution_id or idempotency_key are reported as duplicates.
+    announce is passed on to write_rows.
+    """
+    results: list[BulkIngestRecordResult] = []
+    valid: list[tuple[int, ExecutionEventCreate]] = []
+
+    for i, raw in enumerate(records):
+        try:
+            valid.append((offset + i, _parse_record(raw)))
+        except ValidationError as e:
+            results.append(
+                BulkIngestRecordResult(index=offset + i, accepted=False, error=_format_validation_error(e))
+            )
+
+    known_workflows = guardrail_engine.customers_for_workflows(db, (event.workflow_id for _, event in valid))
+
+    timestamp = datetime.utcnow()
+    rows = []
+    accepted: list[BulkIngestRecordResult] = []
+    for index, event in valid:
+        if event.workflow_id not in known_workflows:
+            results.append(
+                BulkIngestRecordResult(index=index, accepted=False, error=f"Unknown workflow_id {event.workflow_id}")
+            )
+            continue
+        try:
+            row = new_row(event, timestamp, known_workflows[event.workflow_id])
+        except ValueError as e:
+            results.append(BulkIngestRecordResult(index=index, accepted=False, error=str(e)))
+            continue
+        rows.append(row)
+        accepted.append(BulkIngestRecordResult(index=index, accepted=True, execution_id=row["execution_id"]))
+
+    if rows:
+        try:
+            written = {id(r) for r in write_rows(db, rows, announce=announce)}
+        except SQLAlchemyError as e:
+            error = f"Database error: {e.__class__.__name__}"
+            accepted = [BulkIngestRecordResult(index=r.index, accepted=False, error=error) for r in accepted]
+        else:
+            for result, row in zip(accepted, rows):
+                if id(row) not in written:
+                    result.accepted = False
+                    result.duplicate = True
+
+    results.extend(accepted)
+    results.sort(key=lambda r: r.index)
+    return results
+
+
+def build_bulk_result(results: list[BulkIngestRecordResult], chunks: int, elapsed_s: float) -> BulkIngestResult:
+    accepted = sum(1 for r in results if r.accepted)
+    duplicates = sum(1 for r in results if r.duplicate)
+    return BulkIngestResult(
+        accepted=accepted,
+        duplicates=duplicates,
+        rejected=len(results) - accepted - duplicates,
+        chunks=chunks,
+        elapsed_ms=round(elapsed_s * 1000, 3),
+        events_per_sec=round(accepted / elapsed_s, 1) if elapsed_s > 0 else 0.0,
+        results=results,
+    )
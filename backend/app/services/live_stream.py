@@ -0,0 +1,344 @@
+"""Live cost updates pushed to dashboards over SSE and WebSocket.
+
+Ingestion publishes a compact aggregate of every committed batch, along with any agent
+anomalies the batch raised. The hub folds those into
+per-scope state (all customers, or one customer) and, at most max_updates_per_s times a
+second, serializes one update per changed scope and hands the same payload to each of its
+subscribers. Per-subscriber work is a single queue put, so thousands of open dashboards
+cost little more than one. Slow subscribers drop their oldest queued updates; every update
+carries absolute totals and a sequence number, so clients can detect the gap and carry on.
+
+With the Redis broker, batches are published to a channel and every worker's hub consumes
+them, so subscribers see events ingested by any worker.
+"""
+
+import asyncio
+import json
+import threading
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Iterable, Optional
+
+import structlog
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database import read_db
+from app.services.guardrail_engine import guardrail_engine
+from app.services.guardrail_service import budget_status
+from app.services.rollup_service import day_bucket, load_hourly_totals
+
+log = structlog.get_logger()
+
+GLOBAL_SCOPE = "all"
+
+
+def scope_for(customer_id: Optional[str]) -> str:
+    return f"customer:{customer_id}" if customer_id else GLOBAL_SCOPE
+
+
+def aggregate_rows(rows: Iterable[dict]) -> list[list]:
+    """Collapse event rows into [customer_id, workflow_id, agent_id, cost, executions, tokens] groups."""
+    groups: dict[tuple, list] = {}
+    for r in rows:
+        key = (r.get("customer_id"), str(r["workflow_id"]), r["agent_id"])
+        g = groups.get(key)
+        if g is None:
+            g = groups[key] = [*key, 0.0, 0, 0]
+        g[3] += r["execution_cost_total"]
+        g[4] += 1
+        g[5] += r["tokens_in"] + r["tokens_out"]
+    return list(groups.values())
+
+
+def anomaly_alert(anomaly: dict) -> dict:
+    return {
+        "kind": "anomaly",
+        "customer_id": anomaly["customer_id"],
+        "workflow_id": str(anomaly["workflow_id"]),
+        "agent_id": anomaly["agent_id"],
+        "metric": anomaly["metric"],
+        "minute_start": anomaly["minute_start"].isoformat(),
+        "value": anomaly["value"],
+        "baseline": anomaly["baseline"],
+        "ratio": anomaly["ratio"],
+        "z_score": anomaly["z_score"],
+    }
+
+
+class Subscription:
+    def __init__(self, scope: str, maxsize: int):
+        self.scope = scope
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def offer(self, payload: str):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(payload)
+
+
+@dataclass
+class _ScopeState:
+    day: date
+    hourly_cost: dict[int, float]
+    executions: int
+    tokens: int
+    subscribers: set = field(default_factory=set)
+    seq: int = 0
+    pending: bool = False
+    delta_cost: float = 0.0
+    delta_executions: int = 0
+    delta_tokens: int = 0
+    delta_by_agent: dict[str, float] = field(default_factory=dict)
+    delta_by_workflow: dict[str, float] = field(default_factory=dict)
+    guardrail: list[dict] = field(default_factory=list)
+    alerts: list[dict] = field(default_factory=list)
+
+    @property
+    def cost(self) -> float:
+        return sum(self.hourly_cost.values())
+
+    def totals(self, now: datetime) -> dict:
+        return {
+            "date": self.day.isoformat(),
+            "cost": round(self.cost, 4),
+            "executions": self.executions,
+            "tokens": self.tokens,
+            "current_hour_cost": round(self.hourly_cost.get(now.hour, 0.0), 4),
+        }
+
+    def roll_day(self, now: datetime):
+        if now.date() != self.day:
+            self.day = now.date()
+            self.hourly_cost = {}
+            self.executions = self.tokens = 0
+
+    def fold(self, group: list, hour: int):
+        _, workflow_id, agent_id, cost, executions, tokens = group
+        self.hourly_cost[hour] = self.hourly_cost.get(hour, 0.0) + cost
+        self.executions += executions
+        self.tokens += tokens
+        self.delta_cost += cost
+        self.delta_executions += executions
+        self.delta_tokens += tokens
+        self.delta_by_agent[agent_id] = self.delta_by_agent.get(agent_id, 0.0) + cost
+        self.delta_by_workflow[workflow_id] = self.delta_by_workflow.get(workflow_id, 0.0) + cost
+        self.pending = True
+
+    def take_update(self, scope: str, now: datetime) -> dict:
+        self.seq += 1
+        update = {
+            "type": "update",
+            "scope": scope,
+            "seq": self.seq,
+            "at": now.isoformat(),
+            "totals": self.totals(now),
+            "delta": {
+                "cost": round(self.delta_cost, 6),
+                "executions": self.delta_executions,
+                "tokens": self.delta_tokens,
+                "by_agent": {k: round(v, 6) for k, v in self.delta_by_agent.items()},
+                "by_workflow": {k: round(v, 6) for k, v in self.delta_by_workflow.items()},
+            },
+            "guardrail": self.guardrail,
+            "alerts": self.alerts,
+        }
+        self.pending = False
+        self.delta_cost = 0.0
+        self.delta_executions = self.delta_tokens = 0
+        self.delta_by_agent = {}
+        self.delta_by_workflow = {}
+        self.guardrail = []
+        self.alerts = []
+        return update
+
+
+class InProcessBroker:
+    def __init__(self):
+        self.deliver = None
+
+    def start(self, deliver):
+        self.deliver = deliver
+
+    def stop(self):
+        self.deliver = None
+
+    def publish(self, message: dict):
+        if self.deliver is not None:
+            self.deliver(message)
+
+
+class RedisBroker:
+    """Fan batches out to every worker through a Redis pub/sub channel."""
+
+    def __init__(self, url: str, channel: str = "mas:live-costs"):
+        import redis  # optional dependency, only needed for this backend
+
+        self._redis = redis.Redis.from_url(url)
+        self._errors = (redis.RedisError,)
+        self.channel = channel
+        self._pubsub = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, deliver):
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{self.channel: lambda message: deliver(json.loads(message["data"]))})
+        self._thread = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def stop(self):
+        if self._thread is not None:
+            self._thread.stop()
+            self._thread = None
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
+
+    def publish(self, message: dict):
+        try:
+            self._redis.publish(self.channel, json.dumps(message))
+        except self._errors as e:
+            log.warning("Live cost publish failed", error=str(e))
+
+
+class LiveCostHub:
+    def __init__(self, broker, max_updates_per_s: float, queue_size: int):
+        self.broker = broker
+        self.interval = 1 / max_updates_per_s
+        self.queue_size = queue_size
+        self._scopes: dict[str, _ScopeState] = {}
+        self._statuses: dict[str, str] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self.broker.start(self._deliver)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self.broker.stop()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._loop = None
+
+    def publish(self, rows: list[dict], anomalies: Iterable[dict] = ()):
+        """Announce committed events; safe to call from any thread, a no-op while stopped."""
+        if self._loop is None or not rows:
+            return
+        self.broker.publish({"groups": aggregate_rows(rows), "alerts": [anomaly_alert(a) for a in anomalies]})
+
+    def _deliver(self, message: dict):
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._fold, message)
+
+    def _fold(self, message: dict):
+        if not self._scopes:
+            return
+        now = datetime.utcnow()
+        everyone = self._scopes.get(GLOBAL_SCOPE)
+        touched = set()
+        for group in message["groups"]:
+            customer_id = group[0]
+            touched.add(customer_id)
+            own = self._scopes.get(scope_for(customer_id)) if customer_id else None
+            for state in (everyone, own):
+                if state is not None:
+                    state.roll_day(now)
+                    state.fold(group, now.hour)
+        for customer_id in touched:
+            if customer_id:
+                self._check_guardrail(customer_id, everyone)
+        for alert in message["alerts"]:
+            own = self._scopes.get(scope_for(alert["customer_id"])) if alert["customer_id"] else None
+            for state in (everyone, own):
+                if state is not None:
+                    state.alerts.append(alert)
+                    state.pending = True
+
+    def _check_guardrail(self, customer_id: str, everyone: Optional[_ScopeState]):
+        own = self._scopes.get(scope_for(customer_id))
+        if everyone is None and own is None:
+            return
+        policy = guardrail_engine.cached_policy(customer_id)
+        if policy is None:
+            return
+        spend = guardrail_engine.daily_spend(customer_id)
+        status = budget_status(policy, spend)
+        previous = self._statuses.get(customer_id)
+        if status == previous:
+            return
+        self._statuses[customer_id] = status
+        change = {
+            "customer_id": customer_id,
+            "status": status,
+            "previous": previous,
+            "daily_spend": round(spend, 4),
+            "daily_budget_limit": policy.daily_budget_limit,
+        }
+        for state in (everyone, own):
+            if state is not None:
+                state.guardrail.append(change)
+                state.pending = True
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            now = datetime.utcnow()
+            for scope, state in self._scopes.items():
+                if not state.pending or not state.subscribers:
+                    continue
+                payload = json.dumps(state.take_update(scope, now))
+                for sub in state.subscribers:
+                    sub.offer(payload)
+
+    async def subscribe(self, customer_id: Optional[str] = None) -> Subscription:
+        scope = scope_for(customer_id)
+        if scope not in self._scopes:
+            state = await run_in_threadpool(self._load_state, customer_id)
+            # Another subscriber may have loaded the same scope while we were waiting
+            self._scopes.setdefault(scope, state)
+        state = self._scopes[scope]
+        sub = Subscription(scope, self.queue_size)
+        state.subscribers.add(sub)
+        now = datetime.utcnow()
+        state.roll_day(now)
+        sub.offer(json.dumps({"type": "snapshot", "scope": scope, "seq": state.seq, "totals": state.totals(now)}))
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        state = self._scopes.get(sub.scope)
+        if state is None:
+            return
+        state.subscribers.discard(sub)
+        if not state.subscribers:
+            del self._scopes[sub.scope]
+
+    def _load_state(self, customer_id: Optional[str]) -> _ScopeState:
+        now = datetime.utcnow()
+        with read_db.session() as db:
+            if customer_id:
+                guardrail_engine.get_policy(db, customer_id)
+            rows = load_hourly_totals(db, day_bucket(now), customer_id=customer_id)
+        return _ScopeState(
+            day=now.date(),
+            hourly_cost={bucket_start.hour: float(cost or 0.0) for bucket_start, cost, _, _ in rows},
+            executions=sum(int(e or 0) for _, _, e, _ in rows),
+            tokens=sum(int(t or 0) for _, _, _, t in rows),
+        )
+
+
+def build_live_cost_hub() -> LiveCostHub:
+    broker = RedisBroker(settings.redis_url) if settings.live_stream_broker == "redis" else InProcessBroker()
+    return LiveCostHub(broker, settings.live_stream_max_updates_per_s, settings.live_stream_queue_size)
+
+
+live_cost_hub = build_live_cost_hub()
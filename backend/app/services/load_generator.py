@@ -0,0 +1,268 @@
+"""Scalable synthetic telemetry generator for benchmark datasets.
+
+Events are generated per day in vectorized NumPy chunks from a reproducible seed and written
+with PostgreSQL COPY (multi-row INSERT on other databases). Run it from the backend directory:
+
+    python -m app.services.load_generator --customers 50 --days 90 --events-per-day 200000
+"""
+
+import argparse
+import csv
+import io
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+import structlog
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.budget_policy import BudgetPolicy
+from app.models.execution_event import ExecutionEvent
+from app.models.workflow import Workflow
+from app.schemas.seed import LoadProfile, LoadGenerationResult
+from app.services.guardrail_engine import guardrail_engine
+from app.services.partition_service import ensure_partitions
+from app.services.pricing_service import DEFAULT_PRICES
+from app.services.rollup_service import rebuild_rollups
+from app.services.seed_data import AGENT_NAMES, WORKFLOW_TYPES
+from app.services.summary_cache import invalidate_all
+
+log = structlog.get_logger()
+
+EVENT_COLUMNS = (
+    "execution_id",
+    "workflow_id",
+    "customer_id",
+    "agent_id",
+    "model_name",
+    "tokens_in",
+    "tokens_out",
+    "tool_calls",
+    "tool_cost_total",
+    "execution_cost_total",
+    "latency_ms",
+    "confidence_score",
+    "timestamp",
+)
+
+MODEL_NAMES = list(DEFAULT_PRICES)
+INPUT_PRICES = np.array([DEFAULT_PRICES[m][0] for m in MODEL_NAMES])
+OUTPUT_PRICES = np.array([DEFAULT_PRICES[m][1] for m in MODEL_NAMES])
+
+# Approximate mean cost of a generated event, used to size per-customer daily budgets
+MEAN_EVENT_COST = 0.32
+
+
+def _uuid_strings(rng: np.random.Generator, n: int) -> list[str]:
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    h = raw.tobytes().hex()
+    return [
+        f"{h[i:i + 8]}-{h[i + 8:i + 12]}-{h[i + 12:i + 16]}-{h[i + 16:i + 20]}-{h[i + 20:i + 32]}"
+        for i in range(0, n * 32, 32)
+    ]
+
+
+def _hour_weights(amplitude: float) -> np.ndarray:
+    # Business-hours peak around 14:00 UTC, trough overnight
+    hours = np.arange(24)
+    weights = 1 + amplitude * np.cos((hours - 14) / 24 * 2 * np.pi)
+    return weights / weights.sum()
+
+
+def _generate_chunk(
+    rng, n, day_start, hour_weights, workflow_ids, workflow_customers, workflow_weights, workflow_models, focus=None
+):
+    if focus is None:
+        wf_idx = rng.choice(len(workflow_ids), size=n, p=workflow_weights)
+        agent_idx = rng.integers(0, len(AGENT_NAMES), size=n)
+        seconds = rng.choice(24, size=n, p=hour_weights) * 3600 + rng.integers(0, 3600, size=n)
+    else:
+        wf, agent, hour = focus
+        wf_idx = np.full(n, wf)
+        agent_idx = np.full(n, agent)
+        seconds = hour * 3600 + rng.integers(0, 3600, size=n)
+
+    model_idx = np.where(rng.random(n) < 0.8, workflow_models[wf_idx], rng.integers(0, len(MODEL_NAMES), size=n))
+    tokens_in = np.maximum(rng.lognormal(np.log(1200), 0.6, size=n), 1).astype(np.int64)
+    tokens_out = np.maximum(rng.lognormal(np.log(600), 0.7, size=n), 1).astype(np.int64)
+    tool_calls = rng.poisson(1.2, size=n)
+    tool_cost = np.round(tool_calls * rng.uniform(0.01, 0.5, size=n), 4)
+    # Same formula and operation order as the pricing catalog, so re-rating leaves these rows alone
+    cost = tokens_in / 1000 * INPUT_PRICES[model_idx] + tokens_out / 1000 * OUTPUT_PRICES[model_idx] + tool_cost
+    latency = np.maximum(rng.lognormal(np.log(900), 0.8, size=n), 20).astype(np.int64)
+    confidence = np.round(rng.uniform(0.6, 1.0, size=n), 2)
+    micros = seconds * 1_000_000 + rng.integers(0, 1_000_000, size=n)
+    timestamps = np.datetime64(day_start, "us") + micros.astype("timedelta64[us]")
+
+    return {
+        "execution_id": _uuid_strings(rng, n),
+        "workflow_id": [workflow_ids[i] for i in wf_idx],
+        "customer_id": [workflow_customers[i] for i in wf_idx],
+        "agent_id": [AGENT_NAMES[i] for i in agent_idx],
+        "model_name": [MODEL_NAMES[i] for i in model_idx],
+        "tokens_in": tokens_in.tolist(),
+        "tokens_out": tokens_out.tolist(),
+        "tool_calls": tool_calls.tolist(),
+        "tool_cost_total": tool_cost.tolist(),
+        "execution_cost_total": cost.tolist(),
+        "latency_ms": latency.tolist(),
+        "confidence_score": confidence.tolist(),
+        "timestamp": timestamps,
+    }
+
+
+def _write_events(db: Session, columns: dict) -> int:
+    keep = columns["timestamp"] <= np.datetime64(datetime.utcnow(), "us")
+    if not keep.all():
+        columns = {
+            name: values[keep] if isinstance(values, np.ndarray) else [v for v, k in zip(values, keep) if k]
+            for name, values in columns.items()
+        }
+    count = int(keep.sum())
+    if not count:
+        return 0
+
+    if db.get_bind().dialect.name == "postgresql":
+        columns["timestamp"] = np.datetime_as_string(columns["timestamp"], unit="us").tolist()
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(zip(*(columns[c] for c in EVENT_COLUMNS)))
+        buffer.seek(0)
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {ExecutionEvent.__tablename__} ({', '.join(EVENT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        finally:
+            cursor.close()
+    else:
+        columns["execution_id"] = [uuid.UUID(v) for v in columns["execution_id"]]
+        columns["workflow_id"] = [uuid.UUID(v) for v in columns["workflow_id"]]
+        columns["timestamp"] = columns["timestamp"].tolist()
+        rows = zip(*(columns[c] for c in EVENT_COLUMNS))
+        db.execute(insert(ExecutionEvent), [dict(zip(EVENT_COLUMNS, row)) for row in rows])
+    return count
+
+
+def generate_load(db: Session, profile: LoadProfile) -> LoadGenerationResult:
+    started = time.perf_counter()
+    rng = np.random.default_rng(profile.seed)
+    run_tag = uuid.UUID(bytes=rng.bytes(16)).hex[:8]
+    customer_ids = [f"load-{run_tag}-customer-{c:04d}" for c in range(profile.customers)]
+    if db.query(Workflow).filter(Workflow.customer_id == customer_ids[0]).first():
+        raise ValueError(f"Load data for seed {profile.seed} already exists")
+
+    workflows = []
+    policies = []
+    for customer_id in customer_ids:
+        for w in range(profile.workflows_per_customer):
+            task_type = WORKFLOW_TYPES[w % len(WORKFLOW_TYPES)]
+            workflows.append(
+                {
+                    "workflow_id": uuid.UUID(bytes=rng.bytes(16), version=4),
+                    "customer_id": customer_id,
+                    "workflow_name": f"workflow-{task_type}-{w}",
+                    "task_type": task_type,
+                }
+            )
+        expected_daily_spend = profile.events_per_day / profile.customers * MEAN_EVENT_COST
+        daily = float(np.round(rng.uniform(0.8, 1.6) * expected_daily_spend, 2))
+        policies.append(
+            {
+                "policy_id": uuid.UUID(bytes=rng.bytes(16), version=4),
+                "customer_id": customer_id,
+                "daily_budget_limit": daily,
+                "workflow_budget_limit": 5.0,
+                "step_limit_per_agent": 10,
+            }
+        )
+    db.execute(insert(Workflow), workflows)
+    db.execute(insert(BudgetPolicy), policies)
+    db.commit()
+
+    workflow_ids = [str(w["workflow_id"]) for w in workflows]
+    workflow_customers = [w["customer_id"] for w in workflows]
+    # A few busy workflows dominate traffic, as in real fleets
+    ranks = np.arange(1, len(workflow_ids) + 1)
+    workflow_weights = rng.permutation(1 / ranks**1.1)
+    workflow_weights /= workflow_weights.sum()
+    workflow_models = rng.integers(0, len(MODEL_NAMES), size=len(workflow_ids))
+    hour_weights = _hour_weights(profile.diurnal_amplitude)
+
+    now = datetime.utcnow()
+    first_day = now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=profile.days - 1)
+    # Backdated days need their partitions before COPY, or rows pile up in the default partition
+    ensure_partitions(db.connection(), first_day.date(), now.date())
+    db.commit()
+    total_events = 0
+    spike_days = 0
+
+    for d in range(profile.days):
+        day_start = first_day + timedelta(days=d)
+        volume = profile.events_per_day * (1 - profile.weekend_dip if day_start.weekday() >= 5 else 1)
+        volume = int(rng.poisson(volume))
+        segments = [(volume, None)]
+        if rng.random() < profile.spike_probability:
+            spike_days += 1
+            focus = (int(rng.integers(len(workflow_ids))), int(rng.integers(len(AGENT_NAMES))), int(rng.integers(24)))
+            segments.append((int(volume * (profile.spike_multiplier - 1)), focus))
+
+        for count, focus in segments:
+            for offset in range(0, count, profile.chunk_size):
+                n = min(profile.chunk_size, count - offset)
+                columns = _generate_chunk(
+                    rng,
+                    n,
+                    day_start,
+                    hour_weights,
+                    workflow_ids,
+                    workflow_customers,
+                    workflow_weights,
+                    workflow_models,
+                    focus,
+                )
+                total_events += _write_events(db, columns)
+                db.commit()
+        log.info("Generated load day", day=day_start.date().isoformat(), events=total_events)
+
+    rebuild_rollups(db, first_day)
+    db.commit()
+    invalidate_all()
+    guardrail_engine.reconcile(db)
+
+    elapsed = time.perf_counter() - started
+    return LoadGenerationResult(
+        customers=profile.customers,
+        workflows=len(workflows),
+        events=total_events,
+        policies=len(policies),
+        spike_days=spike_days,
+        elapsed_s=round(elapsed, 3),
+        events_per_sec=round(total_events / elapsed, 1) if elapsed > 0 else 0.0,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic execution events for benchmarking")
+    for name, field in LoadProfile.model_fields.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(field.default), default=field.default)
+    profile = LoadProfile(**vars(parser.parse_args()))
+
+    from app.database import Base, SessionLocal, engine
+    from app.logging_config import setup_logging
+
+    setup_logging()
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        try:
+            result = generate_load(db, profile)
+        except ValueError as e:
+            parser.exit(1, f"{e}\n")
+    print(result.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Vectorized Monte Carlo estimation of workflow cost distributions."""
+
+import math
+import time
+
+import numpy as np
+
+from app.schemas.simulation import Distribution, WorkflowSimulationRequest, MonteCarloResult
+
+# Upper bound on array elements drawn at once, keeping memory flat for large agent counts
+CHUNK_ELEMENTS = 1 << 22
+
+# Beyond this many agents, per-run total steps are drawn from the normal approximation of the
+# sum of per-agent steps, with moments estimated from a pilot sample
+CLT_MIN_AGENTS = 32
+PILOT_SAMPLES = 100_000
+
+# Runs with fewer steps than this draw tokens and tool calls for each step; longer runs draw
+# their summed step cost from its normal approximation, with moments from a pilot sample
+CLT_MIN_STEPS = 8
+
+# Two-sided 90% band for the normal approximation of a month's summed cost
+Z_90 = 1.6448536269514722
+
+
+def sample_distribution(rng: np.random.Generator, dist: Distribution, size) -> np.ndarray:
+    if dist.kind == "fixed":
+        values = np.full(size, dist.value, dtype=np.float64)
+    elif dist.kind == "uniform":
+        values = rng.uniform(dist.low, dist.high, size)
+    elif dist.kind == "normal":
+        values = rng.normal(dist.mean, dist.std, size)
+    elif dist.kind == "lognormal":
+        sigma2 = math.log1p((dist.std / dist.mean) ** 2)
+        values = rng.lognormal(math.log(dist.mean) - sigma2 / 2, math.sqrt(sigma2), size)
+    else:
+        values = rng.choice(np.asarray(dist.samples, dtype=np.float64), size)
+    return np.maximum(values, 0.0)
+
+
+def sample_counts(rng: np.random.Generator, dist: Distribution, size) -> np.ndarray:
+    return np.rint(sample_distribution(rng, dist, size))
+
+
+def _sum_step_costs(
+    rng: np.random.Generator, total_steps: np.ndarray, draw_step_costs, step_moments: tuple[float, float]
+) -> np.ndarray:
+    """Summed cost of each run's steps, every step drawing its own tokens and tool calls."""
+    exact = total_steps < CLT_MIN_STEPS
+    runs = np.repeat(np.arange(len(total_steps)), np.where(exact, total_steps, 0).astype(np.int64))
+    # bincount returns integers when there are no weights at all
+    sums = np.bincount(runs, weights=draw_step_costs(len(runs)), minlength=len(total_steps)).astype(np.float64)
+    if not exact.all():
+        steps = total_steps[~exact]
+        step_mean, step_std = step_moments
+        sums[~exact] = np.maximum(rng.normal(steps * step_mean, np.sqrt(steps) * step_std), 0.0)
+    return sums
+
+
+def simulate_cost_samples(req: WorkflowSimulationRequest) -> np.ndarray:
+    """Draw one total workflow cost per simulated run.
+
+    Steps are drawn independently per agent (summed via the normal approximation for
+    large agent counts). Tokens and tool calls are drawn independently per step; for runs of
+    CLT_MIN_STEPS steps or more their summed cost comes from the normal approximation. Fixed
+    tool calls with fixed or normal tokens give a fixed or normal step cost, whose sums are
+    drawn exactly.
+    """
+    mc = req.monte_carlo
+    rng = np.random.default_rng(mc.seed)
+    steps_dist = mc.steps_per_agent or Distribution(value=req.avg_steps_per_agent)
+    tokens_dist = mc.tokens_per_step or Distribution(value=req.tokens_per_step)
+    tools_dist = mc.tool_calls_per_step or Distribution(value=req.tool_calls_per_step)
+
+    num_agents = max(req.num_agents, 0)
+    use_clt = steps_dist.kind != "fixed" and num_agents >= CLT_MIN_AGENTS
+    if use_clt:
+        pilot = sample_counts(rng, steps_dist, PILOT_SAMPLES)
+        steps_mean = pilot.mean() * num_agents
+        steps_std = pilot.std() * math.sqrt(num_agents)
+
+    def draw_step_costs(size) -> np.ndarray:
+        tokens = sample_distribution(rng, tokens_dist, size)
+        tool_calls = sample_counts(rng, tools_dist, size)
+        return tokens / 1000 * req.model_cost_per_1k_tokens + tool_calls * req.tool_cost_per_call
+
+    fixed_step_cost = normal_step_cost = None
+    if tools_dist.kind == "fixed" and tokens_dist.kind == "fixed":
+        fixed_step_cost = float(draw_step_costs(1)[0])
+    elif tools_dist.kind == "fixed" and tokens_dist.kind == "normal":
+        # A sum of normal draws is normal; the clipping of negative token counts is ignored
+        per_token = req.model_cost_per_1k_tokens / 1000
+        tool_cost = round(max(tools_dist.value, 0.0)) * req.tool_cost_per_call
+        normal_step_cost = (tokens_dist.mean * per_token + tool_cost, tokens_dist.std * per_token)
+    else:
+        pilot_costs = draw_step_costs(PILOT_SAMPLES)
+        step_moments = (pilot_costs.mean(), pilot_costs.std())
+
+    chunk_runs = CHUNK_ELEMENTS if use_clt else max(CHUNK_ELEMENTS // max(num_agents, 1), 1)
+    costs = np.empty(mc.samples, dtype=np.float64)
+
+    for start in range(0, mc.samples, chunk_runs):
+        n = min(chunk_runs, mc.samples - start)
+        if steps_dist.kind == "fixed":
+            total_steps = np.full(n, round(max(steps_dist.value, 0.0)) * num_agents, dtype=np.float64)
+        elif use_clt:
+            total_steps = np.maximum(np.rint(rng.normal(steps_mean, steps_std, n)), 0.0)
+        else:
+            total_steps = sample_counts(rng, steps_dist, (n, num_agents)).sum(axis=1)
+        if fixed_step_cost is not None:
+            costs[start : start + n] = total_steps * fixed_step_cost
+        elif normal_step_cost is not None:
+            step_mean, step_std = normal_step_cost
+            costs[start : start + n] = np.maximum(
+                rng.normal(total_steps * step_mean, np.sqrt(total_steps) * step_std), 0.0
+            )
+        else:
+            costs[start : start + n] = _sum_step_costs(rng, total_steps, draw_step_costs, step_moments)
+
+    return costs
+
+
+def run_monte_carlo(req: WorkflowSimulationRequest, runs_per_month: int) -> MonteCarloResult:
+    started = time.perf_counter()
+    costs = simulate_cost_samples(req)
+
+    p50, p90, p99 = np.percentile(costs, [50, 90, 99])
+    mean = float(costs.mean())
+    # A month is the sum of many independent runs, so its spread narrows with sqrt(runs)
+    monthly_mean = mean * runs_per_month
+    monthly_spread = Z_90 * float(costs.std()) * math.sqrt(runs_per_month)
+
+    return MonteCarloResult(
+        samples=len(costs),
+        mean_cost_per_workflow=round(mean, 6),
+        p50_cost_per_workflow=round(float(p50), 6),
+        p90_cost_per_workflow=round(float(p90), 6),
+        p99_cost_per_workflow=round(float(p99), 6),
+        monthly_projection_mean=round(monthly_mean, 2),
+        monthly_projection_low=round(max(monthly_mean - monthly_spread, 0.0), 2),
+        monthly_projection_high=round(monthly_mean + monthly_spread, 2),
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 3),
+    )
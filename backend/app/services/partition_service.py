@@ -0,0 +1,123 @@
+"""Daily range partitions for execution_events on PostgreSQL.
+
+The partitioned layout is created by the Alembic migration; these helpers keep partitions
+ahead of ingestion and drop expired ones. On other databases (or before the migration has
+run) they are no-ops.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import structlog
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app.models.execution_event import ExecutionEvent
+
+log = structlog.get_logger()
+
+PARENT_TABLE = ExecutionEvent.__tablename__
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+PARTITION_PREFIX = f"{PARENT_TABLE}_p"
+
+
+def partition_name(day: date) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def partition_day(name: str) -> Optional[date]:
+    if not name.startswith(PARTITION_PREFIX):
+        return None
+    try:
+        return datetime.strptime(name[len(PARTITION_PREFIX) :], "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+def is_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return bool(
+        conn.execute(
+            text(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+                "JOIN pg_class c ON c.oid = pt.partrelid "
+                "WHERE c.relname = :name AND pg_table_is_visible(c.oid))"
+            ),
+            {"name": PARENT_TABLE},
+        ).scalar()
+    )
+
+
+def existing_partitions(conn: Connection) -> set[str]:
+    rows = conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :parent AND pg_table_is_visible(p.oid)"
+        ),
+        {"parent": PARENT_TABLE},
+    )
+    return {name for (name,) in rows}
+
+
+def create_partition(conn: Connection, day: date, has_default: bool):
+    name = partition_name(day)
+    lo = datetime.combine(day, datetime.min.time())
+    bounds = {"lo": lo, "hi": lo + timedelta(days=1)}
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS)"))
+    if has_default:
+        # Rows for this day may have landed in the default partition before it existed
+        conn.execute(
+            text(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                f'WHERE "timestamp" >= :lo AND "timestamp" < :hi RETURNING *) '
+                f"INSERT INTO {name} SELECT * FROM moved"
+            ),
+            bounds,
+        )
+    conn.execute(
+        text(
+            f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{bounds['lo'].isoformat()}') TO ('{bounds['hi'].isoformat()}')"
+        )
+    )
+
+
+def ensure_partitions(conn: Connection, first_day: date, last_day: date) -> list[str]:
+    """Create any missing daily partitions for first_day..last_day inclusive."""
+    if not is_partitioned(conn):
+        return []
+    existing = existing_partitions(conn)
+    has_default = DEFAULT_PARTITION in existing
+    created = []
+    day = first_day
+    while day <= last_day:
+        if partition_name(day) not in existing:
+            create_partition(conn, day, has_default)
+            created.append(partition_name(day))
+        day += timedelta(days=1)
+    return created
+
+
+def drop_partitions_before(conn: Connection, cutoff: date) -> list[str]:
+    if not is_partitioned(conn):
+        return []
+    dropped = []
+    for name in sorted(existing_partitions(conn)):
+        day = partition_day(name)
+        if day is not None and day < cutoff:
+            conn.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    return dropped
+
+
+def maintain_partitions(engine: Engine, days_ahead: int, retention_days: Optional[int]) -> dict:
+    today = datetime.utcnow().date()
+    with engine.begin() as conn:
+        created = ensure_partitions(conn, today, today + timedelta(days=days_ahead))
+        dropped = drop_partitions_before(conn, today - timedelta(days=retention_days)) if retention_days else []
+    if created or dropped:
+        log.info("Maintained execution_events partitions", created=created, dropped=dropped)
+    return {"created": created, "dropped": dropped}
@@ -0,0 +1,150 @@
+"""Effective-dated model pricing catalog, cached in memory.
+
+Each model has a list of price versions; a version applies to events from its effective_from
+until the next version's. Event cost is computed from the version in force at the event's
+timestamp, identically at ingest (in Python) and during re-rating (in SQL), so re-rating
+leaves correctly priced rows untouched.
+
+The cache is loaded on startup, replaced when this process adds a version, and refreshed
+periodically so that versions added through other workers are picked up.
+"""
+
+import bisect
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Float, and_, case, cast, func, select
+from sqlalchemy.orm import Session
+
+from app.database import dialect_insert
+from app.models.execution_event import ExecutionEvent
+from app.models.model_price import ModelPrice
+
+# Seeded into an empty catalog, in force since the epoch: (input, output) cost per 1k tokens
+DEFAULT_PRICES = {
+    "gpt-4-turbo": (0.01, 0.01),
+    "gpt-4o": (0.005, 0.005),
+    "gpt-3.5-turbo": (0.0015, 0.0015),
+    "claude-3-opus": (0.015, 0.015),
+    "claude-3-sonnet": (0.003, 0.003),
+}
+CATALOG_EPOCH = datetime(1970, 1, 1)
+
+
+@dataclass(frozen=True)
+class PriceVersion:
+    effective_from: datetime
+    input_cost_per_1k: float
+    output_cost_per_1k: float
+
+    def cost(self, tokens_in: int, tokens_out: int, tool_cost_total: Optional[float] = None) -> float:
+        # Keep in step with cost_expression, so that SQL and Python agree to the last bit
+        return (
+            tokens_in / 1000 * self.input_cost_per_1k
+            + tokens_out / 1000 * self.output_cost_per_1k
+            + (tool_cost_total or 0.0)
+        )
+
+
+class PricingCatalog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # model -> versions sorted by effective_from; replaced wholesale, never mutated
+        self._versions: dict[str, list[PriceVersion]] = {}
+
+    def load(self, db: Session):
+        """Reload every version from the database, seeding the defaults into an empty catalog."""
+        query = select(ModelPrice).order_by(ModelPrice.model_name, ModelPrice.effective_from)
+        rows = db.scalars(query).all()
+        if not rows:
+            # Workers starting together may all find the catalog empty; only one seed wins
+            db.execute(
+                dialect_insert(db, ModelPrice).on_conflict_do_nothing(index_elements=["model_name", "effective_from"]),
+                [
+                    {
+                        "model_name": model,
+                        "input_cost_per_1k": input_price,
+                        "output_cost_per_1k": output_price,
+                        "effective_from": CATALOG_EPOCH,
+                    }
+                    for model, (input_price, output_price) in DEFAULT_PRICES.items()
+                ],
+            )
+            db.commit()
+            rows = db.scalars(query).all()
+        versions: dict[str, list[PriceVersion]] = {}
+        for row in rows:
+            versions.setdefault(row.model_name, []).append(
+                PriceVersion(row.effective_from, row.input_cost_per_1k, row.output_cost_per_1k)
+            )
+        with self._lock:
+            self._versions = {model: sorted(v, key=lambda p: p.effective_from) for model, v in versions.items()}
+
+    def refresh(self, session_factory):
+        with session_factory() as db:
+            self.load(db)
+
+    def put(self, price: ModelPrice):
+        version = PriceVersion(price.effective_from, price.input_cost_per_1k, price.output_cost_per_1k)
+        with self._lock:
+            versions = [
+                v for v in self._versions.get(price.model_name, []) if v.effective_from != version.effective_from
+            ]
+            bisect.insort(versions, version, key=lambda p: p.effective_from)
+            self._versions = {**self._versions, price.model_name: versions}
+
+    def models(self) -> list[str]:
+        return sorted(self._versions)
+
+    def versions(self, model_name: str) -> list[PriceVersion]:
+        return self._versions.get(model_name, [])
+
+    def price_at(self, model_name: str, at: datetime) -> Optional[PriceVersion]:
+        versions = self._versions.get(model_name)
+        if not versions:
+            return None
+        i = bisect.bisect_right(versions, at, key=lambda p: p.effective_from)
+        return versions[i - 1] if i else None
+
+    def cost(
+        self, model_name: str, tokens_in: int, tokens_out: int, tool_cost_total: Optional[float], at: datetime
+    ) -> Optional[float]:
+        """Cost of an event under the catalog, or None if the model has no price in force at `at`."""
+        price = self.price_at(model_name, at)
+        return price.cost(tokens_in, tokens_out, tool_cost_total) if price else None
+
+    def cost_expression(self, start: datetime, end: datetime, model_names: Optional[list[str]] = None):
+        """SQL expression for the catalog cost of events in [start, end).
+
+        One CASE branch per price version in force during the window; events of unpriced models
+        keep their current cost.
+        """
+        e = ExecutionEvent
+        branches = []
+        for model in model_names or self.models():
+            versions = self.versions(model)
+            for i, version in enumerate(versions):
+                valid_to = versions[i + 1].effective_from if i + 1 < len(versions) else None
+                if version.effective_from >= end or (valid_to is not None and valid_to <= start):
+                    continue
+                condition = [e.model_name == model]
+                if version.effective_from > start:
+                    condition.append(e.timestamp >= version.effective_from)
+                if valid_to is not None and valid_to < end:
+                    condition.append(e.timestamp < valid_to)
+                branches.append(
+                    (
+                        and_(*condition),
+                        cast(e.tokens_in, Float) / 1000 * version.input_cost_per_1k
+                        + cast(e.tokens_out, Float) / 1000 * version.output_cost_per_1k
+                        + func.coalesce(e.tool_cost_total, 0.0),
+                    )
+                )
+        if not branches:
+            return None
+        return case(*branches, else_=e.execution_cost_total)
+
+
+pricing_catalog = PricingCatalog()
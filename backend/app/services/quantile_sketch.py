@@ -0,0 +1,130 @@
+"""Mergeable quantile sketches (DDSketch) for latency and cost distributions.
+
+A DDSketch counts values in logarithmically sized buckets, so every quantile it returns is
+within a fixed relative error of the true value, however many values were added. Two
+sketches with the same accuracy merge by adding bucket counts, which lets hourly sketches be
+combined into any window, and sketches written by different workers be folded together.
+"""
+
+import math
+import struct
+from typing import Iterable, Optional
+
+# Quantiles are within 1% of the exact value; persisted sketches must all share this accuracy
+RELATIVE_ACCURACY = 0.01
+
+# Beyond this many buckets the lowest ones are collapsed, trading accuracy at the bottom of
+# the distribution for bounded size; at 1% accuracy 2048 buckets span about 18 orders of magnitude
+MAX_BINS = 2048
+
+# Values at or below this are counted in a dedicated zero bucket
+MIN_INDEXABLE = 1e-9
+
+_HEADER = struct.Struct("<BddddQqI")
+_FORMAT_VERSION = 1
+
+
+class DDSketch:
+    def __init__(self, relative_accuracy: float = RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        # Midpoint of the bucket (gamma^(key-1), gamma^key] in relative terms
+        return 2 * self.gamma**key / (self.gamma + 1)
+
+    def add(self, value: float, weight: int = 1):
+        if value > MIN_INDEXABLE:
+            key = self._key(value)
+            self.bins[key] = self.bins.get(key, 0) + weight
+            if len(self.bins) > MAX_BINS:
+                self._collapse()
+        else:
+            self.zero_count += weight
+        self.count += weight
+        self.sum += value * weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def update(self, values: Iterable[float]):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "DDSketch"):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        if not other.count:
+            return
+        for key, n in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + n
+        if len(self.bins) > MAX_BINS:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _collapse(self):
+        keys = sorted(self.bins)
+        excess = keys[: len(keys) - MAX_BINS + 1]
+        target = keys[len(excess)]
+        self.bins[target] += sum(self.bins.pop(k) for k in excess)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return max(self.min, 0.0)
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if rank < seen:
+                return min(max(self._value(key), self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def to_bytes(self) -> bytes:
+        """Compact little-endian encoding: header, then dense bucket counts from the lowest key."""
+        offset = min(self.bins) if self.bins else 0
+        counts = [self.bins.get(k, 0) for k in range(offset, max(self.bins) + 1)] if self.bins else []
+        header = _HEADER.pack(
+            _FORMAT_VERSION,
+            self.relative_accuracy,
+            self.sum,
+            self.min,
+            self.max,
+            self.zero_count,
+            offset,
+            len(counts),
+        )
+        return header + struct.pack(f"<{len(counts)}I", *counts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "DDSketch":
+        version, accuracy, total, lo, hi, zero_count, offset, n = _HEADER.unpack_from(data)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported sketch format version {version}")
+        counts = struct.unpack_from(f"<{n}I", data, _HEADER.size)
+        sketch = cls(accuracy)
+        sketch.bins = {offset + i: c for i, c in enumerate(counts) if c}
+        sketch.zero_count = zero_count
+        sketch.count = zero_count + sum(counts)
+        sketch.sum = total
+        sketch.min = lo
+        sketch.max = hi
+        return sketch
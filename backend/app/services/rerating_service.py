@@ -0,0 +1,260 @@
+"""Bulk re-rating: recompute the cost of historical events from the pricing catalog.
+
+A job walks its window [start, end) in chunks of rerate_chunk_minutes that never cross a day
+boundary. Each chunk is one set-based UPDATE whose new cost is a CASE over the price versions
+in force during the chunk, and only rows whose cost changes are written. The job's cursor and
+counters advance in the same transaction, so an interrupted job resumes after its last
+committed chunk. When the cursor leaves a day in which rows changed, that day's rollups and
+sketches of the models whose rows changed are rebuilt from the events, in the same
+transaction as the day's last chunk.
+
+A running job holds a lease that each chunk renews through heartbeat_at. A job whose lease
+has lapsed (its worker died) is picked up again by the recovery task of any worker. Every
+chunk commit is fenced on the cursor, so two workers can never both advance the same job.
+
+The window never extends into the current UTC day, whose rollups ingestion is still upserting
+and which a rebuild would race; today's events were priced by the catalog at ingest. Days
+before the archive horizon are skipped too, as their events now live in Parquet files.
+"""
+
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from typing import Optional, Sequence
+from uuid import UUID
+
+import structlog
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.execution_event import ExecutionEvent
+from app.models.rerating_job import ReratingJob
+from app.services.archive_service import archive_horizon
+from app.services.pricing_service import pricing_catalog
+from app.services.rollup_service import day_bucket, rebuild_rollups
+from app.services.spend_forecaster import spend_forecaster
+from app.services.summary_cache import invalidate_all
+
+log = structlog.get_logger()
+
+# A running job whose heartbeat is older than this is considered abandoned
+LEASE = timedelta(minutes=5)
+
+
+def create_job(
+    db: Session,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    model_names: Optional[Sequence[str]] = None,
+) -> ReratingJob:
+    """Queue a re-rating job, clamping its window to [archive horizon, start of today).
+
+    Raises ValueError for models without a catalog price, or a window that is empty once clamped.
+    """
+    unknown = set(model_names or ()).difference(pricing_catalog.models())
+    if unknown:
+        raise ValueError(f"No price for models: {', '.join(sorted(unknown))}")
+
+    today = day_bucket(datetime.utcnow())
+    if start is None:
+        oldest = db.query(func.min(ExecutionEvent.timestamp)).scalar()
+        start = day_bucket(oldest) if oldest else today
+    horizon = archive_horizon()
+    if horizon and start < horizon:
+        start = horizon
+    end = min(end or today, today)
+    if start >= end:
+        raise ValueError("Nothing to re-rate: the window is empty once archived days and today are excluded")
+
+    job = ReratingJob(
+        start=start,
+        end=end,
+        cursor=start,
+        model_names=",".join(sorted(set(model_names))) if model_names else None,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def job_progress(job: ReratingJob) -> float:
+    return round((job.cursor - job.start) / (job.end - job.start), 4)
+
+
+def _claim(db: Session, job_id: UUID) -> bool:
+    """Take the lease on a pending job, or on a running one whose worker has gone quiet."""
+    now = datetime.utcnow()
+    claimed = db.execute(
+        update(ReratingJob)
+        .where(
+            ReratingJob.job_id == job_id,
+            or_(
+                ReratingJob.status == "pending",
+                and_(
+                    ReratingJob.status == "running",
+                    or_(ReratingJob.heartbeat_at.is_(None), ReratingJob.heartbeat_at < now - LEASE),
+                ),
+            ),
+        )
+        .values(status="running", heartbeat_at=now, error=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return claimed.rowcount == 1
+
+
+def _rerate_chunk(db: Session, start: datetime, end: datetime, model_names: Optional[list[str]]) -> tuple[int, set]:
+    """Re-price the events in [start, end); returns the number of rows changed and their models."""
+    cost = pricing_catalog.cost_expression(start, end, model_names)
+    if cost is None:
+        return 0, set()
+    e = ExecutionEvent
+    changed = db.execute(
+        update(e)
+        .where(
+            e.timestamp >= start,
+            e.timestamp < end,
+            e.model_name.in_(model_names or pricing_catalog.models()),
+            e.execution_cost_total != cost,
+        )
+        .values(execution_cost_total=cost)
+        .returning(e.model_name)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    return len(changed), set(changed)
+
+
+def run_job(session_factory, job_id: UUID, stopping: Optional[threading.Event] = None) -> Optional[str]:
+    """Claim a job and re-rate it to the end of its window; returns the job's final status,
+    or None if the job could not be claimed.
+
+    When `stopping` is set the job is released back to pending after its current chunk.
+    """
+    with session_factory() as db:
+        if not _claim(db, job_id):
+            return None
+        job = db.get(ReratingJob, job_id)
+        model_names = job.model_names.split(",") if job.model_names else None
+        log.info("Re-rating started", job_id=str(job_id), cursor=job.cursor.isoformat(), end=job.end.isoformat())
+        try:
+            while job.cursor < job.end:
+                if stopping is not None and stopping.is_set():
+                    _release(db, job)
+                    return "pending"
+                cursor = job.cursor
+                day_start = day_bucket(cursor)
+                day_end = day_start + timedelta(days=1)
+                chunk_end = min(cursor + timedelta(minutes=settings.rerate_chunk_minutes), day_end, job.end)
+
+                updated, changed = _rerate_chunk(db, cursor, chunk_end, model_names)
+                dirty = changed.union(job.dirty_models.split(",") if job.dirty_models else ())
+                rolled_up = bool(dirty) and (chunk_end == day_end or chunk_end == job.end)
+                if rolled_up:
+                    rebuild_rollups(db, day_start, day_start, sorted(dirty))
+                    dirty = set()
+
+                # Fenced on the cursor: a worker that lost its lease cannot advance the job
+                advanced = db.execute(
+                    update(ReratingJob)
+                    .where(ReratingJob.job_id == job_id, ReratingJob.status == "running", ReratingJob.cursor == cursor)
+                    .values(
+                        cursor=chunk_end,
+                        chunks_done=ReratingJob.chunks_done + 1,
+                        rows_updated=ReratingJob.rows_updated + updated,
+                        dirty_models=",".join(sorted(dirty)) or None,
+                        heartbeat_at=datetime.utcnow(),
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                if advanced.rowcount != 1:
+                    db.rollback()
+                    log.warning("Re-rating job lease lost", job_id=str(job_id), cursor=cursor.isoformat())
+                    return None
+                db.commit()
+                db.refresh(job)
+                if rolled_up:
+                    invalidate_all()
+
+            job.status = "completed"
+            job.finished_at = datetime.utcnow()
+            db.commit()
+            if job.rows_updated:
+                # This worker's spend profiles were built from the old costs
+                spend_forecaster.invalidate()
+            log.info("Re-rating completed", job_id=str(job_id), rows_updated=job.rows_updated, chunks=job.chunks_done)
+            return job.status
+        except Exception as e:
+            db.rollback()
+            job = db.get(ReratingJob, job_id)
+            job.status = "failed"
+            job.error = f"{e.__class__.__name__}: {e}"[:1000]
+            job.finished_at = datetime.utcnow()
+            db.commit()
+            log.exception("Re-rating failed", job_id=str(job_id), cursor=job.cursor.isoformat())
+            return job.status
+
+
+def _release(db: Session, job: ReratingJob):
+    job.status = "pending"
+    job.heartbeat_at = None
+    db.commit()
+    log.info("Re-rating paused", job_id=str(job.job_id), cursor=job.cursor.isoformat())
+
+
+def resumable_jobs(db: Session) -> list[UUID]:
+    """Pending jobs and running jobs whose lease has lapsed, oldest first."""
+    stale = datetime.utcnow() - LEASE
+    return list(
+        db.scalars(
+            select(ReratingJob.job_id)
+            .where(
+                or_(
+                    ReratingJob.status == "pending",
+                    and_(ReratingJob.status == "running", ReratingJob.heartbeat_at < stale),
+                )
+            )
+            .order_by(ReratingJob.created_at)
+        )
+    )
+
+
+class ReratingRunner:
+    """Runs re-rating jobs in the threadpool, one task per job, off the request path."""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self._stopping = threading.Event()
+        self._tasks: dict[UUID, asyncio.Task] = {}
+
+    def submit(self, job_id: UUID):
+        if job_id in self._tasks or self._stopping.is_set():
+            return
+        task = asyncio.create_task(run_in_threadpool(run_job, self.session_factory, job_id, self._stopping))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    def recover(self):
+        """Run every pending or abandoned job to completion; called periodically from the threadpool."""
+        with self.session_factory() as db:
+            job_ids = resumable_jobs(db)
+        for job_id in job_ids:
+            if self._stopping.is_set():
+                return
+            if job_id not in self._tasks:
+                run_job(self.session_factory, job_id, self._stopping)
+
+    def start(self):
+        self._stopping.clear()
+
+    async def stop(self):
+        """Pause running jobs after their current chunk so another start resumes them at once."""
+        self._stopping.set()
+        if self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+
+rerating_runner = ReratingRunner(SessionLocal)
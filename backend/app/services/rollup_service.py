@@ -0,0 +1,352 @@
+"""Hourly and daily cost rollups maintained alongside raw execution events."""
+
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+from uuid import UUID
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.database import dialect_insert
+from app.models.cost_rollup import CostRollupHourly, CostRollupDaily
+from app.models.execution_event import ExecutionEvent
+from app.models.metric_sketch import MetricSketchHourly
+from app.services.archive_service import archive_horizon
+from app.services.quantile_sketch import DDSketch
+from app.services.summary_cache import invalidate_all
+
+ROLLUP_KEYS = ("bucket_start", "workflow_id", "agent_id", "model_name")
+ROLLUP_ATTRIBUTES = ("customer_id",)
+ROLLUP_SUMS = ("total_cost", "tokens_in", "tokens_out", "execution_count", "latency_ms_sum", "latency_count")
+
+
+def hour_bucket(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def day_bucket(ts: datetime) -> datetime:
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _aggregate(events: Iterable[dict], bucket_fn) -> list[dict]:
+    groups: dict[tuple, dict] = {}
+    for e in events:
+        key = (bucket_fn(e["timestamp"]), e["workflow_id"], e["agent_id"], e["model_name"])
+        g = groups.get(key)
+        if g is None:
+            g = groups[key] = dict(zip(ROLLUP_KEYS, key), customer_id=e.get("customer_id"))
+            g.update((s, 0) for s in ROLLUP_SUMS)
+        g["total_cost"] += e["execution_cost_total"]
+        g["tokens_in"] += e["tokens_in"]
+        g["tokens_out"] += e["tokens_out"]
+        g["execution_count"] += 1
+        if e.get("latency_ms") is not None:
+            g["latency_ms_sum"] += e["latency_ms"]
+            g["latency_count"] += 1
+    return list(groups.values())
+
+
+def _upsert(db: Session, model, rows: list[dict]):
+    if not rows:
+        return
+    stmt = dialect_insert(db, model)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(ROLLUP_KEYS),
+        set_={
+            "customer_id": func.coalesce(model.customer_id, stmt.excluded.customer_id),
+            **{s: getattr(model, s) + getattr(stmt.excluded, s) for s in ROLLUP_SUMS},
+        },
+    )
+    db.execute(stmt, rows)
+
+
+def _sketch_groups(events: Iterable) -> dict[tuple, list]:
+    """Group (timestamp, workflow_id, agent_id, model_name, customer_id, latency_ms, cost) tuples by hourly key."""
+    groups: dict[tuple, list] = {}
+    for ts, workflow_id, agent_id, model_name, customer_id, latency_ms, cost in events:
+        key = (hour_bucket(ts), workflow_id, agent_id, model_name)
+        g = groups.get(key)
+        if g is None:
+            g = groups[key] = [customer_id, DDSketch(), DDSketch()]
+        if latency_ms is not None:
+            g[1].add(latency_ms)
+        g[2].add(cost)
+    return groups
+
+
+def _sketch_rows(groups: dict[tuple, list]) -> list[dict]:
+    return [
+        dict(
+            zip(ROLLUP_KEYS, key),
+            customer_id=customer_id,
+            latency_sketch=latency.to_bytes() if latency.count else None,
+            cost_sketch=cost.to_bytes(),
+        )
+        for key, (customer_id, latency, cost) in groups.items()
+    ]
+
+
+def _apply_sketches(db: Session, events: list[dict]):
+    groups = _sketch_groups(
+        (
+            e["timestamp"],
+            e["workflow_id"],
+            e["agent_id"],
+            e["model_name"],
+            e.get("customer_id"),
+            e.get("latency_ms"),
+            e["execution_cost_total"],
+        )
+        for e in events
+    )
+    # Callers upsert the hourly rollups first; their row locks serialize concurrent writers
+    # of the same keys, so this read-merge-write cannot lose another transaction's update
+    existing = db.execute(
+        select(
+            MetricSketchHourly.bucket_start,
+            MetricSketchHourly.workflow_id,
+            MetricSketchHourly.agent_id,
+            MetricSketchHourly.model_name,
+            MetricSketchHourly.latency_sketch,
+            MetricSketchHourly.cost_sketch,
+        ).where(
+            MetricSketchHourly.bucket_start.in_({k[0] for k in groups}),
+            MetricSketchHourly.workflow_id.in_({k[1] for k in groups}),
+            MetricSketchHourly.agent_id.in_({k[2] for k in groups}),
+        )
+    )
+    for *key, latency_sketch, cost_sketch in existing:
+        g = groups.get(tuple(key))
+        if g is None:
+            continue
+        if latency_sketch is not None:
+            g[1].merge(DDSketch.from_bytes(latency_sketch))
+        g[2].merge(DDSketch.from_bytes(cost_sketch))
+
+    stmt = dialect_insert(db, MetricSketchHourly)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(ROLLUP_KEYS),
+        set_={
+            "customer_id": func.coalesce(MetricSketchHourly.customer_id, stmt.excluded.customer_id),
+            "latency_sketch": stmt.excluded.latency_sketch,
+            "cost_sketch": stmt.excluded.cost_sketch,
+        },
+    )
+    db.execute(stmt, _sketch_rows(groups))
+
+
+def apply_rollups(db: Session, events: list[dict]):
+    """Fold newly written events into the rollup tables within the caller's transaction."""
+    _upsert(db, CostRollupHourly, _aggregate(events, hour_bucket))
+    _upsert(db, CostRollupDaily, _aggregate(events, day_bucket))
+    if events:
+        _apply_sketches(db, events)
+
+
+def _bucket_expr(db: Session, unit: str):
+    if db.get_bind().dialect.name == "sqlite":
+        # Match SQLAlchemy's SQLite DateTime storage format so buckets compare equal
+        fmt = "%Y-%m-%d %H:00:00.000000" if unit == "hour" else "%Y-%m-%d 00:00:00.000000"
+        return func.strftime(fmt, ExecutionEvent.timestamp)
+    return func.date_trunc(unit, ExecutionEvent.timestamp)
+
+
+def rebuild_rollups(
+    db: Session, start: datetime, end: Optional[datetime] = None, model_names: Optional[list[str]] = None
+):
+    """Recompute rollups for whole days in [start, end) with set-based INSERT ... SELECT,
+    optionally only those of the given models.
+
+    Days before the archive horizon no longer have raw events in the table, so their rollups
+    and sketches are left as they are.
+    """
+    start = day_bucket(start)
+    end = day_bucket(end) + timedelta(days=1) if end else None
+    horizon = archive_horizon()
+    if horizon and start < horizon:
+        start = horizon
+        if end and end <= start:
+            return
+
+    for model, unit in ((CostRollupHourly, "hour"), (CostRollupDaily, "day")):
+        cleanup = delete(model).where(model.bucket_start >= start)
+        if end:
+            cleanup = cleanup.where(model.bucket_start < end)
+        if model_names:
+            cleanup = cleanup.where(model.model_name.in_(model_names))
+        db.execute(cleanup)
+
+        bucket = _bucket_expr(db, unit)
+        source = (
+            select(
+                bucket,
+                ExecutionEvent.workflow_id,
+                ExecutionEvent.agent_id,
+                ExecutionEvent.model_name,
+                func.max(ExecutionEvent.customer_id),
+                func.sum(ExecutionEvent.execution_cost_total),
+                func.sum(ExecutionEvent.tokens_in),
+                func.sum(ExecutionEvent.tokens_out),
+                func.count(),
+                func.coalesce(func.sum(ExecutionEvent.latency_ms), 0),
+                func.count(ExecutionEvent.latency_ms),
+            )
+            .where(ExecutionEvent.timestamp >= start)
+            .group_by(bucket, ExecutionEvent.workflow_id, ExecutionEvent.agent_id, ExecutionEvent.model_name)
+        )
+        if end:
+            source = source.where(ExecutionEvent.timestamp < end)
+        if model_names:
+            source = source.where(ExecutionEvent.model_name.in_(model_names))
+        db.execute(insert(model).from_select(list(ROLLUP_KEYS + ROLLUP_ATTRIBUTES + ROLLUP_SUMS), source))
+
+    _rebuild_sketches(db, start, end, model_names)
+
+
+def _rebuild_sketches(
+    db: Session, start: datetime, end: Optional[datetime], model_names: Optional[list[str]] = None
+):
+    # Sketches cannot be built in SQL, so raw events are read and sketched one day at a time
+    cleanup = delete(MetricSketchHourly).where(MetricSketchHourly.bucket_start >= start)
+    if end:
+        cleanup = cleanup.where(MetricSketchHourly.bucket_start < end)
+    if model_names:
+        cleanup = cleanup.where(MetricSketchHourly.model_name.in_(model_names))
+    db.execute(cleanup)
+
+    in_models = ExecutionEvent.model_name.in_(model_names) if model_names else True
+    span = db.query(func.min(ExecutionEvent.timestamp), func.max(ExecutionEvent.timestamp)).filter(
+        ExecutionEvent.timestamp >= start, in_models
+    )
+    if end:
+        span = span.filter(ExecutionEvent.timestamp < end)
+    oldest, newest = span.one()
+    if oldest is None:
+        return
+    day = day_bucket(oldest)
+    while day <= newest:
+        events = db.execute(
+            select(
+                ExecutionEvent.timestamp,
+                ExecutionEvent.workflow_id,
+                ExecutionEvent.agent_id,
+                ExecutionEvent.model_name,
+                ExecutionEvent.customer_id,
+                ExecutionEvent.latency_ms,
+                ExecutionEvent.execution_cost_total,
+            ).where(ExecutionEvent.timestamp >= day, ExecutionEvent.timestamp < day + timedelta(days=1), in_models)
+        )
+        rows = _sketch_rows(_sketch_groups(events))
+        if rows:
+            db.execute(insert(MetricSketchHourly), rows)
+        day += timedelta(days=1)
+
+
+def backfill_rollups(db: Session) -> bool:
+    """Build rollups from raw events when the rollup tables are empty (e.g. after upgrading)."""
+    if db.query(CostRollupDaily.bucket_start).first() is not None:
+        return False
+    oldest = db.query(func.min(ExecutionEvent.timestamp)).scalar()
+    if oldest is None:
+        return False
+    rebuild_rollups(db, oldest)
+    db.commit()
+    invalidate_all()
+    return True
+
+
+def backfill_sketches(db: Session) -> bool:
+    """Build hourly sketches from raw events when only the sketch table is empty (e.g. after upgrading)."""
+    if db.query(MetricSketchHourly.bucket_start).first() is not None:
+        return False
+    oldest = db.query(func.min(ExecutionEvent.timestamp)).scalar()
+    if oldest is None:
+        return False
+    _rebuild_sketches(db, day_bucket(oldest), None)
+    db.commit()
+    return True
+
+
+def load_rollup_rows(db: Session, cutoff: datetime, customer_id: Optional[str] = None) -> list[tuple]:
+    """Return (bucket_start, workflow_id, agent_id, cost, tokens, executions) rows covering cutoff..now.
+
+    The partial first day is read from hourly buckets and every later day from daily buckets,
+    so the row count grows with the number of buckets rather than the number of events.
+    """
+    head_start = hour_bucket(cutoff)
+    body_start = day_bucket(cutoff) + timedelta(days=1)
+
+    rows = []
+    for model, lower, upper in ((CostRollupHourly, head_start, body_start), (CostRollupDaily, body_start, None)):
+        query = (
+            select(
+                model.bucket_start,
+                model.workflow_id,
+                model.agent_id,
+                func.sum(model.total_cost),
+                func.sum(model.tokens_in + model.tokens_out),
+                func.sum(model.execution_count),
+            )
+            .where(model.bucket_start >= lower)
+            .group_by(model.bucket_start, model.workflow_id, model.agent_id)
+        )
+        if upper:
+            query = query.where(model.bucket_start < upper)
+        if customer_id:
+            query = query.where(model.customer_id == customer_id)
+        rows.extend(db.execute(query).all())
+    return rows
+
+
+def load_sketches(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    customer_id: Optional[str] = None,
+    workflow_id: Optional[UUID] = None,
+    agent_id: Optional[str] = None,
+    model_name: Optional[str] = None,
+) -> list[MetricSketchHourly]:
+    """Return the hourly sketch rows whose buckets overlap [start, end)."""
+    query = select(MetricSketchHourly).where(
+        MetricSketchHourly.bucket_start >= hour_bucket(start), MetricSketchHourly.bucket_start < end
+    )
+    if customer_id:
+        query = query.where(MetricSketchHourly.customer_id == customer_id)
+    if workflow_id:
+        query = query.where(MetricSketchHourly.workflow_id == workflow_id)
+    if agent_id:
+        query = query.where(MetricSketchHourly.agent_id == agent_id)
+    if model_name:
+        query = query.where(MetricSketchHourly.model_name == model_name)
+    return list(db.execute(query).scalars())
+
+
+def load_hourly_totals(db: Session, start: datetime, customer_id: Optional[str] = None) -> list[tuple]:
+    """Return (bucket_start, cost, executions, tokens) per hour from start onwards."""
+    query = (
+        select(
+            CostRollupHourly.bucket_start,
+            func.sum(CostRollupHourly.total_cost),
+            func.sum(CostRollupHourly.execution_count),
+            func.sum(CostRollupHourly.tokens_in + CostRollupHourly.tokens_out),
+        )
+        .where(CostRollupHourly.bucket_start >= start)
+        .group_by(CostRollupHourly.bucket_start)
+    )
+    if customer_id:
+        query = query.where(CostRollupHourly.customer_id == customer_id)
+    return db.execute(query).all()
+
+
+def load_customer_hourly_spend(db: Session, start: datetime, end: datetime) -> list[tuple]:
+    """Return (customer_id, bucket_start, cost) per customer and hour in [start, end)."""
+    return db.execute(
+        select(CostRollupHourly.customer_id, CostRollupHourly.bucket_start, func.sum(CostRollupHourly.total_cost))
+        .where(
+            CostRollupHourly.bucket_start >= start,
+            CostRollupHourly.bucket_start < end,
+            CostRollupHourly.customer_id.is_not(None),
+        )
+        .group_by(CostRollupHourly.customer_id, CostRollupHourly.bucket_start)
+    ).all()
@@ -0,0 +1,41 @@
+"""Periodic background jobs run on the application's event loop."""
+
+import asyncio
+from typing import Callable, Optional
+
+import structlog
+from fastapi.concurrency import run_in_threadpool
+
+log = structlog.get_logger()
+
+
+class PeriodicTask:
+    """Run a blocking function in the threadpool every interval_s seconds, starting immediately."""
+
+    def __init__(self, name: str, interval_s: float, fn: Callable[[], object]):
+        self.name = name
+        self.interval_s = interval_s
+        self.fn = fn
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await run_in_threadpool(self.fn)
+            except Exception:
+                log.exception("Periodic task failed", task=self.name)
+            await asyncio.sleep(self.interval_s)
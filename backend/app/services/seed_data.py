@@ -9,14 +9,10 @@ from sqlalchemy.orm import Session
 from app.models.workflow import Workflow
 from app.models.execution_event import ExecutionEvent
 from app.models.budget_policy import BudgetPolicy
-
-MODEL_TIERS = {
-    "gpt-4-turbo": 0.01,
-    "gpt-4o": 0.005,
-    "gpt-3.5-turbo": 0.0015,
-    "claude-3-opus": 0.015,
-    "claude-3-sonnet": 0.003,
-}
+from app.services.guardrail_engine import guardrail_engine
+from app.services.pricing_service import DEFAULT_PRICES, PriceVersion, CATALOG_EPOCH
+from app.services.rollup_service import rebuild_rollups
+from app.services.summary_cache import invalidate_all
 
 AGENT_NAMES = [
     "planner-agent",
@@ -66,8 +62,8 @@ def seed_demo_data(db: Session, customer_id: str = "demo-customer"):
             wf = random.choice(workflows)
             num_agents = random.randint(2, 8)
             agents = random.sample(AGENT_NAMES, min(num_agents, len(AGENT_NAMES)))
-            model_name = random.choice(list(MODEL_TIERS.keys()))
-            cost_per_1k = MODEL_TIERS[model_name]
+            model_name = random.choice(list(DEFAULT_PRICES.keys()))
+            price = PriceVersion(CATALOG_EPOCH, *DEFAULT_PRICES[model_name])
 
             for agent_id in agents:
                 steps = random.randint(1, 6)
@@ -76,12 +72,12 @@ def seed_demo_data(db: Session, customer_id: str = "demo-customer"):
                     tokens_out = random.randint(200, 2000)
                     tool_calls = random.randint(0, 4)
                     tool_cost = round(tool_calls * random.uniform(0.01, 0.50), 4)
-                    token_cost = ((tokens_in + tokens_out) / 1000) * cost_per_1k
-                    total_cost = round(token_cost + tool_cost, 6)
+                    total_cost = price.cost(tokens_in, tokens_out, tool_cost)
 
                     event = ExecutionEvent(
                         execution_id=uuid.uuid4(),
                         workflow_id=wf.workflow_id,
+                        customer_id=customer_id,
                         agent_id=agent_id,
                         model_name=model_name,
                         tokens_in=tokens_in,
@@ -109,6 +105,10 @@ def seed_demo_data(db: Session, customer_id: str = "demo-customer"):
     )
     db.add(policy)
 
+    db.flush()
+    rebuild_rollups(db, min(e.timestamp for e in events))
     db.commit()
+    invalidate_all()
+    guardrail_engine.reconcile(db)
 
     return {"message": f"Seeded {len(workflows)} workflows, {len(events)} events, 1 policy", "seeded": True}
@@ -0,0 +1,174 @@
+"""Per-customer spend profiles for forecasting the rest of the UTC day.
+
+A profile is built from the hourly rollups of a customer's completed days over the last
+spend_profile_weeks weeks. For each weekday and each hour h it holds the mean and standard
+deviation, across that weekday's past days, of the spend from h to midnight, so projecting the
+rest of today is a lookup. Hours without rollups count as zero spend; days before the
+customer's first spend in the window do not count. A weekday with fewer than MIN_DAYS days of
+history uses the hour-of-day profile of all days instead, and a customer with fewer than
+MIN_DAYS days has no profile: guardrails then extrapolate today's average hourly spend.
+
+The projected remainder is scaled by how today's spend so far compares with the profile's
+expectation for the same time of day. The ratio is damped by PRIOR_SHARE of a typical day's
+spend, so a quiet or busy first hour moves the forecast only a little.
+
+Each worker keeps its own profiles. A periodic task refreshes them, loading only the days
+completed since its last run; the whole window is reloaded on the first run and after
+invalidate(), e.g. once re-rating has changed the cost of past events.
+"""
+
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import numpy as np
+import structlog
+
+from app.config import settings
+from app.services.rollup_service import load_customer_hourly_spend
+
+log = structlog.get_logger()
+
+# Days of history a weekday (or a customer) needs for its own profile
+MIN_DAYS = 2
+
+# Weight, as a share of a typical day's spend, that pulls today's pace towards the profile's
+PRIOR_SHARE = 0.25
+
+# Two-sided 90% normal interval for the confidence range
+CONFIDENCE_Z = 1.645
+
+
+@dataclass(frozen=True)
+class SpendForecast:
+    expected: float  # projected spend for the whole day
+    low: float
+    high: float
+
+
+@dataclass(frozen=True)
+class SpendProfile:
+    # [weekday, hour]: spend from that hour to midnight, hour 24 being zero
+    mean: np.ndarray
+    std: np.ndarray
+    days: int
+
+    def forecast(self, spend_so_far: float, now: datetime) -> SpendForecast:
+        weekday, hour = now.weekday(), now.hour
+        into_hour = (now.minute * 60 + now.second + now.microsecond / 1e6) / 3600
+        mean_rest = (1 - into_hour) * self.mean[weekday, hour] + into_hour * self.mean[weekday, hour + 1]
+        std_rest = (1 - into_hour) * self.std[weekday, hour] + into_hour * self.std[weekday, hour + 1]
+
+        prior = PRIOR_SHARE * self.mean[weekday, 0]
+        expected_so_far = self.mean[weekday, 0] - mean_rest
+        level = (spend_so_far + prior) / (expected_so_far + prior) if expected_so_far + prior > 0 else 1.0
+
+        return SpendForecast(
+            expected=float(spend_so_far + level * mean_rest),
+            low=float(spend_so_far + level * max(mean_rest - CONFIDENCE_Z * std_rest, 0.0)),
+            high=float(spend_so_far + level * (mean_rest + CONFIDENCE_Z * std_rest)),
+        )
+
+
+def build_profile(hourly: np.ndarray, weekdays: np.ndarray) -> Optional[SpendProfile]:
+    """Profile from per-day hourly spend (days x 24) and each day's weekday."""
+    if len(hourly) < MIN_DAYS:
+        return None
+    # Spend from each hour to midnight, with a zero column for midnight itself
+    rest = np.zeros((len(hourly), 25))
+    rest[:, :24] = np.cumsum(hourly[:, ::-1], axis=1)[:, ::-1]
+
+    mean = np.empty((7, 25))
+    std = np.empty((7, 25))
+    pooled_mean, pooled_std = rest.mean(axis=0), rest.std(axis=0, ddof=1)
+    for weekday in range(7):
+        days = rest[weekdays == weekday]
+        if len(days) >= MIN_DAYS:
+            mean[weekday], std[weekday] = days.mean(axis=0), days.std(axis=0, ddof=1)
+        else:
+            mean[weekday], std[weekday] = pooled_mean, pooled_std
+    return SpendProfile(mean=mean, std=std, days=len(hourly))
+
+
+class SpendForecaster:
+    def __init__(self, weeks: int):
+        self.window_days = weeks * 7
+        self._refresh_lock = threading.Lock()
+        # customer -> hourly spend of the window's days, in slots indexed by date ordinal % window_days
+        self._spend: dict[str, np.ndarray] = {}
+        self._first_day: dict[str, int] = {}  # ordinal of the customer's first day with spend
+        self._end: Optional[date] = None  # day after the last loaded day
+        # Replaced wholesale, never mutated
+        self._profiles: dict[str, SpendProfile] = {}
+
+    def forecast(self, customer_id: str, spend_so_far: float, now: datetime) -> Optional[SpendForecast]:
+        """Projected spend for the whole of today, or None if the customer has no profile yet."""
+        profile = self._profiles.get(customer_id)
+        return profile.forecast(spend_so_far, now) if profile else None
+
+    def profile(self, customer_id: str) -> Optional[SpendProfile]:
+        return self._profiles.get(customer_id)
+
+    def invalidate(self):
+        """Reload the whole window on the next refresh."""
+        self._end = None
+
+    def refresh(self, session_factory) -> bool:
+        """Load the days completed since the last refresh and rebuild the profiles.
+
+        Returns False if there was no new day to load.
+        """
+        with self._refresh_lock:
+            end = datetime.utcnow().date()
+            start = end - timedelta(days=self.window_days)
+            previous_end = self._end
+            if previous_end == end:
+                return False
+            if previous_end is None or previous_end <= start:
+                self._spend.clear()
+                self._first_day.clear()
+            else:
+                start = previous_end
+
+            with session_factory() as db:
+                rows = load_customer_hourly_spend(
+                    db, datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.min.time())
+                )
+            self._load(rows, start, end)
+            self._end = end
+            self._profiles = self._build(end)
+            log.info("Spend profiles refreshed", customers=len(self._profiles), days_loaded=(end - start).days)
+            return True
+
+    def _load(self, rows: list[tuple], start: date, end: date):
+        # Slots of the new days may hold days that have left the window
+        slots = [d % self.window_days for d in range(start.toordinal(), end.toordinal())]
+        for spend in self._spend.values():
+            spend[slots] = 0.0
+        for customer_id, bucket_start, cost in rows:
+            spend = self._spend.get(customer_id)
+            if spend is None:
+                spend = self._spend[customer_id] = np.zeros((self.window_days, 24))
+            day = bucket_start.toordinal()
+            spend[day % self.window_days, bucket_start.hour] += cost or 0.0
+            if day < self._first_day.get(customer_id, day + 1):
+                self._first_day[customer_id] = day
+
+    def _build(self, end: date) -> dict[str, SpendProfile]:
+        window_start = end.toordinal() - self.window_days
+        profiles = {}
+        for customer_id, spend in list(self._spend.items()):
+            if not spend.any():
+                # No spend left in the window
+                del self._spend[customer_id], self._first_day[customer_id]
+                continue
+            days = np.arange(max(self._first_day[customer_id], window_start), end.toordinal())
+            # date.fromordinal(1) is a Monday
+            profile = build_profile(spend[days % self.window_days], (days - 1) % 7)
+            if profile is not None:
+                profiles[customer_id] = profile
+        return profiles
+
+
+spend_forecaster = SpendForecaster(settings.spend_profile_weeks)
@@ -0,0 +1,173 @@
+"""Result cache for cost summaries with version-based invalidation.
+
+Cache keys embed a version per scope (all customers, or a single customer). Writing events
+bumps the versions of the scopes they belong to, so stale entries are never read again and
+simply age out through the TTL or LRU eviction.
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+import structlog
+
+from app.config import settings
+
+log = structlog.get_logger()
+
+GLOBAL_SCOPE = "all"
+EPOCH_SCOPE = "epoch"
+
+# Widest window the cost-summary endpoint accepts; older events cannot land in a cached window
+MAX_WINDOW_DAYS = 90
+
+
+def customer_scope(customer_id: str) -> str:
+    return f"customer:{customer_id}"
+
+
+class SummaryCache(ABC):
+    """Backend interface: opaque byte values under string keys, plus integer scope versions."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]: ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl_s: int): ...
+
+    @abstractmethod
+    def versions(self, scopes: list[str]) -> list[int]: ...
+
+    @abstractmethod
+    def bump(self, scopes: Iterable[str]): ...
+
+
+class NullSummaryCache(SummaryCache):
+    def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    def set(self, key: str, value: bytes, ttl_s: int):
+        pass
+
+    def versions(self, scopes: list[str]) -> list[int]:
+        return [0] * len(scopes)
+
+    def bump(self, scopes: Iterable[str]):
+        pass
+
+
+class LRUSummaryCache(SummaryCache):
+    """Per-process cache; versions are process-local, so use Redis when running several workers."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._versions: dict[str, int] = {}
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl_s: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_s, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def versions(self, scopes: list[str]) -> list[int]:
+        with self._lock:
+            return [self._versions.get(s, 0) for s in scopes]
+
+    def bump(self, scopes: Iterable[str]):
+        with self._lock:
+            for s in scopes:
+                self._versions[s] = self._versions.get(s, 0) + 1
+
+
+class RedisSummaryCache(SummaryCache):
+    """Shared cache for multi-worker deployments. Errors are logged and treated as misses."""
+
+    def __init__(self, url: str, prefix: str = "mas:summary:"):
+        import redis  # optional dependency, only needed for this backend
+
+        self._redis = redis.Redis.from_url(url, socket_timeout=0.25)
+        self._errors = (redis.RedisError,)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return self._redis.get(self.prefix + key)
+        except self._errors as e:
+            log.warning("Summary cache read failed", error=str(e))
+            return None
+
+    def set(self, key: str, value: bytes, ttl_s: int):
+        try:
+            self._redis.set(self.prefix + key, value, ex=ttl_s)
+        except self._errors as e:
+            log.warning("Summary cache write failed", error=str(e))
+
+    def versions(self, scopes: list[str]) -> list[int]:
+        try:
+            values = self._redis.mget([f"{self.prefix}version:{s}" for s in scopes])
+        except self._errors as e:
+            log.warning("Summary cache version read failed", error=str(e))
+            # An unreadable version must not serve a stale entry later; skip caching instead
+            return [-1] * len(scopes)
+        return [int(v) if v is not None else 0 for v in values]
+
+    def bump(self, scopes: Iterable[str]):
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for s in scopes:
+                pipe.incr(f"{self.prefix}version:{s}")
+            pipe.execute()
+        except self._errors as e:
+            log.warning("Summary cache invalidation failed", error=str(e))
+
+
+def build_summary_cache() -> SummaryCache:
+    if settings.summary_cache_backend == "redis":
+        return RedisSummaryCache(settings.redis_url)
+    if settings.summary_cache_backend == "memory":
+        return LRUSummaryCache(settings.summary_cache_max_entries)
+    return NullSummaryCache()
+
+
+summary_cache = build_summary_cache()
+
+
+def summary_key(days: int, customer_id: Optional[str], window_start: datetime) -> Optional[str]:
+    """Cache key for a summary window, or None when the current versions cannot be read."""
+    scope = customer_scope(customer_id) if customer_id else GLOBAL_SCOPE
+    epoch, version = summary_cache.versions([EPOCH_SCOPE, scope])
+    if epoch < 0 or version < 0:
+        return None
+    return f"{scope}:{days}:{window_start:%Y%m%d%H}:{epoch}.{version}"
+
+
+def invalidate_events(rows: Iterable[dict]):
+    """Bump the versions of every scope whose cached windows the written events fall into."""
+    oldest_window = datetime.utcnow() - timedelta(days=MAX_WINDOW_DAYS + 1)
+    customers = {r.get("customer_id") for r in rows if r["timestamp"] >= oldest_window}
+    if not customers:
+        return
+    summary_cache.bump([GLOBAL_SCOPE, *(customer_scope(c) for c in customers if c)])
+
+
+def invalidate_all():
+    """Invalidate every cached summary, e.g. after rollups were rebuilt in bulk."""
+    summary_cache.bump([EPOCH_SCOPE])
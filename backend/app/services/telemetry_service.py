@@ -1,19 +1,24 @@
 from datetime import datetime, timedelta
+from typing import Optional
 from uuid import UUID
 
-from sqlalchemy import func
 from sqlalchemy.orm import Session
 
-from app.models.execution_event import ExecutionEvent
-from app.schemas.telemetry import CostSummary
+from app.schemas.telemetry import CostSummary, PercentileGroup, PercentileStats, PercentileSummary
+from app.services.anomaly_detector import has_anomaly_since
+from app.services.quantile_sketch import RELATIVE_ACCURACY, DDSketch
+from app.services.rollup_service import hour_bucket, load_rollup_rows, load_sketches
+from app.services.summary_cache import summary_cache, summary_key
 
 
-def get_cost_summary(db: Session, days: int = 7) -> CostSummary:
-    cutoff = datetime.utcnow() - timedelta(days=days)
+def get_cost_summary(
+    db: Session, days: int = 7, customer_id: Optional[str] = None, now: Optional[datetime] = None
+) -> CostSummary:
+    cutoff = (now or datetime.utcnow()) - timedelta(days=days)
 
-    events = db.query(ExecutionEvent).filter(ExecutionEvent.timestamp >= cutoff).all()
+    rows = load_rollup_rows(db, cutoff, customer_id=customer_id)
 
-    if not events:
+    if not rows:
         return CostSummary(
             total_cost=0.0,
             total_executions=0,
@@ -25,39 +30,119 @@ def get_cost_summary(db: Session, days: int = 7) -> CostSummary:
             spike_detected=False,
         )
 
-    total_cost = sum(e.execution_cost_total for e in events)
-    total_tokens = sum(e.tokens_in + e.tokens_out for e in events)
-    avg_cost = total_cost / len(events) if events else 0
-
+    total_cost = 0.0
+    total_tokens = 0
+    total_executions = 0
     cost_by_agent: dict[str, float] = {}
-    for e in events:
-        cost_by_agent[e.agent_id] = cost_by_agent.get(e.agent_id, 0) + e.execution_cost_total
-
     cost_by_workflow: dict[str, float] = {}
-    for e in events:
-        wf_key = str(e.workflow_id)
-        cost_by_workflow[wf_key] = cost_by_workflow.get(wf_key, 0) + e.execution_cost_total
-
-    # Build daily cost trend
     daily_costs: dict[str, float] = {}
-    for e in events:
-        day_key = e.timestamp.strftime("%Y-%m-%d")
-        daily_costs[day_key] = daily_costs.get(day_key, 0) + e.execution_cost_total
+
+    for bucket_start, workflow_id, agent_id, cost, tokens, executions in rows:
+        total_cost += cost
+        total_tokens += tokens
+        total_executions += executions
+        cost_by_agent[agent_id] = cost_by_agent.get(agent_id, 0) + cost
+        wf_key = str(workflow_id)
+        cost_by_workflow[wf_key] = cost_by_workflow.get(wf_key, 0) + cost
+        day_key = bucket_start.strftime("%Y-%m-%d")
+        daily_costs[day_key] = daily_costs.get(day_key, 0) + cost
+
+    avg_cost = total_cost / total_executions if total_executions else 0
 
     cost_trend = [{"date": k, "cost": round(v, 4)} for k, v in sorted(daily_costs.items())]
 
-    # Spike detection: flag if any day exceeds 2x the average daily cost
-    daily_values = list(daily_costs.values())
-    avg_daily = sum(daily_values) / len(daily_values) if daily_values else 0
-    spike_detected = any(v > avg_daily * 2 for v in daily_values) if len(daily_values) > 1 else False
+    # Spikes are detected per agent at ingest; the summary only asks whether any fell in the window
+    spike_detected = has_anomaly_since(db, cutoff, customer_id)
 
     return CostSummary(
         total_cost=round(total_cost, 4),
-        total_executions=len(events),
+        total_executions=total_executions,
         avg_cost_per_execution=round(avg_cost, 4),
-        total_tokens=total_tokens,
+        total_tokens=int(total_tokens),
         cost_by_agent={k: round(v, 4) for k, v in cost_by_agent.items()},
         cost_by_workflow={k: round(v, 4) for k, v in cost_by_workflow.items()},
         cost_trend=cost_trend,
         spike_detected=spike_detected,
     )
+
+
+def cached_cost_summary(
+    days: int, customer_id: Optional[str], now: datetime
+) -> tuple[Optional[str], Optional[bytes]]:
+    """Summary cache key for the window and the body cached under it, if any.
+
+    Either may be None. May block on Redis, so async callers run it in a worker thread.
+    """
+    # Summaries start at the hour bucket of the cutoff, so the result is stable within the hour
+    key = summary_key(days, customer_id, hour_bucket(now - timedelta(days=days)))
+    if key is None:
+        return None, None
+    return key, summary_cache.get(key)
+
+
+def render_cost_summary(db: Session, days: int, customer_id: Optional[str], now: datetime) -> bytes:
+    return get_cost_summary(db, days=days, customer_id=customer_id, now=now).model_dump_json().encode()
+
+
+PERCENTILE_GROUP_COLUMNS = {"agent": "agent_id", "model": "model_name", "workflow": "workflow_id"}
+
+
+def _percentile_stats(sketch: DDSketch) -> PercentileStats:
+    def rounded(value: Optional[float]) -> Optional[float]:
+        return round(value, 6) if value is not None else None
+
+    return PercentileStats(
+        count=sketch.count,
+        mean=rounded(sketch.mean),
+        p50=rounded(sketch.quantile(0.5)),
+        p95=rounded(sketch.quantile(0.95)),
+        p99=rounded(sketch.quantile(0.99)),
+    )
+
+
+def get_percentiles(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    group_by: Optional[str] = None,
+    customer_id: Optional[str] = None,
+    workflow_id: Optional[UUID] = None,
+    agent_id: Optional[str] = None,
+    model_name: Optional[str] = None,
+) -> PercentileSummary:
+    """Latency and per-step cost percentiles from merged hourly sketches.
+
+    The window is widened to whole hours, the granularity at which sketches are kept.
+    """
+    start = hour_bucket(start)
+    if end != hour_bucket(end):
+        end = hour_bucket(end) + timedelta(hours=1)
+    rows = load_sketches(db, start, end, customer_id, workflow_id, agent_id, model_name)
+    column = PERCENTILE_GROUP_COLUMNS.get(group_by)
+
+    overall = (DDSketch(), DDSketch())
+    groups: dict[str, tuple[DDSketch, DDSketch]] = {}
+    for row in rows:
+        latency = DDSketch.from_bytes(row.latency_sketch) if row.latency_sketch is not None else None
+        cost = DDSketch.from_bytes(row.cost_sketch)
+        targets = [overall]
+        if column:
+            targets.append(groups.setdefault(str(getattr(row, column)), (DDSketch(), DDSketch())))
+        for latency_total, cost_total in targets:
+            if latency is not None:
+                latency_total.merge(latency)
+            cost_total.merge(cost)
+
+    def summarize(key: Optional[str], sketches: tuple[DDSketch, DDSketch]) -> PercentileGroup:
+        return PercentileGroup(
+            key=key, latency_ms=_percentile_stats(sketches[0]), cost_per_step=_percentile_stats(sketches[1])
+        )
+
+    return PercentileSummary(
+        start=start,
+        end=end,
+        group_by=group_by,
+        relative_accuracy=RELATIVE_ACCURACY,
+        overall=summarize(None, overall),
+        groups=[summarize(k, v) for k, v in sorted(groups.items(), key=lambda kv: -kv[1][1].count)],
+    )
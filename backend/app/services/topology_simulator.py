@@ -0,0 +1,247 @@
+"""Vectorized simulation of multi-agent workflow topologies.
+
+A workflow is a DAG of agents. Each agent waits for the agents it depends on, then runs a
+random number of steps, possibly several times over (loops); each step may fail and be
+attempted again (retries). Every attempt draws its own tokens, tool calls and latency.
+Many executions are simulated at once with NumPy, yielding the distribution of workflow
+cost and of critical-path latency, and each execution can be replayed through the budget
+guardrail rules.
+"""
+
+import time
+from typing import Optional
+
+import numpy as np
+
+from app.schemas.simulation import (
+    AgentNode,
+    Distribution,
+    GuardrailOutcomeRates,
+    AgentSimulationStats,
+    SampleSummary,
+    SimulationPolicy,
+    TopologySimulationRequest,
+    TopologySimulationResult,
+)
+from app.services.guardrail_service import WARN_RATIO
+from app.services.monte_carlo import PILOT_SAMPLES, sample_distribution, sample_counts
+
+# Executions simulated per pass
+CHUNK_RUNS = 1 << 16
+
+# An agent's per-attempt draws are summed exactly below this many attempts in a run, and
+# through the normal approximation at or above it, bounding the draws per run and agent
+CLT_MIN_ATTEMPTS = 32
+
+
+def topological_order(agents: list[AgentNode]) -> list[int]:
+    """Indices of agents ordered so that every agent follows its dependencies."""
+    index = {a.agent_id: i for i, a in enumerate(agents)}
+    pending = [len(set(a.depends_on)) for a in agents]
+    dependents: list[list[int]] = [[] for _ in agents]
+    for i, agent in enumerate(agents):
+        for dep in set(agent.depends_on):
+            dependents[index[dep]].append(i)
+
+    order = [i for i, n in enumerate(pending) if n == 0]
+    for i in order:
+        for j in dependents[i]:
+            pending[j] -= 1
+            if pending[j] == 0:
+                order.append(j)
+    if len(order) != len(agents):
+        cyclic = sorted(agents[i].agent_id for i, n in enumerate(pending) if n > 0)
+        raise ValueError(f"Agent dependencies contain a cycle; unresolved agents: {', '.join(cyclic)}")
+    return order
+
+
+class _PerAttempt:
+    """Sums of a per-attempt quantity over each run's attempts.
+
+    Runs with fewer than CLT_MIN_ATTEMPTS attempts draw one value per attempt; longer runs use
+    the normal approximation of the sum, with moments estimated from a pilot sample.
+    """
+
+    def __init__(self, rng: np.random.Generator, dist: Distribution, counts: bool = False):
+        self.rng = rng
+        self.dist = dist
+        self.counts = counts
+        self._moments: Optional[tuple[float, float]] = None
+
+    def _draw(self, size) -> np.ndarray:
+        if self.counts:
+            return sample_counts(self.rng, self.dist, size)
+        return sample_distribution(self.rng, self.dist, size)
+
+    def sums(self, attempts: np.ndarray) -> np.ndarray:
+        if self.dist.kind == "fixed":
+            return self._draw(1)[0] * attempts
+        exact = attempts < CLT_MIN_ATTEMPTS
+        runs = np.repeat(np.arange(len(attempts)), np.where(exact, attempts, 0).astype(np.int64))
+        # bincount returns integers when there are no weights at all
+        sums = np.bincount(runs, weights=self._draw(len(runs)), minlength=len(attempts)).astype(np.float64)
+        if not exact.all():
+            if self._moments is None:
+                pilot = self._draw(PILOT_SAMPLES)
+                self._moments = (float(pilot.mean()), float(pilot.std()))
+            mean, std = self._moments
+            k = attempts[~exact]
+            sums[~exact] = np.maximum(self.rng.normal(k * mean, np.sqrt(k) * std), 0.0)
+        return sums
+
+
+def _attempts(rng: np.random.Generator, agent: AgentNode, n: int) -> np.ndarray:
+    # Invocations: 1 plus a geometric number of loops; steps are summed over invocations
+    invocations = rng.geometric(1 - agent.loop_probability, n) if agent.loop_probability else np.ones(n, np.int64)
+    if agent.steps.kind == "fixed":
+        steps = round(max(agent.steps.value, 0.0)) * invocations.astype(np.float64)
+    else:
+        runs = np.repeat(np.arange(n), invocations)
+        steps = np.bincount(runs, weights=sample_counts(rng, agent.steps, len(runs)), minlength=n)
+    if not agent.retry_probability:
+        return steps
+    # Failed attempts before each step succeeds are geometric; their sum over steps is negative binomial
+    retries = rng.negative_binomial(np.maximum(steps, 1), 1 - agent.retry_probability)
+    return steps + np.where(steps > 0, retries, 0)
+
+
+def _summary(values: np.ndarray) -> SampleSummary:
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return SampleSummary(
+        mean=round(float(values.mean()), 6),
+        p50=round(float(p50), 6),
+        p90=round(float(p90), 6),
+        p99=round(float(p99), 6),
+        max=round(float(values.max()), 6),
+    )
+
+
+def replay_guardrails(
+    costs: np.ndarray,
+    max_steps: np.ndarray,
+    policy: SimulationPolicy,
+    runs_per_day: int,
+    starting_daily_spend: float = 0.0,
+) -> GuardrailOutcomeRates:
+    """Apply the /guardrail/evaluate rules to each simulated execution in order.
+
+    Consecutive runs_per_day executions share a daily budget. Blocked executions do not run, so
+    they add nothing to the day's spend.
+    """
+    n = len(costs)
+    over_workflow = costs > policy.workflow_budget_limit
+    admitted = np.where(over_workflow, 0.0, costs)
+    # Once the daily budget is exceeded every later execution that day is blocked, so the
+    # running sum of admitted costs only has to be right up to that point
+    spent_before = np.cumsum(admitted) - admitted
+    day_start = np.repeat(spent_before[::runs_per_day], runs_per_day)[:n]
+    daily_spend = spent_before - day_start + starting_daily_spend
+
+    block_daily = ~over_workflow & (daily_spend > policy.daily_budget_limit)
+    blocked = over_workflow | block_daily
+    warn_daily = ~blocked & (daily_spend > policy.daily_budget_limit * WARN_RATIO)
+    warn_steps = ~blocked & ~warn_daily & (max_steps > policy.step_limit_per_agent)
+    warned = warn_daily | warn_steps
+
+    def rate(mask: np.ndarray) -> float:
+        return round(float(mask.mean()), 6)
+
+    return GuardrailOutcomeRates(
+        pass_rate=rate(~blocked & ~warned),
+        warn_rate=rate(warned),
+        block_rate=rate(blocked),
+        block_workflow_budget_rate=rate(over_workflow),
+        block_daily_budget_rate=rate(block_daily),
+        warn_daily_budget_rate=rate(warn_daily),
+        warn_step_limit_rate=rate(warn_steps),
+    )
+
+
+def simulate_topology(
+    req: TopologySimulationRequest, policy: Optional[SimulationPolicy] = None
+) -> TopologySimulationResult:
+    started = time.perf_counter()
+    agents = req.agents
+    order = topological_order(agents)
+    index = {a.agent_id: i for i, a in enumerate(agents)}
+    deps = [sorted({index[d] for d in a.depends_on}) for a in agents]
+    rng = np.random.default_rng(req.seed)
+    draws = [
+        (
+            _PerAttempt(rng, a.tokens_per_step),
+            _PerAttempt(rng, a.tool_calls_per_step, counts=True),
+            _PerAttempt(rng, a.latency_ms_per_step),
+        )
+        for a in agents
+    ]
+
+    num_agents = len(agents)
+    costs = np.empty(req.samples)
+    latency = np.empty(req.samples)
+    max_steps = np.empty(req.samples)
+    agent_cost = np.zeros(num_agents)
+    agent_steps = np.zeros(num_agents)
+    agent_latency = np.zeros(num_agents)
+    on_critical_path = np.zeros(num_agents)
+
+    for start in range(0, req.samples, CHUNK_RUNS):
+        n = min(CHUNK_RUNS, req.samples - start)
+        finish = np.empty((n, num_agents))
+        cost = np.zeros(n)
+        steps_max = np.zeros(n)
+        for i in order:
+            agent = agents[i]
+            tokens, tool_calls, step_latency = draws[i]
+            attempts = _attempts(rng, agent, n)
+            own_cost = (
+                tokens.sums(attempts) / 1000 * agent.model_cost_per_1k_tokens
+                + tool_calls.sums(attempts) * agent.tool_cost_per_call
+            )
+            own_latency = step_latency.sums(attempts)
+            ready = finish[:, deps[i]].max(axis=1) if deps[i] else 0.0
+            finish[:, i] = ready + own_latency
+
+            cost += own_cost
+            steps_max = np.maximum(steps_max, attempts)
+            agent_cost[i] += own_cost.sum()
+            agent_steps[i] += attempts.sum()
+            agent_latency[i] += own_latency.sum()
+
+        # Walk the critical path back from the last agent to finish, through the latest dependency
+        rows = np.arange(n)
+        on_path = np.zeros((n, num_agents), dtype=bool)
+        on_path[rows, finish.argmax(axis=1)] = True
+        for i in reversed(order):
+            if not deps[i]:
+                continue
+            hit = on_path[:, i]
+            if hit.any():
+                latest = np.asarray(deps[i])[finish[hit][:, deps[i]].argmax(axis=1)]
+                on_path[rows[hit], latest] = True
+        on_critical_path += on_path.sum(axis=0)
+
+        costs[start : start + n] = cost
+        latency[start : start + n] = finish.max(axis=1)
+        max_steps[start : start + n] = steps_max
+
+    samples = req.samples
+    policy = policy or req.policy
+    return TopologySimulationResult(
+        samples=samples,
+        cost_per_workflow=_summary(costs),
+        latency_ms=_summary(latency),
+        agents=[
+            AgentSimulationStats(
+                agent_id=a.agent_id,
+                mean_cost=round(agent_cost[i] / samples, 6),
+                mean_steps=round(agent_steps[i] / samples, 3),
+                mean_latency_ms=round(agent_latency[i] / samples, 3),
+                critical_path_share=round(on_critical_path[i] / samples, 6),
+            )
+            for i, a in enumerate(agents)
+        ],
+        guardrail=(
+            replay_guardrails(costs, max_steps, policy, req.runs_per_day, req.starting_daily_spend) if policy else None
+        ),
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 3),
+    )
@@ -0,0 +1,48 @@
+"""Compare two benchmark result files and fail on regressions.
+
+    python -m benchmarks.compare baseline.json current.json --threshold 0.2
+"""
+
+import argparse
+import json
+import sys
+
+
+def find_regressions(baseline: dict, current: dict, threshold: float) -> list[dict]:
+    """Return metrics that got worse than the baseline by more than the threshold fraction."""
+    regressions = []
+    for name, metric in current["metrics"].items():
+        base = baseline["metrics"].get(name)
+        if base is None or not base["value"]:
+            continue
+        change = (metric["value"] - base["value"]) / base["value"]
+        worse = change > threshold if metric["better"] == "lower" else change < -threshold
+        if worse:
+            regressions.append(
+                {"metric": name, "baseline": base["value"], "current": metric["value"], "change": round(change, 4)}
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression (default 0.2)")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    regressions = find_regressions(baseline, current, args.threshold)
+    for r in regressions:
+        print(f"REGRESSION {r['metric']}: {r['baseline']} -> {r['current']} ({r['change']:+.1%})")
+    if regressions:
+        sys.exit(1)
+    print(f"No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
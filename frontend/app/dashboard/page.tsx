@@ -96,8 +96,8 @@ export default function DashboardPage() {
 
           {summary.spike_detected && (
             <div className="p-4 rounded-lg bg-amber-900/30 border border-amber-800 text-amber-400 text-sm">
-              Cost spike detected — one or more days exceeded 2x the average
-              daily spend.
+              Cost spike detected — an agent&apos;s spend or token rate broke
+              sharply from its baseline in this period.
             </div>
           )}
 
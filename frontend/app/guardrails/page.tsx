@@ -281,6 +281,16 @@ export default function GuardrailsPage() {
                     ${evalResult.spend_velocity.toFixed(4)}/hr
                   </p>
                 </div>
+                <div className="p-3 rounded-md bg-gray-800/50 col-span-2">
+                  <p className="text-xs text-gray-400">Forecast Daily Spend</p>
+                  <p className="font-medium">
+                    ${evalResult.forecasted_spend.toFixed(4)}
+                    <span className="text-xs text-gray-400">
+                      {" "}
+                      (${evalResult.forecast_low.toFixed(4)} – ${evalResult.forecast_high.toFixed(4)})
+                    </span>
+                  </p>
+                </div>
               </div>
             </div>
           )}
@@ -72,6 +72,9 @@ export interface GuardrailResult {
   workflow_budget_limit: number;
   cost_pressure: string;
   spend_velocity: number;
+  forecasted_spend: number;
+  forecast_low: number;
+  forecast_high: number;
 }
 
 export const api = {